@@ -11,6 +11,8 @@ from authz.models import Rol, UserRole
 from authz.serializer import RolSerializer
 from django.contrib.auth.models import User
 from condominio.models import Bitacora, Usuario
+from condominio.perfiles import resolver_perfil
+from condominio.auditoria import registrar_bitacora
 from authz.serializer import MeSerializer
 
 from django.contrib.auth.models import User
@@ -93,7 +95,7 @@ class MeView(APIView):
 
     def get(self, request):
         try:
-            perfil = getattr(request.user, 'perfil', None)
+            perfil = resolver_perfil(request.user)
             if not perfil:
                 return Response(status=404)
         except Usuario.DoesNotExist:
@@ -174,7 +176,7 @@ class UserRolesView(APIView):
             # log bitacora
             try:
                 perfil = getattr(user, 'perfil', None)
-                Bitacora.objects.create(usuario=perfil, accion='UPDATE_ROLES', descripcion=f'Roles actualizados (added={added} removed={removed})', ip_address=request.META.get('REMOTE_ADDR'))
+                registrar_bitacora(perfil, 'UPDATE_ROLES', f'Roles actualizados (added={added} removed={removed})', request.META.get('REMOTE_ADDR'), garantizado=True)
             except Exception:
                 pass
         return Response({'id': user.pk, 'roles': after})
@@ -202,7 +204,7 @@ class UserRolesView(APIView):
             if created:
                 try:
                     perfil = getattr(user, 'perfil', None)
-                    Bitacora.objects.create(usuario=perfil, accion='ASSIGN_ROLE', descripcion=f'Rol {role.slug} asignado', ip_address=request.META.get('REMOTE_ADDR'))
+                    registrar_bitacora(perfil, 'ASSIGN_ROLE', f'Rol {role.slug} asignado', request.META.get('REMOTE_ADDR'), garantizado=True)
                 except Exception:
                     pass
                 return Response({'id': user.pk, 'role': role.slug}, status=status.HTTP_201_CREATED)
@@ -222,7 +224,7 @@ class UserRolesView(APIView):
         if deleted:
             try:
                 perfil = getattr(user, 'perfil', None)
-                Bitacora.objects.create(usuario=perfil, accion='REMOVE_ROLE', descripcion=f'Rol {role.slug} removido', ip_address=request.META.get('REMOTE_ADDR'))
+                registrar_bitacora(perfil, 'REMOVE_ROLE', f'Rol {role.slug} removido', request.META.get('REMOTE_ADDR'), garantizado=True)
             except Exception:
                 pass
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -252,7 +254,7 @@ class SetUserActiveView(APIView):
         try:
             perfil = getattr(user, 'perfil', None)
             accion = 'HABILITAR_USUARIO' if user.is_active else 'INACTIVAR_USUARIO'
-            Bitacora.objects.create(usuario=perfil, accion=accion, descripcion=f'Usuario {user.email} {"habilitado" if user.is_active else "inhabilitado"} por {request.user.email}', ip_address=request.META.get('REMOTE_ADDR'))
+            registrar_bitacora(perfil, accion, f'Usuario {user.email} {"habilitado" if user.is_active else "inhabilitado"} por {request.user.email}', request.META.get('REMOTE_ADDR'), garantizado=True)
         except Exception:
             pass
         return Response({'id': user.pk, 'is_active': user.is_active})
@@ -20,6 +20,7 @@ from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 from condominio.models import Usuario, Bitacora  # importa tu modelo personalizado
+from condominio.auditoria import registrar_bitacora
 
 # Create your views here.
 
@@ -42,7 +43,7 @@ def login(request):
                 # registrar en bitacora: ingreso al sistema
                 ip = request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR')
                 try:
-                    Bitacora.objects.create(usuario=perfil, accion='Ingreso al sistema', descripcion=f'Usuario {user.email} inició sesión', ip_address=ip)
+                    registrar_bitacora(perfil, 'Ingreso al sistema', f'Usuario {user.email} inició sesión', ip)
                 except Exception:
                     pass
             except Usuario.DoesNotExist:
@@ -104,7 +105,7 @@ def register(request):
     # registrar en bitacora: registro de usuario
     ip = request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR')
     try:
-        Bitacora.objects.create(usuario=perfil, accion='Registro', descripcion=f'Usuario {perfil.user.email} registrado', ip_address=ip)
+        registrar_bitacora(perfil, 'Registro', f'Usuario {perfil.user.email} registrado', ip)
     except Exception:
         pass
 
@@ -157,7 +158,7 @@ def logout(request):
     ip = request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR')
     try:
         perfil = getattr(user, 'perfil', None)
-        Bitacora.objects.create(usuario=perfil, accion='Salida', descripcion=f'Usuario {getattr(user, "email", getattr(user, "username", "unknown"))} cerró sesión', ip_address=ip)
+        registrar_bitacora(perfil, 'Salida', f'Usuario {getattr(user, "email", getattr(user, "username", "unknown"))} cerró sesión', ip)
     except Exception:
         pass
 
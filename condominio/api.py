@@ -2,24 +2,26 @@ from rest_framework import viewsets, permissions, filters, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
+from .perfiles import resolver_perfil
+from .auditoria import registrar_bitacora
 
 def get_user_perfil(user):
-    """Safely get perfil from user object"""
-    if user and hasattr(user, 'perfil'):
-        return getattr(user, 'perfil', None)
-    return None
+    """Safely get perfil from user object (con rol cargado; ver condominio/perfiles.py)"""
+    return resolver_perfil(user)
 
 # Helper to log into Bitacora
-def log_bitacora(request, accion, descripcion=None):
+def log_bitacora(request, accion, descripcion=None, garantizado=False):
     """Create a Bitacora entry using request context (user perfil and IP).
 
     descripcion: optional free text describing the change; if callable, it will be called
     with the saved instance to produce a description.
+    garantizado: write synchronously instead of queueing (see condominio.auditoria).
     """
     try:
-        Bitacora = __import__('condominio.models', fromlist=['Bitacora']).Bitacora
         # try to resolve perfil from request.user
         perfil = None
         user = getattr(request, 'user', None)
@@ -34,7 +36,7 @@ def log_bitacora(request, accion, descripcion=None):
         else:
             ip = request.META.get('REMOTE_ADDR')
 
-        Bitacora.objects.create(usuario=perfil, accion=accion, descripcion=(descripcion or ''), ip_address=ip)
+        registrar_bitacora(perfil, accion, descripcion, ip, garantizado=garantizado)
     except Exception:
         # Avoid failing the main operation if logging fails
         pass
@@ -74,7 +76,7 @@ class AuditedModelViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         try:
             descripcion = self._make_description('eliminado', instance)
-            log_bitacora(self.request, f'Eliminar {instance.__class__.__name__}', descripcion)
+            log_bitacora(self.request, f'Eliminar {instance.__class__.__name__}', descripcion, garantizado=True)
         except Exception:
             pass
         instance.delete()
@@ -89,22 +91,36 @@ from .serializer import (
     CampaniaServicioSerializer, PagoSerializer, ReglaReprogramacionSerializer,
     HistorialReprogramacionSerializer, ConfiguracionGlobalReprogramacionSerializer,
     ReprogramacionSerializer, PaqueteCompletoSerializer, PaqueteSerializer, PerfilUsuarioSerializer,
-    SoporteResumenSerializer, SuscripcionSerializer, ProveedorSerializer
+    SoporteResumenSerializer, SuscripcionSerializer, ProveedorSerializer,
+    paquete_servicios_prefetch,
 )
 from .serializer import TicketSerializer, TicketDetailSerializer, TicketMessageSerializer, NotificacionSerializer
 from .serializer import BitacoraSerializer
 from .models import Ticket, TicketMessage, Notificacion
 from .utils import assign_agent_to_ticket
+from .notificaciones import marcar_leidas, no_leidas
+from . import capacidad, cupos, reglas_reprogramacion, reprogramacion
+from .catalogo import obtener_catalogo, cupos_vigentes, filtrar_catalogo, calcular_etag
+from .conditional import ConditionalGetMixin, etag_coincide
+from .pagination import KeysetPagination
+from .busqueda import buscar, buscar_ids, filtrar_ubicacion
+from .logs import log_evento, lazy, lazy_count, lazy_ids
+import logging
+
+# Mismo logger que usaban las vistas; conteos e ids se registran en DEBUG y de forma perezosa
+logger = logging.getLogger("django")
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 
 
 # =====================================================
 # 🏷️ CATEGORIA
 # =====================================================
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     permission_classes = [permissions.AllowAny]
@@ -158,8 +174,8 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             'email': request.user.email,
             'is_staff': request.user.is_staff,
             'is_active': request.user.is_active,
-            'has_perfil': hasattr(request.user, 'perfil'),
-            'perfil_id': request.user.perfil.id if hasattr(request.user, 'perfil') else None,
+            'has_perfil': get_user_perfil(request.user) is not None,
+            'perfil_id': getattr(get_user_perfil(request.user), 'id', None),
         })
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
@@ -224,13 +240,16 @@ class UsuarioViewSet(viewsets.ModelViewSet):
 # =====================================================
 # 👤 PERFIL DE USUARIO (Para clientes)
 # =====================================================
-class PerfilUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
+class PerfilUsuarioViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para mostrar perfil completo del usuario con estadísticas
     Solo permite lectura - para editar usar el endpoint usuarios
     """
     serializer_class = PerfilUsuarioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Las estadísticas dependen de las reservas; email/último acceso vienen de auth.User
+    validator_related = ('reservas', 'rol')
+    validator_extra = ('user__last_login',)
     
     def get_queryset(self):
         """Solo devolver el perfil del usuario autenticado"""
@@ -252,8 +271,12 @@ class PerfilUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        serializer = PerfilUsuarioSerializer(perfil)
-        return Response(serializer.data)
+        return self.respuesta_condicional(
+            request,
+            Usuario.objects.filter(pk=perfil.pk),
+            lambda: Response(PerfilUsuarioSerializer(perfil).data),
+            detalle=True,
+        )
     
     @action(detail=False, methods=['get'])
     def mis_reservas(self, request):
@@ -268,24 +291,27 @@ class PerfilUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         reservas = perfil.reservas.all().order_by('-created_at')
-        
-        # Serializar reservas básicas
-        reservas_data = []
-        for reserva in reservas:
-            reservas_data.append({
-                'id': reserva.id,
-                'fecha': reserva.fecha,
-                'estado': reserva.estado,
-                'total': float(reserva.total),
-                'moneda': reserva.moneda,
-                'fecha_creacion': reserva.created_at,
-                'cupon_usado': reserva.cupon.id if reserva.cupon else None
+
+        def construir():
+            # Serializar reservas básicas
+            reservas_data = []
+            for reserva in reservas:
+                reservas_data.append({
+                    'id': reserva.id,
+                    'fecha': reserva.fecha,
+                    'estado': reserva.estado,
+                    'total': float(reserva.total),
+                    'moneda': reserva.moneda,
+                    'fecha_creacion': reserva.created_at,
+                    'cupon_usado': reserva.cupon_id
+                })
+
+            return Response({
+                'count': len(reservas_data),
+                'reservas': reservas_data
             })
-        
-        return Response({
-            'count': len(reservas_data),
-            'reservas': reservas_data
-        })
+
+        return self.respuesta_condicional(request, reservas, construir, relaciones=(), extra=())
 
 
 # =====================================================
@@ -309,6 +335,14 @@ class SoportePanelViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        # Contadores frescos (el perfil resuelto puede venir de caché) en una sola consulta
+        perfil = Usuario.objects.select_related('ultimo_ticket').annotate(
+            tickets_hoy=Coalesce(Subquery(
+                Ticket.objects.filter(creador=OuterRef('pk'), created_at__date=timezone.now().date())
+                .order_by().values('creador').annotate(total=Count('pk')).values('total')
+            ), 0)
+        ).get(pk=perfil.pk)
+
         # Obtener resumen de soporte
         serializer = SoporteResumenSerializer(perfil)
         
@@ -317,9 +351,7 @@ class SoportePanelViewSet(viewsets.ViewSet):
         data['panel_info'] = {
             'puede_crear_ticket': True,
             'limite_tickets_diarios': 5,  # Configurable
-            'tickets_hoy': perfil.tickets_creados.filter(
-                created_at__date=timezone.now().date()
-            ).count(),
+            'tickets_hoy': perfil.tickets_hoy,
             'tipos_soporte': [
                 {'id': 'tecnico', 'nombre': 'Soporte Técnico'},
                 {'id': 'reservas', 'nombre': 'Problemas con Reservas'},
@@ -342,7 +374,7 @@ class SoportePanelViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        tickets = perfil.tickets_creados.all().order_by('-created_at')
+        tickets = perfil.tickets_creados.select_related('agente').order_by('-created_at')
         
         tickets_data = []
         for ticket in tickets:
@@ -354,7 +386,8 @@ class SoportePanelViewSet(viewsets.ViewSet):
                 'prioridad': ticket.prioridad,
                 'fecha_creacion': ticket.created_at,
                 'agente_asignado': ticket.agente.nombre if ticket.agente else None,
-                'mensajes_count': ticket.messages.count()
+                'mensajes_count': ticket.mensajes_count,
+                'ultima_actividad': ticket.ultima_actividad,
             })
         
         return Response({
@@ -425,25 +458,22 @@ class SoportePanelViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Obtener notificaciones de los últimos 30 días
+        # Notificaciones de los últimos 30 días, las más recientes primero y con tope
+        # (?limite=, default 50, máx. 200); el resto se pagina en /api/notificaciones/
+        try:
+            limite = min(max(int(request.query_params.get('limite', 50)), 1), 200)
+        except ValueError:
+            limite = 50
         desde = timezone.now() - timezone.timedelta(days=30)
-        notificaciones = Notificacion.objects.filter(
-            usuario=perfil,
-            created_at__gte=desde
-        ).order_by('-created_at')
-        
-        notif_data = []
-        for notif in notificaciones:
-            notif_data.append({
-                'id': notif.pk,
-                'tipo': notif.tipo,
-                'leida': notif.leida,
-                'fecha': notif.created_at,
-                'datos': notif.datos
-            })
+        notif_data = list(
+            Notificacion.objects.filter(usuario=perfil, created_at__gte=desde)
+            .order_by('-created_at', '-id')
+            .values('id', 'tipo', 'leida', 'datos', fecha=F('created_at'))[:limite]
+        )
         
         return Response({
             'count': len(notif_data),
+            'no_leidas': no_leidas(perfil.pk),
             'notificaciones': notif_data
         })
 
@@ -476,18 +506,25 @@ class CampaniaViewSet(viewsets.ModelViewSet):
 # =====================================================
 # 📦 PAQUETES TURÍSTICOS (Nuevo modelo)
 # =====================================================
-class PaqueteViewSet(viewsets.ReadOnlyModelViewSet):
+class PaqueteViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para paquetes turísticos completos con servicios/destinos incluidos
     Permite listar, ver detalle y filtrar paquetes disponibles
     """
-    queryset = Paquete.objects.prefetch_related(
-        'servicios__categoria', 
-        'paqueteservicio_set__servicio__categoria',
-        'campania'
-    ).all()
+    queryset = (
+        Paquete.objects
+        .select_related('campania')
+        .prefetch_related(paquete_servicios_prefetch())
+        .all()
+    )
     serializer_class = PaqueteSerializer
     permission_classes = [permissions.AllowAny]
+    # El listado público usa el ETag del catálogo; detalle y mis_paquetes usan el mixin
+    validator_related = (
+        'campania', 'paqueteservicio', 'paqueteservicio__servicio',
+        'paqueteservicio__servicio__categoria',
+    )
+    validator_diario = True  # disponibilidad.esta_vigente depende de hoy
     
     def get_queryset(self):
         """Filtros personalizados para paquetes turísticos"""
@@ -528,30 +565,47 @@ class PaqueteViewSet(viewsets.ReadOnlyModelViewSet):
         if duracion:
             queryset = queryset.filter(duracion__icontains=duracion)
         
-        return queryset
+        # Búsqueda de texto ordenada por relevancia
+        return buscar(queryset, self.request.query_params.get('q'))
     
+    def _respuesta_catalogo(self, request, seleccionar=None):
+        """Responde desde el catálogo precalculado con soporte de ETag/If-None-Match.
+
+        seleccionar: función opcional aplicada a la lista ya filtrada por query params.
+        Con ?q= solo quedan las coincidencias, ordenadas por relevancia (busqueda.py).
+        """
+        version, paquetes = obtener_catalogo()
+        cupos = cupos_vigentes()
+        etag = calcular_etag(version, request, cupos)
+        if etag_coincide(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = filtrar_catalogo(paquetes, request.query_params, cupos=cupos)
+        consulta = request.query_params.get('q', '').strip()
+        if consulta:
+            posiciones = {pk: i for i, pk in enumerate(buscar_ids(Paquete.objects.all(), consulta))}
+            data = sorted((p for p in data if p['id'] in posiciones), key=lambda p: posiciones[p['id']])
+        if seleccionar:
+            data = seleccionar(data)
+        return Response(data, headers={'ETag': etag})
+
+    def list(self, request, *args, **kwargs):
+        """Listado público servido desde el catálogo precalculado"""
+        return self._respuesta_catalogo(request)
+
     @action(detail=False, methods=['get'], url_path='destacados')
     def destacados(self, request):
         """Endpoint para obtener solo paquetes destacados"""
-        paquetes_destacados = self.get_queryset().filter(destacado=True)[:6]
-        serializer = self.get_serializer(paquetes_destacados, many=True)
-        return Response(serializer.data)
+        return self._respuesta_catalogo(
+            request, lambda data: [p for p in data if p.get('destacado')][:6]
+        )
     
     @action(detail=False, methods=['get'], url_path='disponibles')
     def disponibles(self, request):
         """Endpoint para obtener solo paquetes disponibles para reservar"""
-        from django.utils import timezone
-        hoy = timezone.now().date()
-        
-        paquetes_disponibles = self.get_queryset().filter(
-            estado='Activo',
-            fecha_inicio__lte=hoy,
-            fecha_fin__gte=hoy,
-            cupos_ocupados__lt=models.F('cupos_disponibles')
+        return self._respuesta_catalogo(
+            request, lambda data: [p for p in data if p['disponibilidad']['esta_disponible']]
         )
-        
-        serializer = self.get_serializer(paquetes_disponibles, many=True)
-        return Response(serializer.data)
     
     @action(detail=True, methods=['get'], url_path='itinerario')
     def itinerario_detallado(self, request, pk=None):
@@ -601,7 +655,7 @@ class PaqueteViewSet(viewsets.ReadOnlyModelViewSet):
         (Reserva.paquete != NULL) como cliente. No modifica ni interfiere con
         otros casos de uso (paquetes públicos, reservas individuales, etc.).
         """
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = get_user_perfil(request.user)
         if not perfil:
             return Response([], status=200)
 
@@ -609,8 +663,33 @@ class PaqueteViewSet(viewsets.ReadOnlyModelViewSet):
             reservas__cliente=perfil
         ).distinct().order_by('-created_at')
 
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        return self.respuesta_condicional(
+            request, qs, lambda: Response(self.get_serializer(qs, many=True).data)
+        )
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def retener_cupo(self, request, pk=None):
+        """Aparta un cupo mientras el cliente completa el checkout (ver condominio/cupos.py).
+
+        La reserva lo confirma enviando retencion_id; si no se confirma, vence solo.
+        """
+        if not Paquete.objects.filter(pk=pk, estado='Activo').exists():
+            return Response({'error': 'Paquete no disponible'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            retencion = cupos.retener(pk, usuario=get_user_perfil(request.user))
+        except cupos.CuposAgotados:
+            return Response({'error': 'No quedan cupos disponibles'}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'retencion_id': retencion.pk,
+            'paquete_id': retencion.paquete_id,
+            'expira_en': retencion.expira_en,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def liberar_cupo(self, request, pk=None):
+        """Devuelve un cupo retenido cuando el cliente abandona el checkout."""
+        liberado = cupos.cancelar_retencion(request.data.get('retencion_id'), usuario=get_user_perfil(request.user))
+        return Response({'liberado': liberado})
 
 
 # =====================================================
@@ -627,10 +706,52 @@ class CuponViewSet(viewsets.ModelViewSet):
 # =====================================================
 # 🏞️ SERVICIO
 # =====================================================
-class ServicioViewSet(viewsets.ModelViewSet):
+class ServicioViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Servicio.objects.select_related('categoria').all()
     serializer_class = ServicioSerializer
     permission_classes = [permissions.AllowAny]
+    validator_related = ('categoria', 'proveedor', 'proveedor__rol')
+
+    def get_queryset(self):
+        """Búsqueda de texto (?q=, por relevancia) y ubicación tolerante a errores"""
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        queryset = filtrar_ubicacion(queryset, 'departamento', params.get('departamento'))
+        queryset = filtrar_ubicacion(queryset, 'ciudad', params.get('ciudad'))
+        return buscar(queryset, params.get('q'))
+
+    @action(detail=False, methods=['get'])
+    def disponibilidad(self, request):
+        """Lugares libres por fecha de varios servicios (ver condominio/capacidad.py).
+
+        GET /api/servicios/disponibilidad/?servicios=1,2,3&desde=2026-11-01&hasta=2026-11-30
+        """
+        params = request.query_params
+        try:
+            servicio_ids = sorted({int(pk) for pk in params.get('servicios', '').split(',') if pk.strip()})
+        except ValueError:
+            return Response({'error': 'servicios debe ser una lista de ids separados por coma'}, status=status.HTTP_400_BAD_REQUEST)
+        desde = parse_date(params.get('desde') or '') or timezone.localdate()
+        hasta = parse_date(params.get('hasta') or '') or desde
+        if not servicio_ids or len(servicio_ids) > capacidad.MAX_SERVICIOS:
+            return Response({'error': f'Indique entre 1 y {capacidad.MAX_SERVICIOS} servicios'}, status=status.HTTP_400_BAD_REQUEST)
+        if hasta < desde or (hasta - desde).days >= capacidad.MAX_DIAS:
+            return Response({'error': f'El rango debe tener entre 1 y {capacidad.MAX_DIAS} días'}, status=status.HTTP_400_BAD_REQUEST)
+
+        libres = capacidad.disponibilidad(servicio_ids, desde, hasta)
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'servicios': [
+                {
+                    'servicio_id': pk,
+                    'capacidad_max': datos['capacidad_max'],
+                    'dias': {fecha.isoformat(): n for fecha, n in datos['dias'].items()},
+                }
+                for pk, datos in libres.items()
+            ],
+        })
 
 
 
@@ -638,14 +759,32 @@ class ServicioViewSet(viewsets.ModelViewSet):
 # =====================================================
 # 🧾 RESERVA
 # =====================================================
+# Relaciones que ReservaSerializer anida (cliente/cupón/paquete/servicio y sus FKs)
+RESERVA_SELECT_RELATED = (
+    'cliente__rol', 'cupon__campania', 'paquete__campania',
+    'servicio__categoria', 'servicio__proveedor__rol', 'reprogramado_por',
+)
+ESTADOS_RESERVA_ACTIVOS = ['PENDIENTE', 'CONFIRMADA', 'PAGADA', 'REPROGRAMADA']
+
+
+def respuesta_sin_capacidad(error):
+    return Response({
+        'error': f'El servicio no tiene lugares disponibles el {error.fecha}',
+        'servicio_id': error.servicio_id,
+        'fecha': error.fecha,
+    }, status=status.HTTP_409_CONFLICT)
+
+
 class ReservaViewSet(AuditedModelViewSet):
     queryset = (
         Reserva.objects
-        .select_related('cliente', 'cupon', 'paquete', 'servicio')
+        .select_related(*RESERVA_SELECT_RELATED)
+        .prefetch_related(paquete_servicios_prefetch('paquete__'))
         .all()
     )
     serializer_class = ReservaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['cliente__nombre', 'estado', 'moneda']
     filterset_fields = ['estado', 'moneda', 'cliente']
@@ -658,13 +797,27 @@ class ReservaViewSet(AuditedModelViewSet):
         data['estado'] = 'PAGADA'
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        try:
+            self.perform_create(serializer)
+        except cupos.CuposAgotados:
+            return Response({'error': 'No quedan cupos disponibles en el paquete'}, status=status.HTTP_409_CONFLICT)
+        except capacidad.CapacidadAgotada as error:
+            return respuesta_sin_capacidad(error)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         """Crear la reserva y registrar Bitacora incluyendo paquete_id/servicio_id si aplica."""
-        instance = serializer.save()
+        with transaction.atomic():
+            instance = serializer.save()
+            capacidad.verificar(capacidad.lugares_de(instance))
+            if instance.paquete_id:
+                # Último paso antes del COMMIT: la fila del paquete queda bloqueada lo mínimo
+                retencion_id = self.request.data.get('retencion_id')
+                if retencion_id:
+                    cupos.confirmar(retencion_id, instance.paquete_id, usuario=get_user_perfil(self.request.user))
+                else:
+                    cupos.ocupar(instance.paquete_id)
         try:
             # Intentar obtener ids desde la instancia o desde el payload
             paquete_id = getattr(getattr(instance, 'paquete', None), 'id', None) or getattr(instance, 'paquete_id', None) or self.request.data.get('paquete_id')
@@ -676,36 +829,182 @@ class ReservaViewSet(AuditedModelViewSet):
             if servicio_id:
                 descripcion += f" servicio_id={servicio_id}"
 
-            log_bitacora(self.request, 'Crear Reserva', descripcion)
+            log_bitacora(self.request, 'Crear Reserva', descripcion, garantizado=True)
         except Exception:
             # No bloquear creación por errores de bitácora
             pass
 
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except cupos.CuposAgotados:
+            return Response({'error': 'No quedan cupos disponibles en el paquete'}, status=status.HTTP_409_CONFLICT)
+        except capacidad.CapacidadAgotada as error:
+            return respuesta_sin_capacidad(error)
+
+    def perform_update(self, serializer):
+        """Cancelar, reactivar, reprogramar o cambiar de paquete mueve el cupo y el lugar
+        del servicio en la misma transacción."""
+        anterior = cupos.cupo_de(serializer.instance)
+        lugar_anterior = capacidad.lugar(serializer.instance)
+        ocupaba = capacidad.ocupa(serializer.instance)
+        with transaction.atomic():
+            instance = serializer.save()
+            lugar_actual = capacidad.lugar(instance)
+            if not ocupaba:
+                capacidad.verificar(capacidad.lugares_de(instance))
+            elif lugar_actual and lugar_actual != lugar_anterior:
+                # Reprogramada: también aplica la regla CAPACIDAD_MAXIMA
+                rol = reglas_reprogramacion.rol_de(self.request.user, get_user_perfil(self.request.user))
+                capacidad.verificar([lugar_actual], limite=capacidad.limite_reprogramacion(instance, rol))
+            cupos.mover_cupo(anterior, cupos.cupo_de(instance))
+        try:
+            log_bitacora(self.request, 'Actualizar Reserva', self._make_description('actualizado', instance))
+        except Exception:
+            pass
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            cupos.devolver(cupos.cupo_de(instance))
+
+    @action(detail=True, methods=['post'])
+    def reprogramar(self, request, pk=None):
+        """Reprograma la reserva si cumple las reglas vigentes (ver reglas_reprogramacion.py).
+
+        POST /api/reservas/{id}/reprogramar/ {"nueva_fecha": "2026-11-20T09:00", "motivo": "..."}
+        nueva_fecha puede ser solo fecha; entonces se conserva la hora del servicio.
+        """
+        reserva = self.get_object()
+        texto = str(request.data.get('nueva_fecha') or '')
+        nueva = parse_datetime(texto) or parse_date(texto)
+        if nueva is None:
+            return Response({'error': 'nueva_fecha inválida (AAAA-MM-DD o ISO 8601)'}, status=status.HTTP_400_BAD_REQUEST)
+        if reserva.estado in ('CANCELADA', 'COMPLETADA'):
+            return Response({'error': f'No se puede reprogramar una reserva {reserva.estado}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        perfil = get_user_perfil(request.user)
+        evaluador = reglas_reprogramacion.evaluador(reglas_reprogramacion.rol_de(request.user, perfil))
+        resultado = evaluador.validar(reserva, nueva, reglas_reprogramacion.reprogramaciones_hoy(perfil))
+        if not resultado['valida']:
+            return Response({
+                'error': 'La reprogramación no cumple las reglas vigentes',
+                'errores': resultado['errores'],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        anterior = reserva.fecha_inicio or reglas_reprogramacion.momento(reserva.fecha)
+        if isinstance(nueva, datetime):
+            inicio = reglas_reprogramacion.momento(nueva)
+        else:
+            inicio = anterior + timedelta(days=(nueva - reserva.fecha).days)
+        desplazamiento = inicio - anterior
+        reserva.fecha = timezone.localtime(inicio).date()
+        if reserva.fecha_inicio:
+            reserva.fecha_inicio = inicio
+        if reserva.fecha_fin:
+            reserva.fecha_fin += desplazamiento
+        reserva.fecha_original = reserva.fecha_original or anterior
+        reserva.fecha_reprogramacion = timezone.now()
+        reserva.numero_reprogramaciones += 1
+        reserva.motivo_reprogramacion = request.data.get('motivo') or None
+        reserva.reprogramado_por = perfil
+        reserva.estado = 'REPROGRAMADA'
+        try:
+            with transaction.atomic():
+                reserva.save()
+                HistorialReprogramacion.objects.create(
+                    reserva=reserva, fecha_anterior=anterior, fecha_nueva=inicio,
+                    motivo=reserva.motivo_reprogramacion, reprogramado_por=perfil,
+                )
+                if capacidad.lugar(reserva):
+                    capacidad.verificar([capacidad.lugar(reserva)], limite=evaluador.valor('CAPACIDAD_MAXIMA', reserva))
+        except capacidad.CapacidadAgotada as error:
+            return respuesta_sin_capacidad(error)
+
+        log_bitacora(request, 'Reprogramar Reserva', f"Reserva id={reserva.pk} reprogramada al {reserva.fecha}")
+        return Response({
+            'reserva': self.get_serializer(reserva).data,
+            'penalizacion': resultado['penalizacion'],
+        })
+
+    @action(detail=False, methods=['post'])
+    def reprogramar_lote(self, request):
+        """Reprograma todas las reservas de un servicio o paquete en una fecha (ver reprogramacion.py).
+
+        POST /api/reservas/reprogramar_lote/
+        {"servicio_id" | "paquete_id", "fecha", "nueva_fecha", "motivo", "simular": true}
+        Solo administradores y operadores. simular=true devuelve la vista previa sin cambios.
+        """
+        perfil = get_user_perfil(request.user)
+        rol = reglas_reprogramacion.rol_de(request.user, perfil)
+        if rol not in ('ADMIN', 'OPERADOR'):
+            return Response({'error': 'Solo administradores u operadores'}, status=status.HTTP_403_FORBIDDEN)
+
+        datos = request.data
+        fecha = parse_date(str(datos.get('fecha') or ''))
+        nueva_fecha = parse_date(str(datos.get('nueva_fecha') or ''))
+        try:
+            servicio_id, paquete_id = (
+                int(datos[campo]) if datos.get(campo) not in (None, '') else None
+                for campo in ('servicio_id', 'paquete_id')
+            )
+        except (TypeError, ValueError):
+            return Response({'error': 'servicio_id y paquete_id deben ser ids numéricos'}, status=status.HTTP_400_BAD_REQUEST)
+        if not fecha or not nueva_fecha or fecha == nueva_fecha:
+            return Response({'error': 'fecha y nueva_fecha (AAAA-MM-DD, distintas) son requeridas'}, status=status.HTTP_400_BAD_REQUEST)
+        if bool(servicio_id) == bool(paquete_id):
+            return Response({'error': 'Indique servicio_id o paquete_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        simular = str(datos.get('simular', '')).lower() in ('1', 'true', 'si', 'yes')
+        try:
+            resumen = reprogramacion.reprogramar_lote(
+                fecha, nueva_fecha, perfil, rol, servicio_id=servicio_id, paquete_id=paquete_id,
+                motivo=datos.get('motivo') or None, simular=simular,
+            )
+        except capacidad.CapacidadAgotada as error:
+            return respuesta_sin_capacidad(error)
+
+        if not simular and resumen['reprogramadas']:
+            objetivo = f"servicio_id={servicio_id}" if servicio_id else f"paquete_id={paquete_id}"
+            log_bitacora(
+                request, 'Reprogramar Reservas en Lote',
+                f"{len(resumen['reprogramadas'])} reservas {objetivo} del {fecha} al {nueva_fecha}",
+            )
+        return Response(resumen)
+
     # ===============================
     # FILTRAR SEGÚN USUARIO AUTENTICADO
     # ===============================
     def get_queryset(self):
         queryset = super().get_queryset()
         user = self.request.user
-        import logging
-        logger = logging.getLogger("django")
+        evento = 'ReservaViewSet.get_queryset'
         # Solo admins y soporte pueden ver todas las reservas
         if user.is_authenticated:
             perfil = get_user_perfil(user)
-            logger.info(f"[ReservaViewSet.get_queryset] user={user} perfil={perfil} rol={(getattr(perfil, 'rol', None))} rol_nombre={(getattr(getattr(perfil, 'rol', None), 'nombre', None))}")
+            log_evento(
+                logger, logging.INFO, evento, user=user, perfil=perfil,
+                rol_nombre=lazy(lambda: getattr(getattr(perfil, 'rol', None), 'nombre', None)),
+            )
             admin_roles = ['admin', 'soporte', 'administrador']
             if perfil and hasattr(perfil, 'rol') and perfil.rol and perfil.rol.nombre.lower() in admin_roles:
-                logger.info(f"[ReservaViewSet.get_queryset] ADMIN/SOPORTE: queryset count={queryset.count()} ids={[r.id for r in queryset]}")
+                log_evento(
+                    logger, logging.DEBUG, evento, muestreo=0.1, alcance='ADMIN/SOPORTE',
+                    count=lazy_count(queryset), ids=lazy_ids(queryset),
+                )
                 return queryset
             elif perfil:
                 filtered = queryset.filter(cliente=perfil)
-                logger.info(f"[ReservaViewSet.get_queryset] CLIENTE: queryset count={filtered.count()} ids={[r.id for r in filtered]}")
+                log_evento(
+                    logger, logging.DEBUG, evento, alcance='CLIENTE',
+                    count=lazy_count(filtered), ids=lazy_ids(filtered),
+                )
                 return filtered
             else:
-                logger.info(f"[ReservaViewSet.get_queryset] SIN PERFIL: queryset vacío")
+                log_evento(logger, logging.INFO, evento, alcance='SIN PERFIL', resultado='queryset vacío')
                 return queryset.none()
         # Si no está autenticado, no ve nada
-        logger.info(f"[ReservaViewSet.get_queryset] NO AUTENTICADO: queryset vacío")
+        log_evento(logger, logging.INFO, evento, alcance='NO AUTENTICADO', resultado='queryset vacío')
         return queryset.none()
 
     # ===============================
@@ -713,15 +1012,13 @@ class ReservaViewSet(AuditedModelViewSet):
     # ===============================
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def mis_reservas(self, request):
-        import logging
-        logger = logging.getLogger("django")
         user = request.user
         perfil = get_user_perfil(user)
 
-        logger.info(f"[mis_reservas] user={user} perfil={perfil} perfil_id={getattr(perfil, 'id', None)}")
+        log_evento(logger, logging.INFO, 'mis_reservas', user=user, perfil_id=getattr(perfil, 'id', None))
 
         if not perfil:
-            logger.info("[mis_reservas] No se encontró el perfil del usuario")
+            log_evento(logger, logging.INFO, 'mis_reservas', resultado='sin perfil')
             return Response(
                 {'error': 'No se encontró el perfil del usuario'},
                 status=status.HTTP_404_NOT_FOUND
@@ -729,47 +1026,56 @@ class ReservaViewSet(AuditedModelViewSet):
 
         reservas = (
             Reserva.objects.filter(cliente=perfil)
-            .select_related('cliente', 'cupon', 'paquete', 'servicio')
-            .prefetch_related('visitantes__visitante')
+            .select_related(*RESERVA_SELECT_RELATED)
+            .prefetch_related('visitantes__visitante', paquete_servicios_prefetch('paquete__'))
             .order_by('-created_at')
         )
 
-        logger.info(f"[mis_reservas] reservas count={reservas.count()} ids={[r.id for r in reservas]}")
-
         estado = request.query_params.get('estado')
         if estado:
             reservas = reservas.filter(estado__iexact=estado)
-            logger.info(f"[mis_reservas] filtro estado={estado} count={reservas.count()}")
 
         fecha_desde = request.query_params.get('fecha_desde')
         if fecha_desde:
             reservas = reservas.filter(fecha__gte=fecha_desde)
-            logger.info(f"[mis_reservas] filtro fecha_desde={fecha_desde} count={reservas.count()}")
 
         fecha_hasta = request.query_params.get('fecha_hasta')
         if fecha_hasta:
             reservas = reservas.filter(fecha__lte=fecha_hasta)
-            logger.info(f"[mis_reservas] filtro fecha_hasta={fecha_hasta} count={reservas.count()}")
 
-        serializer = ReservaSerializer(reservas, many=True)
+        log_evento(logger, logging.DEBUG, 'mis_reservas', estado=estado, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta)
+
+        pagina = self.paginate_queryset(reservas)
+        serializer = ReservaSerializer(pagina, many=True)
 
+        # Todas las estadísticas en una sola consulta con agregados condicionales
+        conteos = reservas.order_by().aggregate(
+            total_reservas=Count('id'),
+            activas=Count('id', filter=Q(estado__in=ESTADOS_RESERVA_ACTIVOS)),
+            **{f'estado_{clave}': Count('id', filter=Q(estado=clave)) for clave, _ in Reserva.ESTADOS},
+        )
         stats = {
-            'total_reservas': reservas.count(),
+            'total_reservas': conteos['total_reservas'],
             'por_estado': {
-                nombre: reservas.filter(estado=clave).count()
+                nombre: conteos[f'estado_{clave}']
                 for clave, nombre in Reserva.ESTADOS
             },
-            'activas': reservas.filter(estado__in=['PENDIENTE', 'CONFIRMADA', 'PAGADA', 'REPROGRAMADA']).count(),
-            'completadas': reservas.filter(estado='COMPLETADA').count(),
-            'canceladas': reservas.filter(estado='CANCELADA').count(),
+            'activas': conteos['activas'],
+            'completadas': conteos['estado_COMPLETADA'],
+            'canceladas': conteos['estado_CANCELADA'],
         }
 
         data = {
             'estadisticas': stats,
-            'reservas': serializer.data
+            'reservas': serializer.data,
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
         }
 
-        logger.info(f"[mis_reservas] respuesta enviada reservas={len(serializer.data)}")
+        log_evento(
+            logger, logging.INFO, 'mis_reservas', total=stats['total_reservas'],
+            pagina=len(serializer.data), ids=lazy(lambda: [r.pk for r in pagina]),
+        )
 
         return Response(data, status=status.HTTP_200_OK)
     # ===============================
@@ -785,9 +1091,10 @@ class ReservaViewSet(AuditedModelViewSet):
         reservas_activas = (
             Reserva.objects.filter(
                 cliente=perfil,
-                estado__in=['PENDIENTE', 'CONFIRMADA', 'PAGADA', 'REPROGRAMADA']
+                estado__in=ESTADOS_RESERVA_ACTIVOS
             )
-            .select_related('cliente', 'cupon', 'paquete', 'servicio')
+            .select_related(*RESERVA_SELECT_RELATED)
+            .prefetch_related(paquete_servicios_prefetch('paquete__'))
             .order_by('-created_at')
         )
         serializer = ReservaSerializer(reservas_activas, many=True)
@@ -798,6 +1105,12 @@ class ReservaViewSet(AuditedModelViewSet):
     # ===============================
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def historial_completo(self, request):
+        """Reservas del cliente con su historial de reprogramaciones, paginadas por cursor.
+
+        Consultas fijas por página: total (COUNT sobre el índice de cliente), reservas
+        (con relaciones por JOIN), historial (con reprogramado_por) e itinerario de los
+        paquetes anidados. `count` es el total de reservas del cliente, no el de la página.
+        """
         user = request.user
         perfil = get_user_perfil(user)
         if not perfil:
@@ -805,15 +1118,21 @@ class ReservaViewSet(AuditedModelViewSet):
 
         reservas = (
             Reserva.objects.filter(cliente=perfil)
-            .select_related('cliente', 'cupon', 'paquete', 'servicio', 'reprogramado_por')
-            .prefetch_related('historial_reprogramaciones')
-            .order_by('-created_at')
+            .select_related(*RESERVA_SELECT_RELATED)
+            .prefetch_related(
+                Prefetch(
+                    'historial_reprogramaciones',
+                    queryset=HistorialReprogramacion.objects.select_related('reprogramado_por'),
+                ),
+                paquete_servicios_prefetch('paquete__'),
+            )
         )
+        total = reservas.count()
+        pagina = self.paginate_queryset(reservas)
 
         historial_data = []
-        for reserva in reservas:
-            reserva_data = dict(ReservaSerializer(reserva).data)
-            historiales = HistorialReprogramacion.objects.filter(reserva=reserva)
+        for reserva, reserva_data in zip(pagina, ReservaSerializer(pagina, many=True).data):
+            reserva_data = dict(reserva_data)
             reserva_data['historial_reprogramaciones'] = [
                 {
                     'fecha_anterior': h.fecha_anterior,
@@ -822,10 +1141,15 @@ class ReservaViewSet(AuditedModelViewSet):
                     'reprogramado_por': h.reprogramado_por.nombre if h.reprogramado_por else None,
                     'fecha_cambio': h.created_at
                 }
-                for h in historiales
+                for h in reserva.historial_reprogramaciones.all()
             ]
             historial_data.append(reserva_data)
-        return Response({'count': len(historial_data), 'historial': historial_data})
+        return Response({
+            'count': total,
+            'historial': historial_data,
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        })
 
 
 
@@ -948,7 +1272,7 @@ class TicketViewSet(AuditedModelViewSet):
     def perform_create(self, serializer):
         user = self.request.user
         try:
-            perfil = getattr(user, "perfil", None)
+            perfil = get_user_perfil(user)
         except Exception:
             perfil = None
 
@@ -958,7 +1282,7 @@ class TicketViewSet(AuditedModelViewSet):
     def get_queryset(self):
         user = self.request.user
         try:
-            perfil = getattr(user, "perfil", None)
+            perfil = get_user_perfil(user)
         except Exception:
             return Ticket.objects.none()
 
@@ -983,7 +1307,7 @@ class TicketMessageViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         user = self.request.user
         try:
-            perfil = getattr(user, "perfil", None)
+            perfil = get_user_perfil(user)
         except Exception:
             perfil = None
 
@@ -999,27 +1323,85 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     queryset = Notificacion.objects.all()
     serializer_class = NotificacionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
         try:
-            perfil = getattr(user, "perfil", None)
+            perfil = get_user_perfil(user)
         except Exception:
             return Notificacion.objects.none()
-        return Notificacion.objects.filter(usuario=perfil)
+        qs = Notificacion.objects.filter(usuario=perfil)
+        leida = self.request.query_params.get('leida')
+        if leida is not None:
+            # leida=false usa el índice parcial notif_no_leidas_idx
+            qs = qs.filter(leida=leida.lower() in ('1', 'true', 'si'))
+        return qs
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         noti = self.get_object()
-        noti.leida = True
-        noti.save()
+        marcar_leidas(noti.usuario_id, ids=[noti.pk])
         return Response({'status': 'leida'})
 
+    @action(detail=False, methods=['post'], url_path='mark_read')
+    def mark_read_ids(self, request):
+        """Marca como leídas las notificaciones indicadas en {"ids": [...]} (un solo UPDATE)."""
+        perfil = get_user_perfil(request.user)
+        ids = request.data.get('ids')
+        if not perfil:
+            return Response({'error': 'No se encontró el perfil del usuario'}, status=status.HTTP_404_NOT_FOUND)
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response({'error': 'ids debe ser una lista de enteros'}, status=status.HTTP_400_BAD_REQUEST)
+        marcadas = marcar_leidas(perfil.pk, ids=ids)
+        return Response({'marcadas': marcadas, 'no_leidas': no_leidas(perfil.pk)})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        perfil = get_user_perfil(request.user)
+        if not perfil:
+            return Response({'error': 'No se encontró el perfil del usuario'}, status=status.HTTP_404_NOT_FOUND)
+        marcadas = marcar_leidas(perfil.pk)
+        return Response({'marcadas': marcadas, 'no_leidas': no_leidas(perfil.pk)})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Badge de no leídas: perfil y contador salen de la caché."""
+        perfil = get_user_perfil(request.user)
+        if not perfil:
+            return Response({'error': 'No se encontró el perfil del usuario'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'no_leidas': no_leidas(perfil.pk)})
+
 
 class BitacoraViewSet(viewsets.ModelViewSet):
-    queryset = __import__('condominio.models', fromlist=['Bitacora']).Bitacora.objects.all()
+    queryset = __import__('condominio.models', fromlist=['Bitacora']).Bitacora.objects.select_related('usuario__user').all()
     serializer_class = BitacoraSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        """?desde=/&hasta= (YYYY-MM-DD) acotan created_at: en PostgreSQL solo se leen esas particiones."""
+        queryset = super().get_queryset()
+        desde, hasta = self._fecha('desde'), self._fecha('hasta')
+        # Rangos sobre la columna (sin __date) para que apliquen índice y poda de particiones
+        if desde:
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+        if hasta:
+            queryset = queryset.filter(created_at__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)))
+        return queryset
+
+    def _fecha(self, nombre):
+        """Parámetro YYYY-MM-DD opcional; uno mal formado responde 400 (no se ignora)."""
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        try:
+            fecha = parse_date(valor)
+        except ValueError:
+            fecha = None
+        if fecha is None:
+            raise serializers.ValidationError({nombre: 'Fecha inválida, use YYYY-MM-DD'})
+        return fecha
 
 
 # ============================================
@@ -1048,11 +1430,12 @@ class FCMDeviceViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Usuarios normales solo ven sus propios dispositivos."""
         user = self.request.user
-        if user.is_staff or (hasattr(user, 'perfil') and user.perfil.rol and user.perfil.rol.nombre.lower() in ['admin', 'administrador', 'soporte']):
+        perfil = get_user_perfil(user)
+        if user.is_staff or (perfil and perfil.rol and perfil.rol.nombre.lower() in ['admin', 'administrador', 'soporte']):
             return FCMDevice.objects.all()
         
-        if hasattr(user, 'perfil') and user.perfil:
-            return FCMDevice.objects.filter(usuario=user.perfil)
+        if perfil:
+            return FCMDevice.objects.filter(usuario=perfil)
         
         return FCMDevice.objects.none()
     
@@ -1084,7 +1467,7 @@ class FCMDeviceViewSet(viewsets.ModelViewSet):
         # Obtener usuario autenticado (si existe)
         perfil = None
         if request.user.is_authenticated:
-            perfil = getattr(request.user, 'perfil', None)
+            perfil = get_user_perfil(request.user)
         
         if not perfil:
             return Response(
@@ -1236,7 +1619,7 @@ class CampanaNotificacionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = get_user_perfil(request.user)
         ejecutor_id = perfil.id if perfil else None
         
         if campana.enviar_inmediatamente or not campana.fecha_programada:
@@ -1278,7 +1661,7 @@ class CampanaNotificacionViewSet(viewsets.ModelViewSet):
         campana = self.get_object()
         
         # Obtener perfil del usuario actual
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = get_user_perfil(request.user)
         if not perfil:
             return Response(
                 {'error': 'Usuario no tiene perfil asociado'},
@@ -1372,7 +1755,12 @@ class ReservaMultiServicioView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = ReservaConServiciosSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        reserva = serializer.save()
+        try:
+            with transaction.atomic():
+                reserva = serializer.save()
+                capacidad.verificar(capacidad.lugares_de(reserva))
+        except capacidad.CapacidadAgotada as error:
+            return respuesta_sin_capacidad(error)
         # Re-serializar con un serializer de salida que no incluye el campo de entrada 'servicios'
         out = ReservaSalidaSerializer(reserva)
         return Response(out.data, status=status.HTTP_201_CREATED)
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from .models import FCMDevice
+from .perfiles import resolver_perfil
 
 
 class FCMDeviceSerializer(serializers.ModelSerializer):
@@ -17,13 +18,13 @@ class FCMDeviceViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        perfil = getattr(self.request.user, 'perfil', None)
+        perfil = resolver_perfil(self.request.user)
         if not perfil:
             return FCMDevice.objects.none()
         return FCMDevice.objects.filter(usuario=perfil)
 
     def perform_create(self, serializer):
-        perfil = getattr(self.request.user, 'perfil', None)
+        perfil = resolver_perfil(self.request.user)
         serializer.save(usuario=perfil)
     
     def get_permissions(self):
@@ -61,7 +62,7 @@ class FCMDeviceViewSet(viewsets.ModelViewSet):
         
         # Si hay usuario autenticado, usarlo
         if request.user.is_authenticated:
-            perfil = getattr(request.user, 'perfil', None)
+            perfil = resolver_perfil(request.user)
             if not perfil:
                 return Response({'error': 'Usuario autenticado sin perfil'}, status=400)
         # Si no hay usuario autenticado pero se envió usuario_id, usarlo
@@ -13,6 +13,9 @@ class CondominioConfig(AppConfig):
         
         # Iniciar el programador de backups automáticos (SOLO UNA VEZ)
         self.start_automatic_backups()
+
+        # Despachador de webhooks de Stripe en este proceso (solo con STRIPE_BANDEJA_EN_PROCESO)
+        self.start_stripe_dispatcher()
         
         # ⚠️ DESHABILITADO: El scheduler ahora corre como comando separado en Procfile
         # self.start_campaign_scheduler()
@@ -52,6 +55,17 @@ class CondominioConfig(AppConfig):
                 except Exception as e:
                     print(f"🎯 APPS.PY - Error: {e}")
 
+    def start_stripe_dispatcher(self):
+        """
+        Inicia el despachador de la bandeja de webhooks de Stripe si
+        STRIPE_BANDEJA_EN_PROCESO está activo. Sin él la bandeja la procesa
+        el worker `procesar_webhooks_stripe --continuo`.
+        """
+        from core.bandeja_stripe import bandeja
+
+        if bandeja.iniciar():
+            print("✅ Despachador de webhooks de Stripe iniciado en este proceso")
+
     def start_campaign_scheduler(self):
         """
         Inicia el programador de campañas programadas una sola vez
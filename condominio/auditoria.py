@@ -0,0 +1,183 @@
+"""
+Escritura de Bitácora en lotes, fuera del camino de la petición.
+
+registrar_bitacora() encola la entrada en memoria (por proceso) y un hilo de fondo la
+persiste con bulk_create cuando se juntan BITACORA_LOTE entradas o pasan
+BITACORA_INTERVALO segundos. Al terminar el proceso (atexit) se vacía la cola de forma
+síncrona.
+
+Modo garantizado (garantizado=True): la entrada se escribe en el momento, dentro de la
+transacción de quien la registra. Usarlo para acciones que nunca deben perderse
+(cambios de roles, habilitación de usuarios, reservas, eliminaciones).
+
+Nunca se descartan entradas: si la cola supera BITACORA_MAX_PENDIENTES o el hilo no
+puede arrancar, se escribe de forma síncrona; si un lote falla se reintenta entrada por
+entrada y las que vuelven a fallar regresan al frente de la cola para el próximo flush.
+
+Settings:
+    BITACORA_ASINCRONA: False para escribir siempre de forma síncrona (default True;
+        `manage.py test` lo fija en False, ver config/test_runner.py).
+    BITACORA_LOTE: entradas por lote (default 50).
+    BITACORA_INTERVALO: segundos máximos que una entrada espera en cola (default 2).
+    BITACORA_MAX_PENDIENTES: tope de la cola en memoria (default 10000).
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOTE_DEFAULT = 50
+INTERVALO_DEFAULT = 2.0
+MAX_PENDIENTES_DEFAULT = 10000
+
+
+class EscritorBitacora:
+    def __init__(self):
+        self._pendientes = deque()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+    # ------------------------------------------------------------------
+    # Configuración
+    # ------------------------------------------------------------------
+    @property
+    def asincrona(self):
+        return getattr(settings, 'BITACORA_ASINCRONA', True)
+
+    @property
+    def lote(self):
+        return getattr(settings, 'BITACORA_LOTE', LOTE_DEFAULT)
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'BITACORA_INTERVALO', INTERVALO_DEFAULT)
+
+    @property
+    def max_pendientes(self):
+        return getattr(settings, 'BITACORA_MAX_PENDIENTES', MAX_PENDIENTES_DEFAULT)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def registrar(self, usuario=None, accion='', descripcion=None, ip_address=None, garantizado=False):
+        """Registra una entrada; retorna la instancia (sin pk si quedó en cola)."""
+        from .models import Bitacora
+
+        entrada = Bitacora(
+            usuario_id=getattr(usuario, 'pk', usuario),
+            accion=accion,
+            descripcion=descripcion or '',
+            ip_address=ip_address,
+            created_at=timezone.now(),
+        )
+        if garantizado or not self.asincrona or not self._asegurar_hilo():
+            entrada.save()
+            return entrada
+
+        with self._lock:
+            encolada = len(self._pendientes) < self.max_pendientes
+            if encolada:
+                self._pendientes.append(entrada)
+            pendientes = len(self._pendientes)
+
+        if not encolada:
+            logger.warning('Cola de bitácora llena (%s); escritura síncrona', pendientes)
+            entrada.save()
+        elif pendientes >= self.lote:
+            self._despertar.set()
+        return entrada
+
+    def pendientes(self):
+        with self._lock:
+            return len(self._pendientes)
+
+    def flush(self):
+        """Persiste todo lo encolado; retorna cuántas entradas se escribieron."""
+        from .models import Bitacora
+
+        with self._lock:
+            lote = list(self._pendientes)
+            self._pendientes.clear()
+        if not lote:
+            return 0
+
+        try:
+            with transaction.atomic():
+                Bitacora.objects.bulk_create(lote)
+            return len(lote)
+        except Exception:
+            logger.exception('Error escribiendo lote de %s entradas de bitácora; reintento individual', len(lote))
+
+        fallidas = []
+        for entrada in lote:
+            try:
+                entrada.pk = None
+                entrada.save()
+            except Exception:
+                logger.exception('Entrada de bitácora no escrita, vuelve a la cola: %s', entrada.accion)
+                fallidas.append(entrada)
+        if fallidas:
+            with self._lock:
+                self._pendientes.extendleft(reversed(fallidas))
+        return len(lote) - len(fallidas)
+
+    # ------------------------------------------------------------------
+    # Hilo de fondo
+    # ------------------------------------------------------------------
+    def _asegurar_hilo(self):
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+            return True
+        with self._lock:
+            if self._pid != pid:
+                # Proceso hijo tras fork: la cola heredada la vacía el proceso padre
+                self._pendientes.clear()
+                self._hilo = None
+            if self._hilo is None or not self._hilo.is_alive():
+                try:
+                    self._hilo = threading.Thread(target=self._bucle, name='bitacora-writer', daemon=True)
+                    self._hilo.start()
+                    self._pid = pid
+                except RuntimeError:
+                    logger.exception('No se pudo iniciar el escritor de bitácora')
+                    self._hilo = None
+                    return False
+        return True
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Error en el escritor de bitácora')
+            finally:
+                close_old_connections()
+
+
+escritor = EscritorBitacora()
+
+
+def registrar_bitacora(usuario=None, accion='', descripcion=None, ip_address=None, garantizado=False):
+    return escritor.registrar(usuario, accion, descripcion, ip_address, garantizado=garantizado)
+
+
+@atexit.register
+def _vaciar_al_salir():
+    # Respaldo síncrono al apagar el proceso (el hilo es daemon y no llega a vaciar)
+    if escritor._pid == os.getpid():
+        try:
+            escritor.flush()
+        except Exception:
+            logger.exception('No se pudo vaciar la bitácora al salir')
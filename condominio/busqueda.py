@@ -0,0 +1,270 @@
+"""
+Búsqueda de texto sobre paquetes y servicios (?q=) y filtros difusos de ubicación.
+
+PostgreSQL (migración 0017):
+- Columna generada `busqueda` (tsvector 'spanish', STORED) en condominio_paquete y
+  condominio_servicio con índice GIN. La base la recalcula en cada INSERT/UPDATE.
+- Índices trigram (pg_trgm) sobre UPPER(ciudad), UPPER(departamento) y UPPER(duracion):
+  sirven tanto a los filtros __icontains existentes (que Django compila como
+  UPPER(col::text) LIKE UPPER(%x%)) como al operador de similitud % de filtrar_ubicacion.
+  El operador % (umbral de servidor pg_trgm.similarity_threshold) solo selecciona
+  candidatos por índice; el umbral efectivo es SIMILITUD_TRIGRAMA, fijo en la consulta.
+- buscar() filtra con websearch_to_tsquery y ordena por ts_rank.
+
+Otros motores (SQLite en desarrollo):
+- IndiceInvertido en Python, construido a partir de los mismos campos y pesos, cacheado
+  por versión (COUNT + MAX(updated_at) de la tabla). Todas las palabras de la consulta
+  deben aparecer (como websearch_to_tsquery); el puntaje es TF-IDF ponderado por campo.
+- filtrar_ubicacion compara con difflib contra los valores distintos de la columna.
+
+filtrar_ubicacion es solo para los endpoints de búsqueda: los reportes filtran con
+__icontains exacto para que sus totales no incluyan otras ciudades.
+"""
+import difflib
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import BooleanField, Case, Count, FloatField, Max, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+COLUMNA = 'busqueda'
+CONFIGURACION = 'spanish'
+CACHE_TIMEOUT = 60 * 60
+
+# Mismos pesos por defecto que ts_rank: {D: 0.1, C: 0.2, B: 0.4, A: 1.0}
+PESOS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+# Campos indexados por tabla, agrupados por peso
+CAMPOS_BUSQUEDA = {
+    'condominio_paquete': {
+        'A': ('nombre',),
+        'B': ('ciudad', 'departamento'),
+        'C': ('descripcion', 'punto_salida', 'duracion'),
+    },
+    'condominio_servicio': {
+        'A': ('titulo',),
+        'B': ('ciudad', 'departamento'),
+        'C': ('descripcion', 'punto_encuentro', 'duracion'),
+    },
+}
+
+# Columnas con índice trigram (filtros __icontains y filtrar_ubicacion)
+CAMPOS_TRIGRAMA = {
+    'condominio_paquete': ('ciudad', 'departamento', 'duracion'),
+    'condominio_servicio': ('ciudad', 'departamento', 'duracion'),
+}
+
+# Umbrales de filtrar_ubicacion: similarity() de pg_trgm y ratio de difflib (métricas
+# distintas, calibradas para aceptar un error de tipeo en nombres de ciudades)
+SIMILITUD_TRIGRAMA = 0.5
+SIMILITUD_MINIMA = 0.75
+
+PALABRAS_VACIAS = frozenset("""
+a al algo con de del desde e el en entre es esta este hacia hasta la las lo los mas
+mi muy ni o para pero por que se sin sobre su sus un una unas unos y ya
+""".split())
+
+
+def es_postgres(alias='default'):
+    return connections[alias].vendor == 'postgresql'
+
+
+# =====================================================
+# Normalización (fallback en Python)
+# =====================================================
+def _sin_acentos(texto):
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)
+    )
+
+
+def _raiz(palabra):
+    """Singular aproximado: 'montañas' -> 'montana', 'ciudades' -> 'ciudad'."""
+    if len(palabra) > 4 and palabra.endswith('es') and palabra[-3] not in 'aeiou':
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith('s'):
+        return palabra[:-1]
+    return palabra
+
+
+def terminos(texto):
+    """Lista de términos normalizados (minúsculas, sin acentos ni palabras vacías)."""
+    palabras = re.findall(r'\w+', _sin_acentos(str(texto or '')).lower())
+    return [_raiz(p) for p in palabras if p not in PALABRAS_VACIAS]
+
+
+class IndiceInvertido:
+    """Índice invertido en memoria: término -> {pk: frecuencia ponderada}."""
+
+    def __init__(self, documentos=()):
+        self.postings = defaultdict(dict)
+        self.total = 0
+        for pk, campos in documentos:
+            self.agregar(pk, campos)
+
+    def agregar(self, pk, campos):
+        """campos: iterable de (texto, peso)."""
+        self.total += 1
+        for texto, peso in campos:
+            for termino in terminos(texto):
+                documentos = self.postings[termino]
+                documentos[pk] = documentos.get(pk, 0.0) + peso
+
+    def buscar(self, consulta):
+        """Retorna [(pk, puntaje)] de los documentos con todos los términos, mejor primero."""
+        buscados = list(dict.fromkeys(terminos(consulta)))
+        if not buscados or any(t not in self.postings for t in buscados):
+            return []
+
+        buscados.sort(key=lambda t: len(self.postings[t]))
+        candidatos = set(self.postings[buscados[0]])
+        for termino in buscados[1:]:
+            candidatos &= self.postings[termino].keys()
+
+        puntajes = {}
+        for termino in buscados:
+            documentos = self.postings[termino]
+            idf = math.log(1 + self.total / len(documentos))
+            for pk in candidatos:
+                puntajes[pk] = puntajes.get(pk, 0.0) + documentos[pk] * idf
+        return sorted(puntajes.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def indice_de(model):
+    """IndiceInvertido de toda la tabla, reconstruido solo si cambió su versión."""
+    tabla = model._meta.db_table
+    campos = CAMPOS_BUSQUEDA[tabla]
+    estado = model.objects.aggregate(total=Count('pk'), ultima=Max('updated_at'))
+    version = f"{estado['total']}-{estado['ultima'].timestamp() if estado['ultima'] else 0}"
+
+    clave = f'busqueda_indice:{tabla}'
+    cacheado = cache.get(clave)
+    if cacheado and cacheado[0] == version:
+        return cacheado[1]
+
+    nombres = [campo for grupo in campos.values() for campo in grupo]
+    pesos = {campo: PESOS[peso] for peso, grupo in campos.items() for campo in grupo}
+    filas = model.objects.order_by().values_list('pk', *nombres)
+    indice = IndiceInvertido(
+        (fila[0], [(valor, pesos[campo]) for campo, valor in zip(nombres, fila[1:])])
+        for fila in filas
+    )
+    cache.set(clave, (version, indice), CACHE_TIMEOUT)
+    return indice
+
+
+# =====================================================
+# API
+# =====================================================
+def buscar(queryset, consulta):
+    """Filtra queryset por la consulta y lo ordena por relevancia (anotación rango_busqueda)."""
+    consulta = (consulta or '').strip()
+    if not consulta:
+        return queryset
+
+    model = queryset.model
+    if es_postgres(queryset.db):
+        columna = f'"{model._meta.db_table}"."{COLUMNA}"'
+        tsquery = f"websearch_to_tsquery('{CONFIGURACION}', %s)"
+        return (
+            queryset
+            .filter(RawSQL(f'{columna} @@ {tsquery}', [consulta], output_field=BooleanField()))
+            .annotate(rango_busqueda=RawSQL(f'ts_rank({columna}, {tsquery})', [consulta],
+                                            output_field=FloatField()))
+            .order_by('-rango_busqueda', '-pk')
+        )
+
+    resultados = indice_de(model).buscar(consulta)
+    if not resultados:
+        return queryset.none()
+    return (
+        queryset
+        .filter(pk__in=[pk for pk, _ in resultados])
+        .annotate(rango_busqueda=Case(
+            *[When(pk=pk, then=Value(puntaje)) for pk, puntaje in resultados],
+            output_field=FloatField(),
+        ))
+        .order_by('-rango_busqueda', '-pk')
+    )
+
+
+def buscar_ids(queryset, consulta):
+    """pks que coinciden con la consulta, en orden de relevancia."""
+    return list(buscar(queryset, consulta).values_list('pk', flat=True))
+
+
+def filtrar_ubicacion(queryset, campo, valor):
+    """Filtro tolerante a errores de tipeo para ciudad/departamento.
+
+    Conserva las coincidencias de __icontains y agrega valores similares
+    ('Cochabmba' encuentra 'Cochabamba'). Solo para búsquedas: no usar en reportes.
+    """
+    valor = (valor or '').strip()
+    if not valor:
+        return queryset
+
+    contiene = Q(**{f'{campo}__icontains': valor})
+    if es_postgres(queryset.db):
+        columna = f'UPPER("{queryset.model._meta.db_table}"."{campo}"::text)'
+        # % usa el índice trigram; similarity() aplica el umbral fijo del proyecto
+        similar = RawSQL(
+            f'({columna} %% UPPER(%s) AND similarity({columna}, UPPER(%s)) >= %s)',
+            [valor, valor, SIMILITUD_TRIGRAMA], output_field=BooleanField(),
+        )
+        return queryset.filter(contiene | Q(similar))
+
+    buscado = _sin_acentos(valor).lower()
+    existentes = (
+        queryset.model.objects.exclude(**{f'{campo}__isnull': True})
+        .order_by().values_list(campo, flat=True).distinct()
+    )
+    similares = [
+        v for v in existentes
+        if difflib.SequenceMatcher(None, buscado, _sin_acentos(v).lower()).ratio() >= SIMILITUD_MINIMA
+    ]
+    return queryset.filter(contiene | Q(**{f'{campo}__in': similares}))
+
+
+# =====================================================
+# Esquema PostgreSQL (migración 0017)
+# =====================================================
+def _sql_vector(campos):
+    partes = []
+    for peso, grupo in campos.items():
+        texto = " || ' ' || ".join(f"coalesce({campo}, '')" for campo in grupo)
+        partes.append(f"setweight(to_tsvector('{CONFIGURACION}', {texto}), '{peso}')")
+    return ' || '.join(partes)
+
+
+def instalar_busqueda(conexion):
+    """Crea columnas tsvector generadas, índices GIN y trigram (idempotente)."""
+    with conexion.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for tabla, campos in CAMPOS_BUSQUEDA.items():
+            cursor.execute(
+                f'ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS {COLUMNA} tsvector '
+                f'GENERATED ALWAYS AS ({_sql_vector(campos)}) STORED'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {tabla}_{COLUMNA}_gin ON {tabla} USING gin ({COLUMNA})')
+        for tabla, campos in CAMPOS_TRIGRAMA.items():
+            for campo in campos:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {tabla}_{campo}_trgm ON {tabla} '
+                    f'USING gin (UPPER({campo}::text) gin_trgm_ops)'
+                )
+
+
+def desinstalar_busqueda(conexion):
+    with conexion.cursor() as cursor:
+        for tabla, campos in CAMPOS_TRIGRAMA.items():
+            for campo in campos:
+                cursor.execute(f'DROP INDEX IF EXISTS {tabla}_{campo}_trgm')
+        for tabla in CAMPOS_BUSQUEDA:
+            cursor.execute(f'ALTER TABLE {tabla} DROP COLUMN IF EXISTS {COLUMNA}')
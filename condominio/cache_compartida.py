@@ -0,0 +1,25 @@
+"""
+¿La caché por defecto es compartida entre procesos?
+
+Las entradas que otro proceso debe poder invalidar (perfil/rol resuelto, badge de
+notificaciones) solo se guardan en una caché compartida (Redis con REDIS_URL,
+Memcached, base de datos). Con LocMemCache —el default sin REDIS_URL— cada worker tiene
+su propia copia y no ve los borrados de los demás: en ese caso se lee la base siempre.
+
+Settings opcionales:
+    CACHE_COMPARTIDA: fuerza el valor (p. ej. True en un único proceso, como runserver o
+        las pruebas); por defecto se deduce del backend.
+"""
+from django.conf import settings
+
+BACKENDS_POR_PROCESO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def es_compartida():
+    forzada = getattr(settings, 'CACHE_COMPARTIDA', None)
+    if forzada is not None:
+        return forzada
+    return settings.CACHES['default']['BACKEND'] not in BACKENDS_POR_PROCESO
@@ -0,0 +1,183 @@
+"""
+Calendario de capacidad por servicio y fecha (CapacidadServicioDia).
+
+Cada fila cuenta los lugares reservados de un servicio en una fecha. Ocupa un lugar
+toda reserva que no esté CANCELADA: uno por Reserva.servicio en Reserva.fecha y uno por
+cada ReservaServicio en su propia fecha. signals_capacidad.py mantiene las filas con
+UPDATE ... F() en la misma transacción al reservar, cancelar o reactivar, reprogramar
+(cambio de fecha o de servicio) y eliminar.
+
+La capacidad se verifica después de sumar: el UPDATE deja la fila bloqueada hasta el
+COMMIT, así que dos reservas simultáneas del último lugar se serializan, la segunda ve
+reservados > capacidad_max y se revierte con CapacidadAgotada. Al reprogramar también
+aplica la regla CAPACIDAD_MAXIMA de ReglaReprogramacion como tope por fecha.
+
+disponibilidad() responde un rango de fechas para varios servicios con una consulta
+sobre el índice único (servicio, fecha), sin agregar Reserva ni ReservaServicio.
+
+Si el calendario se desfasa (cargas masivas, UPDATE directos) se recalcula con
+`manage.py reconstruir_capacidad`.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Q
+
+ESTADO_SIN_LUGAR = 'CANCELADA'
+MAX_DIAS = 92
+MAX_SERVICIOS = 100
+
+
+class CapacidadAgotada(Exception):
+    """El servicio no tiene lugares libres en la fecha."""
+
+    def __init__(self, servicio_id, fecha):
+        super().__init__(f'El servicio {servicio_id} no tiene capacidad el {fecha}')
+        self.servicio_id = servicio_id
+        self.fecha = fecha
+
+
+def ocupa(reserva):
+    return reserva.estado != ESTADO_SIN_LUGAR
+
+
+def lugar(reserva):
+    """(servicio_id, fecha) que ocupa Reserva.servicio, o None."""
+    if reserva.servicio_id and reserva.fecha and ocupa(reserva):
+        return (reserva.servicio_id, reserva.fecha)
+    return None
+
+
+def lugares_itinerario(reserva_id):
+    """Counter {(servicio_id, fecha): n} de los ReservaServicio de la reserva."""
+    from .models import ReservaServicio
+
+    return Counter(ReservaServicio.objects.filter(reserva_id=reserva_id).values_list('servicio_id', 'fecha'))
+
+
+def lugares_de(reserva):
+    """Todas las (servicio_id, fecha) en que la reserva ocupa lugar."""
+    if not ocupa(reserva):
+        return Counter()
+    lugares = lugares_itinerario(reserva.pk)
+    if lugar(reserva):
+        lugares[lugar(reserva)] += 1
+    return lugares
+
+
+def ajustar(servicio_id, fecha, delta):
+    """Suma delta a los reservados del servicio en la fecha (sin bajar de 0)."""
+    from .models import CapacidadServicioDia
+
+    if not servicio_id or not fecha or not delta:
+        return
+    filas = CapacidadServicioDia.objects.filter(servicio_id=servicio_id, fecha=fecha)
+    if delta < 0:
+        filas.filter(reservados__gte=-delta).update(reservados=F('reservados') + delta)
+        return
+    if not filas.update(reservados=F('reservados') + delta):
+        # Primera reserva del día; si otra transacción crea la fila a la vez, el INSERT
+        # espera su COMMIT y se ignora
+        CapacidadServicioDia.objects.bulk_create(
+            [CapacidadServicioDia(servicio_id=servicio_id, fecha=fecha)], ignore_conflicts=True,
+        )
+        filas.update(reservados=F('reservados') + delta)
+
+
+def limite_reprogramacion(reserva, rol='ALL'):
+    """Tope de reservas por fecha de la regla CAPACIDAD_MAXIMA vigente, o None (solo consulta la versión del motor)."""
+    from .reglas_reprogramacion import evaluador
+
+    return evaluador(rol).valor('CAPACIDAD_MAXIMA', reserva)
+
+
+def verificar(lugares, limite=None):
+    """Lanza CapacidadAgotada si alguna (servicio_id, fecha) supera su capacidad.
+
+    Llamar dentro de la transacción, después de guardar la reserva. limite: tope
+    adicional por fecha (regla CAPACIDAD_MAXIMA al reprogramar).
+    """
+    from .models import CapacidadServicioDia
+
+    if not lugares:
+        return
+    claves = Q()
+    for servicio_id, fecha in lugares:
+        claves |= Q(servicio_id=servicio_id, fecha=fecha)
+    excedida = Q(reservados__gt=F('servicio__capacidad_max'))
+    if limite is not None:
+        excedida |= Q(reservados__gt=limite)
+    fila = CapacidadServicioDia.objects.filter(claves).filter(excedida).values_list('servicio_id', 'fecha').first()
+    if fila:
+        raise CapacidadAgotada(*fila)
+
+
+def disponibilidad(servicio_ids, desde, hasta):
+    """Lugares libres por fecha: {servicio_id: {'capacidad_max': n, 'dias': {fecha: libres}}}.
+
+    Una consulta: LEFT JOIN de cada servicio con sus filas del rango. Las fechas sin fila
+    tienen toda la capacidad; un servicio Inactivo no tiene lugares.
+    """
+    from .models import Servicio
+
+    filas = (
+        Servicio.objects.filter(pk__in=servicio_ids)
+        .annotate(dia=FilteredRelation('capacidad_dias', condition=Q(capacidad_dias__fecha__range=(desde, hasta))))
+        .order_by('pk')
+        .values_list('pk', 'capacidad_max', 'estado', 'dia__fecha', 'dia__reservados')
+    )
+    fechas = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    resultado = {}
+    for pk, capacidad, estado, fecha, reservados in filas:
+        total = capacidad if estado == 'Activo' else 0
+        servicio = resultado.setdefault(pk, {'capacidad_max': capacidad, 'dias': dict.fromkeys(fechas, total)})
+        if fecha is not None:
+            servicio['dias'][fecha] = max(0, total - reservados)
+    return resultado
+
+
+def reservados_reales():
+    """Counter {(servicio_id, fecha): n} calculado desde Reserva y ReservaServicio."""
+    from .models import Reserva, ReservaServicio
+
+    reales = Counter()
+    directas = (
+        Reserva.objects.filter(servicio__isnull=False).exclude(estado=ESTADO_SIN_LUGAR)
+        .values('servicio_id', 'fecha').annotate(n=Count('pk')).values_list('servicio_id', 'fecha', 'n')
+    )
+    itinerario = (
+        ReservaServicio.objects.exclude(reserva__estado=ESTADO_SIN_LUGAR)
+        .values('servicio_id', 'fecha').annotate(n=Count('pk')).values_list('servicio_id', 'fecha', 'n')
+    )
+    for filas in (directas, itinerario):
+        for servicio_id, fecha, n in filas.order_by():
+            reales[(servicio_id, fecha)] += n
+    return reales
+
+
+def reconstruir():
+    """Recalcula el calendario desde las reservas; retorna cuántas filas corrigió."""
+    from .models import CapacidadServicioDia
+
+    reales = reservados_reales()
+    with transaction.atomic():
+        actuales = {
+            (servicio_id, fecha): (pk, reservados)
+            for pk, servicio_id, fecha, reservados in CapacidadServicioDia.objects.values_list(
+                'pk', 'servicio_id', 'fecha', 'reservados',
+            ).iterator()
+        }
+        sobrantes = [pk for clave, (pk, _) in actuales.items() if clave not in reales]
+        CapacidadServicioDia.objects.filter(pk__in=sobrantes).delete()
+        nuevas = []
+        corregidas = len(sobrantes)
+        for (servicio_id, fecha), n in reales.items():
+            pk, reservados = actuales.get((servicio_id, fecha), (None, None))
+            if pk is None:
+                nuevas.append(CapacidadServicioDia(servicio_id=servicio_id, fecha=fecha, reservados=n))
+            elif reservados != n:
+                CapacidadServicioDia.objects.filter(pk=pk).update(reservados=n)
+                corregidas += 1
+        CapacidadServicioDia.objects.bulk_create(nuevas, batch_size=1000)
+    return corregidas + len(nuevas)
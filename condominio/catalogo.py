@@ -0,0 +1,207 @@
+"""
+Catálogo público de paquetes precalculado.
+
+Cada Paquete tiene una fila CatalogoPaquete con su representación de PaqueteSerializer
+ya serializada. Las señales de signals_catalogo.py la reconstruyen cuando cambia el
+paquete, su itinerario, un servicio incluido o la campaña asociada.
+
+El listado público (list, destacados, disponibles) se sirve desde estos snapshots:
+- Una consulta barata (COUNT/MAX sobre el catálogo) determina la versión vigente.
+- Si la versión coincide con la cacheada en el proceso, no se toca la tabla de datos.
+- Los cupos (cupos_disponibles/cupos_ocupados) se leen en vivo de Paquete en otra
+  consulta y reemplazan a los del snapshot: cambian en cada reserva con UPDATE
+  condicionales (cupos.py) que no reconstruyen el catálogo.
+- Los filtros de query params se aplican en memoria sobre la lista cacheada.
+- La versión + cupos + query string generan un ETag para revalidación condicional (304).
+"""
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'catalogo_paquetes'
+CACHE_TIMEOUT = 60 * 60 * 6  # 6 horas; la versión invalida antes si cambia algo
+
+
+# =====================================================
+# Reconstrucción de snapshots
+# =====================================================
+def reconstruir_catalogo(paquete_ids=None):
+    """Reconstruye los snapshots de los paquetes indicados (o de todos si es None).
+
+    Los ids que ya no existan simplemente pierden su snapshot.
+    Retorna el número de snapshots escritos.
+    """
+    from .models import Paquete, CatalogoPaquete
+    from .serializer import PaqueteSerializer, paquete_servicios_prefetch
+
+    paquetes = Paquete.objects.select_related('campania').prefetch_related(paquete_servicios_prefetch())
+    if paquete_ids is not None:
+        paquete_ids = set(paquete_ids)
+        if not paquete_ids:
+            return 0
+        paquetes = paquetes.filter(id__in=paquete_ids)
+
+    datos = PaqueteSerializer(paquetes, many=True).data
+
+    with transaction.atomic():
+        existentes = CatalogoPaquete.objects.all()
+        if paquete_ids is not None:
+            existentes = existentes.filter(paquete_id__in=paquete_ids)
+        existentes.delete()
+        CatalogoPaquete.objects.bulk_create([
+            CatalogoPaquete(paquete_id=item['id'], datos=item) for item in datos
+        ])
+
+    logger.info('Catálogo reconstruido para %s paquetes', len(datos))
+    return len(datos)
+
+
+def programar_reconstruccion(paquete_ids):
+    """Agenda la reconstrucción para cuando la transacción actual confirme."""
+    paquete_ids = {pk for pk in paquete_ids if pk is not None}
+    if not paquete_ids:
+        return
+
+    def _ejecutar():
+        try:
+            reconstruir_catalogo(paquete_ids)
+        except Exception:
+            # El catálogo es derivado: nunca bloquear la operación que lo originó
+            logger.exception('Error reconstruyendo catálogo para paquetes %s', paquete_ids)
+
+    transaction.on_commit(_ejecutar)
+
+
+# =====================================================
+# Lectura del catálogo
+# =====================================================
+def obtener_catalogo():
+    """Retorna (version, paquetes) del catálogo vigente.
+
+    paquetes es una lista de dicts en el orden del modelo Paquete
+    (destacados primero, luego más recientes). No debe mutarse.
+    """
+    from .models import Paquete, CatalogoPaquete
+
+    estado = Paquete.objects.aggregate(
+        total=Count('id'),
+        con_catalogo=Count('catalogo'),
+        ultima=Max('catalogo__updated_at'),
+    )
+    if estado['total'] != estado['con_catalogo']:
+        # Paquetes sin snapshot (ej. creados antes de este catálogo): completarlos ahora
+        faltantes = Paquete.objects.filter(catalogo__isnull=True).values_list('id', flat=True)
+        reconstruir_catalogo(list(faltantes))
+        estado = CatalogoPaquete.objects.aggregate(con_catalogo=Count('id'), ultima=Max('updated_at'))
+
+    ultima = estado['ultima']
+    version = f"{estado['con_catalogo']}-{ultima.timestamp() if ultima else 0}"
+
+    cacheado = cache.get(CACHE_KEY)
+    if cacheado and cacheado[0] == version:
+        return cacheado
+
+    paquetes = list(
+        CatalogoPaquete.objects
+        .order_by('-paquete__destacado', '-paquete__created_at')
+        .values_list('datos', flat=True)
+    )
+    cache.set(CACHE_KEY, (version, paquetes), CACHE_TIMEOUT)
+    return version, paquetes
+
+
+def cupos_vigentes():
+    """Retorna {paquete_id: (cupos_disponibles, cupos_ocupados)} en una sola consulta."""
+    from .models import Paquete
+
+    return {
+        pk: (disponibles, ocupados)
+        for pk, disponibles, ocupados in Paquete.objects.values_list('id', 'cupos_disponibles', 'cupos_ocupados')
+    }
+
+
+def _es_true(valor):
+    return bool(valor) and valor.lower() == 'true'
+
+
+def _decimal(valor):
+    try:
+        return Decimal(str(valor))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def _con_vigencia(item, hoy, cupos=None):
+    """Recalcula los campos de disponibilidad que dependen de la fecha y de los cupos actuales."""
+    disponibilidad = item.get('disponibilidad') or {}
+    vivos = {}
+    if cupos and item.get('id') in cupos:
+        disponibles, ocupados = cupos[item['id']]
+        vivos = {'cupos_disponibles': disponibles, 'cupos_ocupados': ocupados}
+        disponibilidad = {**disponibilidad, **vivos, 'cupos_restantes': max(0, disponibles - ocupados)}
+    fecha_inicio = str(item.get('fecha_inicio') or '')
+    fecha_fin = str(item.get('fecha_fin') or '')
+    esta_vigente = bool(fecha_inicio and fecha_fin) and fecha_inicio <= hoy <= fecha_fin
+    esta_disponible = (
+        item.get('estado') == 'Activo'
+        and esta_vigente
+        and (disponibilidad.get('cupos_restantes') or 0) > 0
+    )
+    return {
+        **item,
+        **vivos,
+        'disponibilidad': {
+            **disponibilidad,
+            'esta_vigente': esta_vigente,
+            'esta_disponible': esta_disponible,
+        },
+    }
+
+
+def filtrar_catalogo(paquetes, params, hoy=None, cupos=None):
+    """Aplica en memoria los mismos filtros que PaqueteViewSet.get_queryset.
+
+    cupos: resultado de cupos_vigentes(); si se omite se usan los del snapshot.
+    """
+    hoy = (hoy or timezone.now().date()).isoformat()
+    resultado = [_con_vigencia(p, hoy, cupos) for p in paquetes]
+
+    if _es_true(params.get('activo')):
+        resultado = [p for p in resultado if p.get('estado') == 'Activo']
+
+    if _es_true(params.get('disponible')):
+        resultado = [p for p in resultado if p['disponibilidad']['esta_disponible']]
+
+    if _es_true(params.get('destacado')):
+        resultado = [p for p in resultado if p.get('destacado')]
+
+    precio_min = _decimal(params.get('precio_min')) if params.get('precio_min') else None
+    precio_max = _decimal(params.get('precio_max')) if params.get('precio_max') else None
+    if precio_min is not None:
+        resultado = [p for p in resultado if _decimal(p.get('precio_base')) >= precio_min]
+    if precio_max is not None:
+        resultado = [p for p in resultado if _decimal(p.get('precio_base')) <= precio_max]
+
+    duracion = params.get('duracion')
+    if duracion:
+        duracion = duracion.lower()
+        resultado = [p for p in resultado if duracion in (p.get('duracion') or '').lower()]
+
+    return resultado
+
+
+# =====================================================
+# ETag / If-None-Match
+# =====================================================
+def calcular_etag(version, request, cupos=None):
+    """ETag fuerte derivado de la versión del catálogo, los cupos, la fecha y la URL pedida."""
+    base = f"{version}|{sorted((cupos or {}).items())}|{timezone.now().date().isoformat()}|{request.get_full_path()}"
+    return '"' + hashlib.md5(base.encode('utf-8')).hexdigest() + '"'
+
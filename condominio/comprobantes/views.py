@@ -1,6 +1,8 @@
 from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
 
+from condominio.perfiles import resolver_perfil
+
 from .models import ComprobantePago
 from .serializers import ComprobantePagoSerializer
 
@@ -26,8 +28,9 @@ class ComprobantePagoViewSet(viewsets.ModelViewSet):
         qs = super().get_queryset()
 
         # Si el usuario tiene perfil de cliente, filtrar solo sus comprobantes
-        if hasattr(user, "perfil") and getattr(user.perfil.rol, "nombre", "").lower() == "cliente":
-            return qs.filter(cliente=user.perfil)
+        perfil = resolver_perfil(user)
+        if perfil and getattr(perfil.rol, "nombre", "").lower() == "cliente":
+            return qs.filter(cliente=perfil)
 
         return qs
 
@@ -35,4 +38,4 @@ class ComprobantePagoViewSet(viewsets.ModelViewSet):
         """
         Asigna automáticamente el cliente al crear un comprobante.
         """
-        serializer.save(cliente=self.request.user.perfil)
+        serializer.save(cliente=resolver_perfil(self.request.user))
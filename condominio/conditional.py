@@ -0,0 +1,122 @@
+"""
+Soporte de GET condicional (ETag / Last-Modified) para viewsets de lectura.
+
+El validador se deriva con una sola consulta agregada sobre el queryset ya filtrado:
+COUNT + MAX(updated_at) de TimeStampedModel, más COUNT/MAX de las relaciones que el
+serializer anida (validator_related). Si el cliente envía un If-None-Match vigente
+se responde 304 sin instanciar ni ejecutar el serializer.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag_coincide(request, etag):
+    """True si alguno de los ETags de If-None-Match coincide con el actual."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidatos = [c.strip() for c in header.split(',')]
+    return '*' in candidatos or any(c.removeprefix('W/') == etag for c in candidatos)
+
+
+def validador_queryset(queryset, relaciones=(), extra=()):
+    """Retorna (firma, ultima_modificacion) del queryset en una consulta.
+
+    relaciones: lookups de relaciones con updated_at cuyo cambio debe invalidar
+    (ej. 'categoria', 'paqueteservicio__servicio'). Se cuentan con DISTINCT para
+    detectar también altas y bajas de filas hijas.
+    extra: lookups de fechas adicionales a considerar (ej. 'user__last_login').
+    """
+    agregados = {'total': Count('pk', distinct=bool(relaciones)), 'ultima': Max('updated_at')}
+    for i, rel in enumerate(relaciones):
+        agregados[f'total_{i}'] = Count(rel, distinct=True)
+        agregados[f'ultima_{i}'] = Max(f'{rel}__updated_at')
+    for i, campo in enumerate(extra):
+        agregados[f'ultima_extra_{i}'] = Max(campo)
+
+    valores = queryset.order_by().aggregate(**agregados)
+    fechas = [v for k, v in valores.items() if k.startswith('ultima') and v is not None]
+    ultima = max(fechas) if fechas else None
+    firma = '|'.join(
+        str(v.timestamp() if hasattr(v, 'timestamp') else v)
+        for _, v in sorted(valores.items())
+    )
+    return firma, ultima
+
+
+class ConditionalGetMixin:
+    """Mixin para viewsets: list/retrieve responden 304 si el cliente ya tiene la versión.
+
+    Atributos:
+        validator_related: relaciones anidadas por el serializer que también invalidan.
+        validator_extra: otros campos de fecha (sin updated_at) que el serializer expone.
+        validator_diario: True si la representación depende de la fecha actual
+            (ej. vigencia); el ETag cambia cada día y no se usa If-Modified-Since.
+
+    Las acciones personalizadas pueden usar respuesta_condicional(request, queryset, construir).
+    """
+    validator_related = ()
+    validator_extra = ()
+    validator_diario = False
+
+    def _etag(self, request, firma):
+        usuario = getattr(getattr(request, 'user', None), 'pk', None)
+        base = f"{self.__class__.__name__}|{usuario}|{request.get_full_path()}|{firma}"
+        if self.validator_diario:
+            base += f"|{timezone.now().date().isoformat()}"
+        return '"' + hashlib.md5(base.encode('utf-8')).hexdigest() + '"'
+
+    def respuesta_condicional(self, request, queryset, construir, detalle=False,
+                              relaciones=None, extra=None):
+        """Evalúa el validador de queryset; si no cambió responde 304, si no llama construir().
+
+        construir: callable sin argumentos que retorna el Response completo.
+        detalle: si True también se acepta If-Modified-Since (un único objeto, sin bajas).
+        relaciones/extra: por defecto validator_related/validator_extra de la vista.
+        """
+        firma, ultima = validador_queryset(
+            queryset,
+            self.validator_related if relaciones is None else relaciones,
+            self.validator_extra if extra is None else extra,
+        )
+        etag = self._etag(request, firma)
+        headers = {'ETag': etag}
+        if ultima:
+            headers['Last-Modified'] = http_date(ultima.timestamp())
+
+        if etag_coincide(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        usar_fecha = detalle and not self.validator_diario
+        if usar_fecha and ultima and 'HTTP_IF_NONE_MATCH' not in request.META:
+            desde = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            if desde is not None and int(ultima.timestamp()) <= desde:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = construir()
+        if response.status_code == status.HTTP_200_OK:
+            for clave, valor in headers.items():
+                response[clave] = valor
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.respuesta_condicional(
+            request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self.respuesta_condicional(
+            request, queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            detalle=True,
+        )
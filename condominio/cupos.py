@@ -0,0 +1,160 @@
+"""
+Inventario de cupos de paquetes sin sobreventa bajo concurrencia.
+
+Cada cupo se toma con un único UPDATE condicional:
+
+    UPDATE condominio_paquete SET cupos_ocupados = cupos_ocupados + n
+    WHERE id = %s AND cupos_ocupados <= cupos_disponibles - n
+
+La base de datos serializa los UPDATE sobre la fila del paquete; el que no encuentra
+cupo afecta 0 filas y recibe CuposAgotados. No hay SELECT previo ni bloqueo explícito,
+así que el tiempo con la fila bloqueada es el de la transacción que reserva: por eso
+las vistas ocupan el cupo como último paso antes del COMMIT.
+
+Retenciones: al iniciar el checkout se puede apartar un cupo (RetencionCupo) que ya
+cuenta en cupos_ocupados. Al crear la reserva se confirma; si el checkout se abandona,
+vence y liberar_vencidas() lo devuelve. La limpieza corre al quedarse un paquete sin
+cupos (antes de rechazar) y periódicamente con `manage.py liberar_cupos`.
+
+Una reserva ocupa un cupo de su paquete mientras no esté CANCELADA.
+
+Settings opcionales:
+    CUPOS_RETENCION_MINUTOS: vigencia de una retención (default 15).
+
+El catálogo público no se reconstruye por cambios de cupos: lee cupos_disponibles y
+cupos_ocupados en vivo (catalogo.cupos_vigentes). Los UPDATE sí tocan updated_at, así
+los validadores de Paquete (Last-Modified/ETag del detalle) cambian con cada cupo.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RETENCION_MINUTOS_DEFAULT = 15
+LOTE_VENCIDAS = 1000
+
+
+class CuposAgotados(Exception):
+    """El paquete no tiene cupos libres para la cantidad pedida."""
+
+    def __init__(self, paquete_id):
+        super().__init__(f'El paquete {paquete_id} no tiene cupos disponibles')
+        self.paquete_id = paquete_id
+
+
+def _ocupar(paquete_id, cantidad):
+    from .models import Paquete
+
+    return Paquete.objects.filter(
+        pk=paquete_id, cupos_ocupados__lte=F('cupos_disponibles') - cantidad,
+    ).update(cupos_ocupados=F('cupos_ocupados') + cantidad, updated_at=timezone.now())
+
+
+def ocupar(paquete_id, cantidad=1):
+    """Toma cantidad cupos del paquete o lanza CuposAgotados."""
+    if not _ocupar(paquete_id, cantidad):
+        # Antes de rechazar, devolver las retenciones vencidas de este paquete
+        if not (liberar_vencidas(paquete_id) and _ocupar(paquete_id, cantidad)):
+            raise CuposAgotados(paquete_id)
+
+
+def devolver(paquete_id, cantidad=1):
+    """Libera cantidad cupos del paquete (sin bajar de 0)."""
+    from .models import Paquete
+
+    if paquete_id and cantidad:
+        Paquete.objects.filter(pk=paquete_id, cupos_ocupados__gte=cantidad).update(
+            cupos_ocupados=F('cupos_ocupados') - cantidad, updated_at=timezone.now(),
+        )
+
+
+def retener(paquete_id, usuario=None, cantidad=1, minutos=None):
+    """Aparta cupos durante el checkout; retorna la RetencionCupo o lanza CuposAgotados."""
+    from .models import RetencionCupo
+
+    minutos = minutos or getattr(settings, 'CUPOS_RETENCION_MINUTOS', RETENCION_MINUTOS_DEFAULT)
+    with transaction.atomic():
+        retencion = RetencionCupo.objects.create(
+            paquete_id=paquete_id, usuario=usuario, cantidad=cantidad,
+            expira_en=timezone.now() + timedelta(minutes=minutos),
+        )
+        ocupar(paquete_id, cantidad)  # último: la fila del paquete queda bloqueada hasta el COMMIT
+    return retencion
+
+
+def confirmar(retencion_id, paquete_id, usuario=None):
+    """Convierte la retención en cupo ocupado por la reserva.
+
+    Si la retención ya venció y fue liberada, intenta ocupar un cupo nuevo
+    (puede lanzar CuposAgotados).
+    """
+    from .models import RetencionCupo
+
+    filas = RetencionCupo.objects.filter(pk=retencion_id, paquete_id=paquete_id)
+    if usuario is not None:
+        filas = filas.filter(usuario=usuario)
+    if not filas.delete()[0]:
+        ocupar(paquete_id)
+
+
+def cancelar_retencion(retencion_id, usuario=None):
+    """Devuelve los cupos de una retención que el cliente abandonó explícitamente."""
+    from .models import RetencionCupo
+
+    with transaction.atomic():
+        filas = RetencionCupo.objects.filter(pk=retencion_id)
+        if usuario is not None:
+            filas = filas.filter(usuario=usuario)
+        retencion = filas.select_for_update().first()
+        if retencion is None:
+            return False
+        retencion.delete()
+        devolver(retencion.paquete_id, retencion.cantidad)
+    return True
+
+
+def liberar_vencidas(paquete_id=None):
+    """Elimina retenciones vencidas y devuelve sus cupos; retorna cuántos cupos liberó.
+
+    En PostgreSQL las filas se toman con FOR UPDATE SKIP LOCKED: dos limpiezas
+    simultáneas, o una limpieza y una confirmación, nunca devuelven el mismo cupo dos veces.
+    """
+    from .models import RetencionCupo
+
+    vencidas = RetencionCupo.objects.filter(expira_en__lte=timezone.now())
+    if paquete_id is not None:
+        vencidas = vencidas.filter(paquete_id=paquete_id)
+    if connection.features.has_select_for_update_skip_locked:
+        vencidas = vencidas.select_for_update(skip_locked=True)
+
+    with transaction.atomic():
+        filas = list(vencidas.order_by('expira_en').values_list('pk', 'paquete_id', 'cantidad')[:LOTE_VENCIDAS])
+        if not filas:
+            return 0
+        RetencionCupo.objects.filter(pk__in=[pk for pk, _, _ in filas]).delete()
+        por_paquete = Counter()
+        for _, paquete, cantidad in filas:
+            por_paquete[paquete] += cantidad
+        for paquete, cantidad in por_paquete.items():
+            devolver(paquete, cantidad)
+    logger.info('Retenciones vencidas liberadas: %s cupos en %s paquetes', sum(por_paquete.values()), len(por_paquete))
+    return sum(por_paquete.values())
+
+
+def cupo_de(reserva):
+    """Paquete cuyo cupo ocupa la reserva, o None."""
+    return reserva.paquete_id if reserva.estado != 'CANCELADA' else None
+
+
+def mover_cupo(anterior, actual):
+    """Ajusta el inventario cuando una reserva cambia de paquete o se cancela/reactiva."""
+    if anterior != actual:
+        devolver(anterior)
+        if actual:
+            ocupar(actual)
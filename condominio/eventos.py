@@ -0,0 +1,162 @@
+"""
+Eventos en tiempo real para los clientes (Server-Sent Events, ver views_eventos.py).
+
+Las señales publican un evento pequeño por cada Notificacion y TicketMessage nuevos
+(después del COMMIT). Cada proceso tiene un Hub que reparte los eventos entre las
+conexiones SSE abiertas en ese proceso, por usuario. Un cliente conectado y sin
+actividad cuesta una conexión abierta y un comentario de keep-alive; no hace consultas.
+
+Backends (setting EVENTOS_BACKEND):
+    local     entrega directa al Hub del mismo proceso (desarrollo, un solo worker).
+    postgres  pg_notify en el canal EVENTOS_CANAL; cada proceso escucha con LISTEN en
+              un hilo propio y entrega al Hub local, así todos los workers reciben
+              todos los eventos. Es el default cuando la base es PostgreSQL.
+
+Settings opcionales:
+    EVENTOS_BACKEND: 'local' | 'postgres' (default según la base de datos).
+    EVENTOS_CANAL: canal LISTEN/NOTIFY (default 'condominio_eventos').
+    EVENTOS_COLA_MAX: eventos pendientes por conexión antes de descartar (default 100).
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL_DEFAULT = 'condominio_eventos'
+COLA_MAX_DEFAULT = 100
+
+
+class Hub:
+    """Reparto en memoria de eventos a las conexiones SSE del proceso."""
+
+    def __init__(self):
+        self._suscriptores = {}  # usuario_id -> {(loop, cola)}
+        self._lock = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        """Cola asyncio que recibirá los eventos del usuario (llamar desde el event loop)."""
+        cola = asyncio.Queue(maxsize=getattr(settings, 'EVENTOS_COLA_MAX', COLA_MAX_DEFAULT))
+        with self._lock:
+            self._suscriptores.setdefault(usuario_id, set()).add((asyncio.get_running_loop(), cola))
+        return cola
+
+    def desuscribir(self, usuario_id, cola):
+        with self._lock:
+            colas = self._suscriptores.get(usuario_id, set())
+            colas.difference_update({s for s in colas if s[1] is cola})
+            if not colas:
+                self._suscriptores.pop(usuario_id, None)
+
+    def conexiones(self, usuario_id=None):
+        with self._lock:
+            if usuario_id is not None:
+                return len(self._suscriptores.get(usuario_id, ()))
+            return sum(len(colas) for colas in self._suscriptores.values())
+
+    def entregar(self, usuario_id, evento):
+        """Entrega el evento a las conexiones del usuario; seguro desde cualquier hilo."""
+        with self._lock:
+            destinos = list(self._suscriptores.get(usuario_id, ()))
+        for loop, cola in destinos:
+            try:
+                loop.call_soon_threadsafe(_encolar, cola, evento)
+            except RuntimeError:
+                pass  # loop cerrado: la conexión se está desuscribiendo
+
+
+def _encolar(cola, evento):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente que no consume: se descarta; al reconectar recibe el estado actual
+        logger.warning('Cola SSE llena, evento %s descartado', evento.get('tipo'))
+
+
+hub = Hub()
+
+
+class BackendLocal:
+    def publicar(self, usuario_id, evento):
+        hub.entregar(usuario_id, evento)
+
+    def iniciar(self):
+        pass
+
+
+class BackendPostgres:
+    """pg_notify para publicar y un hilo con LISTEN por proceso para recibir."""
+
+    def __init__(self):
+        self.canal = getattr(settings, 'EVENTOS_CANAL', CANAL_DEFAULT)
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def publicar(self, usuario_id, evento):
+        mensaje = json.dumps({'u': usuario_id, 'e': evento}, default=str)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.canal, mensaje])
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escuchar, name='eventos-listen', daemon=True)
+                self._hilo.start()
+
+    def _escuchar(self):
+        import psycopg2
+
+        while True:
+            try:
+                conn = psycopg2.connect(**connection.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.canal}"')
+                logger.info('Escuchando eventos en el canal %s', self.canal)
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        aviso = conn.notifies.pop(0)
+                        mensaje = json.loads(aviso.payload)
+                        hub.entregar(mensaje['u'], mensaje['e'])
+            except Exception:
+                logger.exception('LISTEN de eventos interrumpido; reintentando en 5 s')
+                time.sleep(5)
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        nombre = getattr(settings, 'EVENTOS_BACKEND', None) or (
+            'postgres' if connection.vendor == 'postgresql' else 'local'
+        )
+        _backend = BackendPostgres() if nombre == 'postgres' else BackendLocal()
+    return _backend
+
+
+def publicar(usuario_ids, evento):
+    """Publica el evento para cada usuario cuando se confirme la transacción actual."""
+    destinos = {u for u in usuario_ids if u}
+    if not destinos:
+        return
+
+    def enviar():
+        for usuario_id in destinos:
+            try:
+                backend().publicar(usuario_id, evento)
+            except Exception:
+                # El stream es un atajo: el cliente siempre puede volver a consultar la API
+                logger.exception('No se pudo publicar el evento %s', evento.get('tipo'))
+
+    transaction.on_commit(enviar)
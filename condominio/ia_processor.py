@@ -9,6 +9,9 @@ from typing import Dict, Any, List, Optional
 from openai import OpenAI
 from django.conf import settings
 
+from core.llm import ClienteStub, completar, usar_stub
+from core.openai_client import obtener_cliente
+
 
 class ReportesIAProcessor:
     """
@@ -47,9 +50,11 @@ class ReportesIAProcessor:
     def __init__(self):
         """Inicializa el procesador con cliente OpenAI."""
         self.client: Optional[OpenAI] = None
-        if hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
+        if usar_stub():
+            self.client = ClienteStub()
+        elif hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
             try:
-                self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                self.client = obtener_cliente(settings.OPENAI_API_KEY)
             except Exception as e:
                 print(f"⚠️ No se pudo inicializar OpenAI: {e}")
     
@@ -146,7 +151,9 @@ La Paz, Santa Cruz, Cochabamba, Oruro, Potosí, Tarija, Sucre, Beni, Pando
 """
         
         try:
-            response = self.client.chat.completions.create(
+            content = completar(
+                self.client,
+                endpoint="reportes_ia",
                 model="gpt-4o-mini",  # Modelo más económico y rápido
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -158,7 +165,6 @@ La Paz, Santa Cruz, Cochabamba, Oruro, Potosí, Tarija, Sucre, Beni, Pando
             )
             
             # Verificar que hay contenido en la respuesta
-            content = response.choices[0].message.content
             if not content:
                 return None
                 
@@ -337,7 +343,9 @@ La Paz, Santa Cruz, Cochabamba, Oruro, Potosí, Tarija, Sucre, Beni, Pando
         """
         if self.client:
             try:
-                response = self.client.chat.completions.create(
+                content = completar(
+                    self.client,
+                    endpoint="reportes_ia_consulta",
                     model="gpt-4o-mini",
                     messages=[
                         {
@@ -349,7 +357,6 @@ La Paz, Santa Cruz, Cochabamba, Oruro, Potosí, Tarija, Sucre, Beni, Pando
                     temperature=0.7,
                     max_tokens=200
                 )
-                content = response.choices[0].message.content
                 if content:
                     return content
             except Exception:
@@ -0,0 +1,106 @@
+"""
+Logging estructurado y perezoso para las vistas.
+
+Los valores costosos (conteos, listas de ids) se envuelven en Lazy y solo se evalúan
+si el logger realmente emite el registro (nivel habilitado y evento muestreado).
+Las listas se recortan a LOG_MAX_ITEMS elementos.
+
+Uso:
+    log_evento(logger, logging.DEBUG, 'ReservaViewSet.get_queryset',
+               total=lazy_count(qs), ids=lazy_ids(qs), muestreo=0.1)
+
+Settings opcionales:
+    LOG_MAX_ITEMS: máximo de elementos mostrados por lista (default 20).
+    LOG_MUESTREO: fracción global de eventos muestreables que se registran (default 1.0).
+"""
+import logging
+import random
+
+from django.conf import settings
+
+LOG_MAX_ITEMS_DEFAULT = 20
+
+
+def _max_items():
+    return getattr(settings, 'LOG_MAX_ITEMS', LOG_MAX_ITEMS_DEFAULT)
+
+
+def recortar(valores, limite=None):
+    """Representa una secuencia con a lo sumo `limite` elementos: [1, 2, 3, …(+7)]."""
+    limite = _max_items() if limite is None else limite
+    valores = list(valores)
+    if len(valores) <= limite:
+        return repr(valores)
+    visibles = ', '.join(repr(v) for v in valores[:limite])
+    return f"[{visibles}, …(+{len(valores) - limite})]"
+
+
+class Lazy:
+    """Valor de log que se calcula recién al formatear el mensaje (una sola vez)."""
+    _sin_valor = object()
+
+    def __init__(self, funcion):
+        self.funcion = funcion
+        self._valor = self._sin_valor
+
+    def valor(self):
+        if self._valor is self._sin_valor:
+            try:
+                self._valor = self.funcion()
+            except Exception as exc:  # el log nunca debe romper la petición
+                self._valor = f'<error: {exc}>'
+        return self._valor
+
+    def __str__(self):
+        valor = self.valor()
+        if isinstance(valor, (list, tuple, set)):
+            return recortar(valor)
+        return str(valor)
+
+    __repr__ = __str__
+
+
+def lazy(funcion):
+    return Lazy(funcion)
+
+
+def lazy_count(queryset):
+    """COUNT(*) del queryset, solo si se emite el log."""
+    return Lazy(queryset.count)
+
+
+def lazy_ids(queryset, limite=None):
+    """Primeros ids del queryset sin cargar las filas completas.
+
+    Pide un id extra para saber si hay más, y lo indica con '…'.
+    """
+    def _ids():
+        tope = _max_items() if limite is None else limite
+        ids = list(queryset.values_list('pk', flat=True)[:tope + 1])
+        if len(ids) > tope:
+            return f"[{', '.join(repr(pk) for pk in ids[:tope])}, …]"
+        return ids
+    return Lazy(_ids)
+
+
+def log_evento(logger, nivel, evento, muestreo=1.0, **campos):
+    """Registra `[evento] clave=valor ...` con formato diferido.
+
+    - Si el nivel no está habilitado no se evalúa ningún Lazy.
+    - muestreo < 1 registra solo esa fracción de eventos (combinado con LOG_MUESTREO).
+    - Los campos también viajan en record.campos para handlers estructurados (JSON).
+    """
+    if not logger.isEnabledFor(nivel):
+        return
+    fraccion = muestreo * getattr(settings, 'LOG_MUESTREO', 1.0)
+    if fraccion < 1 and random.random() >= fraccion:
+        return
+
+    formato = ' '.join(f'{clave}=%s' for clave in campos)
+    valores = [recortar(v) if isinstance(v, (list, tuple, set)) else v for v in campos.values()]
+    logger.log(
+        nivel,
+        f'[{evento}] {formato}'.rstrip(),
+        *valores,
+        extra={'evento': evento, 'campos': campos},
+    )
@@ -0,0 +1,32 @@
+"""
+Management command de retención de notificaciones (programar diariamente vía cron).
+
+Mueve por lotes las notificaciones leídas con más de N días a NotificacionArchivada
+y las elimina de la tabla caliente (ver condominio/notificaciones.py).
+
+Uso:
+    python manage.py archivar_notificaciones
+    python manage.py archivar_notificaciones --dias 30 --lote 2000
+    python manage.py archivar_notificaciones --simular
+"""
+from django.core.management.base import BaseCommand
+from condominio.notificaciones import archivar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Archiva las notificaciones leídas fuera de la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Días en línea de una notificación leída (default NOTIF_RETENCION_DIAS)')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Filas por transacción (default NOTIF_ARCHIVO_LOTE)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo cuenta las notificaciones que se archivarían')
+
+    def handle(self, *args, **options):
+        total = archivar_notificaciones(dias=options['dias'], lote=options['lote'], simular=options['simular'])
+        if options['simular']:
+            self.stdout.write(f'🗂️ Se archivarían {total} notificaciones')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Notificaciones archivadas: {total}'))
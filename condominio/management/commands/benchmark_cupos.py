@@ -0,0 +1,96 @@
+"""
+Benchmark de reservas concurrentes sobre un mismo paquete (ver condominio/cupos.py).
+
+Crea un paquete temporal con --cupos lugares y lanza --intentos reservas desde --hilos
+hilos a la vez, como en un pico promocional. Informa reservas por segundo, latencias
+y verifica que no haya sobreventa (cupos ocupados == reservas exitosas <= cupos).
+El paquete se elimina al terminar.
+
+Ejecutarlo contra PostgreSQL: SQLite serializa todas las escrituras de la base.
+
+Uso:
+    python manage.py benchmark_cupos
+    python manage.py benchmark_cupos --hilos 32 --intentos 2000 --cupos 500
+    python manage.py benchmark_cupos --retener   # retener + confirmar en vez de ocupar directo
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from condominio import cupos
+from condominio.models import Paquete
+
+
+def _reservar(paquete_id, retener):
+    inicio = time.perf_counter()
+    try:
+        if retener:
+            retencion = cupos.retener(paquete_id)
+            with transaction.atomic():
+                cupos.confirmar(retencion.pk, paquete_id)
+        else:
+            with transaction.atomic():
+                cupos.ocupar(paquete_id)
+        resultado = 'exitosa'
+    except cupos.CuposAgotados:
+        resultado = 'agotado'
+    except Exception:
+        resultado = 'error'
+    finally:
+        close_old_connections()
+    return resultado, time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = 'Mide reservas concurrentes de cupos sobre un paquete y verifica que no haya sobreventa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=16, help='Clientes simultáneos (default 16)')
+        parser.add_argument('--intentos', type=int, default=500, help='Reservas a intentar (default 500)')
+        parser.add_argument('--cupos', type=int, default=200, help='Cupos del paquete (default 200)')
+        parser.add_argument('--retener', action='store_true', help='Usar retener + confirmar')
+
+    def handle(self, *args, **options):
+        hoy = timezone.now().date()
+        paquete = Paquete.objects.create(
+            nombre='Benchmark de cupos', descripcion='Paquete temporal de benchmark_cupos',
+            duracion='1 día', precio_base=1, punto_salida='-', estado='Inactivo',
+            cupos_disponibles=options['cupos'], fecha_inicio=hoy, fecha_fin=hoy + timedelta(days=1),
+        )
+        try:
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, options['hilos'])) as pool:
+                resultados = list(pool.map(
+                    lambda _: _reservar(paquete.pk, options['retener']), range(options['intentos'])
+                ))
+            duracion = time.perf_counter() - inicio
+            paquete.refresh_from_db(fields=['cupos_ocupados'])
+        finally:
+            paquete.delete()
+
+        conteo = {clave: sum(1 for r, _ in resultados if r == clave) for clave in ('exitosa', 'agotado', 'error')}
+        latencias = sorted(t * 1000 for _, t in resultados)
+        p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0
+
+        self.stdout.write(
+            f"🎟️ {options['intentos']} intentos con {options['hilos']} hilos en {duracion:.2f} s "
+            f"({options['intentos'] / duracion:.0f} reservas/s)"
+        )
+        self.stdout.write(
+            f"   exitosas={conteo['exitosa']} agotado={conteo['agotado']} errores={conteo['error']} "
+            f"latencia p50={statistics.median(latencias) if latencias else 0:.1f} ms p95={p95:.1f} ms"
+        )
+        esperado = min(options['cupos'], options['intentos'] - conteo['error'])
+        if paquete.cupos_ocupados != conteo['exitosa'] or conteo['exitosa'] > options['cupos']:
+            raise CommandError(
+                f"Sobreventa o desfase: ocupados={paquete.cupos_ocupados} exitosas={conteo['exitosa']} "
+                f"cupos={options['cupos']}"
+            )
+        if conteo['exitosa'] != esperado:
+            self.stdout.write(self.style.WARNING(f'⚠️ Se esperaban {esperado} reservas exitosas'))
+        self.stdout.write(self.style.SUCCESS(f"✅ Sin sobreventa: {paquete.cupos_ocupados}/{options['cupos']} cupos"))
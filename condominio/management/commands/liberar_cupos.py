@@ -0,0 +1,24 @@
+"""
+Management command que devuelve los cupos de retenciones vencidas (checkouts abandonados).
+
+La liberación también ocurre sola cuando un paquete se queda sin cupos; programar este
+comando (cron, cada pocos minutos) mantiene la disponibilidad del catálogo al día.
+
+Uso:
+    python manage.py liberar_cupos
+"""
+from django.core.management.base import BaseCommand
+from condominio.cupos import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Libera los cupos de paquetes retenidos cuyo checkout venció'
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            liberados = liberar_vencidas()
+            if not liberados:
+                break
+            total += liberados
+        self.stdout.write(self.style.SUCCESS(f'✅ Cupos liberados: {total}'))
@@ -0,0 +1,46 @@
+"""
+Management command de mantenimiento de la Bitácora (programar diariamente vía cron).
+
+1. Crea por adelantado las particiones mensuales (PostgreSQL).
+2. Exporta a NDJSON.gz y elimina los meses fuera de la retención.
+
+Uso:
+    python manage.py mantener_bitacora
+    python manage.py mantener_bitacora --retencion-meses 6 --directorio /backups/bitacora
+    python manage.py mantener_bitacora --simular
+"""
+from django.core.management.base import BaseCommand
+from condominio.particiones import asegurar_particiones, archivar_bitacora, directorio_archivo
+
+
+class Command(BaseCommand):
+    help = 'Crea particiones futuras de la bitácora y archiva los meses fuera de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses-adelante', type=int, default=2,
+                            help='Particiones a crear por adelantado (default 2)')
+        parser.add_argument('--retencion-meses', type=int, default=None,
+                            help='Meses en línea (default BITACORA_RETENCION_MESES)')
+        parser.add_argument('--directorio', default=None,
+                            help='Destino de los NDJSON.gz (default BITACORA_ARCHIVO_DIR)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo lista los meses que se archivarían')
+
+    def handle(self, *args, **options):
+        if not options['simular']:
+            creadas = asegurar_particiones(options['meses_adelante'])
+            for nombre in creadas:
+                self.stdout.write(f'🧱 Partición creada: {nombre}')
+
+        directorio = options['directorio'] or directorio_archivo()
+        archivados = archivar_bitacora(
+            meses_retencion=options['retencion_meses'],
+            directorio=directorio,
+            simular=options['simular'],
+        )
+        for mes, ruta, filas in archivados:
+            if options['simular']:
+                self.stdout.write(f'🗂️ Se archivaría {mes:%Y-%m}')
+            else:
+                self.stdout.write(f'🗂️ {mes:%Y-%m}: {filas} filas -> {ruta}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Bitácora mantenida: {len(archivados)} meses archivados'))
@@ -0,0 +1,71 @@
+"""
+Management command para pregenerar las recomendaciones de equipaje de todos los
+paquetes y servicios activos (ver core/ai.py: recomendacion_producto).
+
+Los productos con el mismo contenido comparten recomendación, así que se genera una
+por hash. Con esto el webhook de Stripe casi siempre solo lee la fila guardada.
+
+Uso:
+    python manage.py pregenerar_recomendaciones
+    python manage.py pregenerar_recomendaciones --hilos 8
+    python manage.py pregenerar_recomendaciones --forzar   # regenerar aunque existan
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from condominio.models import Paquete, Servicio, RecomendacionEquipaje
+from core.ai import datos_producto, hash_producto, recomendacion_producto
+
+
+def _generar(item, forzar):
+    try:
+        return recomendacion_producto(item, forzar=forzar)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Pregenera en paralelo las recomendaciones de equipaje de paquetes y servicios activos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4,
+                            help='Llamadas simultáneas al LLM (default 4)')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Regenerar también las que ya existen')
+
+    def handle(self, *args, **options):
+        productos = list(Paquete.objects.filter(estado='Activo')) + list(Servicio.objects.filter(estado='Activo'))
+
+        pendientes = {}
+        for item in productos:
+            pendientes.setdefault(hash_producto(datos_producto(item)), item)
+        if not options['forzar']:
+            existentes = set(
+                RecomendacionEquipaje.objects.filter(hash_contenido__in=pendientes)
+                .values_list('hash_contenido', flat=True)
+            )
+            pendientes = {k: v for k, v in pendientes.items() if k not in existentes}
+
+        self.stdout.write(f'🧳 {len(productos)} productos activos, {len(pendientes)} recomendaciones por generar')
+
+        generadas = fallidas = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['hilos'])) as pool:
+            futuros = {pool.submit(_generar, item, options['forzar']): item for item in pendientes.values()}
+            for futuro in as_completed(futuros):
+                item = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    resultado = {'estado': 'ERROR', 'error': str(e)}
+                # Solo cuenta como generada si quedó guardada (respuesta válida del LLM)
+                if resultado.get('estado') == 'OK' and resultado.get('origen') != 'local':
+                    generadas += 1
+                else:
+                    fallidas += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'⚠️ {item}: {resultado.get("error") or "LLM no disponible, no se guardó"}'
+                    ))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Recomendaciones generadas: {generadas}, fallidas: {fallidas}'))
@@ -0,0 +1,55 @@
+"""
+Management command que procesa la bandeja de webhooks de Stripe (EventoStripe).
+
+Con --continuo es el worker que procesa la bandeja por defecto (Procfile, start.sh);
+con STRIPE_BANDEJA_EN_PROCESO=true los procesos web también la procesan. También sirve
+para vaciar la bandeja a mano o devolver a la cola los eventos FALLIDO.
+
+Uso:
+    python manage.py procesar_webhooks_stripe                      # procesa lo listo y termina
+    python manage.py procesar_webhooks_stripe --continuo           # worker dedicado
+    python manage.py procesar_webhooks_stripe --hilos 8
+    python manage.py procesar_webhooks_stripe --reintentar-fallidos
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from condominio.models import EventoStripe
+from core.bandeja_stripe import bandeja
+
+
+class Command(BaseCommand):
+    help = 'Procesa los eventos pendientes de la bandeja de webhooks de Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=None, help='Hilos del pool (default STRIPE_BANDEJA_HILOS)')
+        parser.add_argument('--continuo', action='store_true', help='No terminar: barrer la bandeja periódicamente')
+        parser.add_argument('--reintentar-fallidos', action='store_true',
+                            help='Devolver a PENDIENTE los eventos FALLIDO antes de procesar')
+
+    def handle(self, *args, **options):
+        hilos = max(1, options['hilos'] or bandeja.hilos)
+        if options['reintentar_fallidos']:
+            devueltos = EventoStripe.objects.filter(estado='FALLIDO').update(
+                estado='PENDIENTE', intentos=0, proximo_intento=timezone.now(),
+            )
+            self.stdout.write(f'🔁 Eventos fallidos devueltos a la cola: {devueltos}')
+
+        # Con un hilo se procesa en el hilo del comando (sin conexiones extra)
+        pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='stripe-webhook') if hilos > 1 else None
+        try:
+            while True:
+                procesados, fallidos = bandeja.despachar(pool, hilos)
+                if procesados or fallidos or not options['continuo']:
+                    self.stdout.write(self.style.SUCCESS(f'✅ Eventos procesados: {procesados}, con error: {fallidos}'))
+                if not options['continuo']:
+                    break
+                time.sleep(bandeja.intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⚠️ Worker detenido por usuario'))
+        finally:
+            if pool:
+                pool.shutdown()
@@ -0,0 +1,23 @@
+"""
+Management command que recalcula los contadores de soporte mantenidos por señales
+(Usuario: carga_soporte, tickets_abiertos, tickets_cerrados, ultimo_ticket,
+notificaciones_no_leidas;
+Ticket: mensajes_count, ultima_actividad) a partir de los tickets y mensajes reales.
+Útil tras cargas masivas, UPDATEs directos o si un proceso cayó a mitad de una operación.
+
+Uso:
+    python manage.py reconciliar_soporte
+"""
+from django.core.management.base import BaseCommand
+from condominio.utils import reconciliar_contadores_soporte
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de tickets de soporte desde la tabla de tickets'
+
+    def handle(self, *args, **options):
+        corregidos = reconciliar_contadores_soporte()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Contadores de soporte reconciliados: {corregidos['usuarios']} usuarios, "
+            f"{corregidos['tickets']} tickets corregidos"
+        ))
@@ -0,0 +1,18 @@
+"""
+Management command que recalcula el calendario de capacidad por servicio y fecha
+(CapacidadServicioDia) a partir de las reservas y sus servicios (ver condominio/capacidad.py).
+Útil tras cargas masivas, UPDATEs directos o si un proceso cayó a mitad de una operación.
+
+Uso:
+    python manage.py reconstruir_capacidad
+"""
+from django.core.management.base import BaseCommand
+from condominio.capacidad import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los lugares reservados por servicio y fecha desde las reservas'
+
+    def handle(self, *args, **options):
+        corregidas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"✅ Calendario de capacidad reconstruido: {corregidas} filas corregidas"))
@@ -0,0 +1,31 @@
+"""
+Management command para reconstruir el catálogo público de paquetes precalculado.
+
+Normalmente no es necesario: las señales mantienen el catálogo al día y el listado
+completa los paquetes que no tengan snapshot. Útil tras cargas masivas (fixtures,
+generar_datos_historicos) o cambios en PaqueteSerializer.
+
+Uso:
+    python manage.py reconstruir_catalogo
+    python manage.py reconstruir_catalogo --paquete-id 3 --paquete-id 7
+"""
+from django.core.management.base import BaseCommand
+from condominio.catalogo import reconstruir_catalogo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los snapshots del catálogo público de paquetes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paquete-id',
+            type=int,
+            action='append',
+            dest='paquete_ids',
+            help='Reconstruir solo este paquete (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        paquete_ids = options.get('paquete_ids')
+        total = reconstruir_catalogo(paquete_ids)
+        self.stdout.write(self.style.SUCCESS(f'✅ Catálogo reconstruido: {total} paquetes'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0012_suscripcion_stripe_session_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogoPaquete',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='JSON serializado del paquete')),
+                ('paquete', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='catalogo', to='condominio.paquete')),
+            ],
+            options={
+                'verbose_name': 'Catálogo de Paquete',
+                'verbose_name_plural': 'Catálogo de Paquetes',
+                'abstract': False,
+            },
+        ),
+    ]
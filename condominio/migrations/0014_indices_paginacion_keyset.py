@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0013_catalogopaquete'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['-created_at', '-id'], name='bitacora_creado_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', '-created_at', '-id'], name='notif_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['-created_at', '-id'], name='reserva_creado_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['cliente', '-created_at', '-id'], name='reserva_cliente_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Particionado mensual de condominio_bitacora (solo PostgreSQL; ver condominio/particiones.py)
+
+from django.db import migrations
+
+
+def particionar(apps, schema_editor):
+    from condominio.particiones import es_postgres, esta_particionada, particionar_tabla
+
+    conexion = schema_editor.connection
+    if es_postgres(conexion) and not esta_particionada(conexion):
+        particionar_tabla(conexion)
+
+
+def desparticionar(apps, schema_editor):
+    from condominio.particiones import esta_particionada, desparticionar_tabla
+
+    conexion = schema_editor.connection
+    if esta_particionada(conexion):
+        desparticionar_tabla(conexion)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0014_indices_paginacion_keyset'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
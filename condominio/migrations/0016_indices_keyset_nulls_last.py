@@ -0,0 +1,38 @@
+# KeysetPagination ordena por created_at DESC NULLS LAST; en PostgreSQL un índice DESC
+# queda NULLS FIRST y no sirve para ese ORDER BY. SQLite ya ubica los NULL al final en
+# DESC (y no acepta NULLS LAST en CREATE INDEX), así que solo se rehacen en PostgreSQL.
+
+from django.db import migrations
+
+INDICES = [
+    ('reserva_creado_id_idx', 'condominio_reserva', ''),
+    ('reserva_cliente_creado_idx', 'condominio_reserva', 'cliente_id, '),
+    ('notif_usuario_creado_idx', 'condominio_notificacion', 'usuario_id, '),
+]
+
+
+def _recrear(schema_editor, nulls):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, tabla, prefijo in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+        schema_editor.execute(f'CREATE INDEX {nombre} ON {tabla} ({prefijo}created_at DESC{nulls}, id DESC)')
+
+
+def nulls_last(apps, schema_editor):
+    _recrear(schema_editor, ' NULLS LAST')
+
+
+def revertir(apps, schema_editor):
+    _recrear(schema_editor, '')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0015_particionar_bitacora'),
+    ]
+
+    operations = [
+        migrations.RunPython(nulls_last, revertir),
+    ]
@@ -0,0 +1,28 @@
+# Búsqueda de texto en paquetes y servicios (solo PostgreSQL; ver condominio/busqueda.py)
+
+from django.db import migrations
+
+
+def instalar(apps, schema_editor):
+    from condominio.busqueda import instalar_busqueda
+
+    if schema_editor.connection.vendor == 'postgresql':
+        instalar_busqueda(schema_editor.connection)
+
+
+def desinstalar(apps, schema_editor):
+    from condominio.busqueda import desinstalar_busqueda
+
+    if schema_editor.connection.vendor == 'postgresql':
+        desinstalar_busqueda(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0016_indices_keyset_nulls_last'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar, desinstalar),
+    ]
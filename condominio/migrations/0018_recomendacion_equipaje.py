@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0017_busqueda_texto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomendacionEquipaje',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('hash_contenido', models.CharField(max_length=64, unique=True)),
+                ('recomendacion', models.JSONField(help_text="JSON con 'texto' e 'items' devuelto por el LLM")),
+            ],
+            options={
+                'verbose_name': 'Recomendación de Equipaje',
+                'verbose_name_plural': 'Recomendaciones de Equipaje',
+                'abstract': False,
+            },
+        ),
+    ]
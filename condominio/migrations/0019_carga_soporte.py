@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def inicializar_carga(apps, schema_editor):
+    Usuario = apps.get_model('condominio', 'Usuario')
+    Ticket = apps.get_model('condominio', 'Ticket')
+    carga = (
+        Ticket.objects.filter(agente=OuterRef('pk'), estado__in=['Asignado', 'Respondido'])
+        .order_by().values('agente').annotate(total=Count('pk')).values('total')
+    )
+    Usuario.objects.filter(tickets_asignados__isnull=False).distinct().update(
+        carga_soporte=Coalesce(Subquery(carga), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0001_initial'),
+        ('condominio', '0018_recomendacion_equipaje'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='carga_soporte',
+            field=models.PositiveIntegerField(default=0, help_text='Tickets Asignados/Respondidos a este agente de soporte'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol', 'carga_soporte', 'id'], name='usuario_rol_carga_idx'),
+        ),
+        migrations.RunPython(inicializar_carga, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _conteo(queryset, campo):
+    return Coalesce(Subquery(
+        queryset.order_by().values(campo).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def inicializar_contadores(apps, schema_editor):
+    Usuario = apps.get_model('condominio', 'Usuario')
+    Ticket = apps.get_model('condominio', 'Ticket')
+    TicketMessage = apps.get_model('condominio', 'TicketMessage')
+
+    mensajes = TicketMessage.objects.filter(ticket=OuterRef('pk'))
+    Ticket.objects.update(
+        mensajes_count=_conteo(mensajes, 'ticket'),
+        ultima_actividad=Coalesce(
+            Subquery(mensajes.order_by('-created_at').values('created_at')[:1]), F('created_at'),
+        ),
+    )
+
+    creados = Ticket.objects.filter(creador=OuterRef('pk'))
+    Usuario.objects.filter(tickets_creados__isnull=False).distinct().update(
+        tickets_abiertos=_conteo(creados.exclude(estado='Cerrado'), 'creador'),
+        tickets_cerrados=_conteo(creados.filter(estado='Cerrado'), 'creador'),
+        ultimo_ticket=Subquery(creados.order_by('-created_at', '-id').values('pk')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0019_carga_soporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='mensajes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='ultima_actividad',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Creación o último mensaje'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='tickets_abiertos',
+            field=models.PositiveIntegerField(default=0, help_text='Tickets creados no cerrados'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='tickets_cerrados',
+            field=models.PositiveIntegerField(default=0, help_text='Tickets creados y cerrados'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='ultimo_ticket',
+            field=models.ForeignKey(blank=True, help_text='Ticket creado más reciente (panel de soporte)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='condominio.ticket'),
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def inicializar_no_leidas(apps, schema_editor):
+    Usuario = apps.get_model('condominio', 'Usuario')
+    Notificacion = apps.get_model('condominio', 'Notificacion')
+    no_leidas = (
+        Notificacion.objects.filter(usuario=OuterRef('pk'), leida=False)
+        .order_by().values('usuario').annotate(total=Count('pk')).values('total')
+    )
+    Usuario.objects.filter(notificaciones__leida=False).distinct().update(
+        notificaciones_no_leidas=Coalesce(Subquery(no_leidas), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0020_contadores_soporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='notificaciones_no_leidas',
+            field=models.PositiveIntegerField(default=0, help_text='Badge (ver notificaciones.py)'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['usuario', '-created_at', '-id'], name='notif_no_leidas_idx'),
+        ),
+        migrations.RunPython(inicializar_no_leidas, migrations.RunPython.noop),
+    ]
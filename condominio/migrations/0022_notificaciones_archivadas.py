@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0021_notificaciones_no_leidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=50)),
+                ('datos', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(null=True)),
+                ('leida_en', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', True)), fields=['created_at', 'id'], name='notif_leidas_creado_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to='condominio.usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionarchivada',
+            index=models.Index(fields=['usuario', 'created_at'], name='notif_arch_usuario_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0022_notificaciones_archivadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetencionCupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveSmallIntegerField(default=1)),
+                ('expira_en', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('paquete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retenciones', to='condominio.paquete')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='retenciones_cupo', to='condominio.usuario')),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:22
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def inicializar_capacidad(apps, schema_editor):
+    Reserva = apps.get_model('condominio', 'Reserva')
+    ReservaServicio = apps.get_model('condominio', 'ReservaServicio')
+    CapacidadServicioDia = apps.get_model('condominio', 'CapacidadServicioDia')
+    reservados = Counter()
+    for filas in (
+        Reserva.objects.filter(servicio__isnull=False).exclude(estado='CANCELADA'),
+        ReservaServicio.objects.exclude(reserva__estado='CANCELADA'),
+    ):
+        for servicio_id, fecha, n in filas.order_by().values('servicio_id', 'fecha').annotate(n=Count('pk')).values_list('servicio_id', 'fecha', 'n'):
+            reservados[(servicio_id, fecha)] += n
+    CapacidadServicioDia.objects.bulk_create([
+        CapacidadServicioDia(servicio_id=servicio_id, fecha=fecha, reservados=n)
+        for (servicio_id, fecha), n in reservados.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0023_retencion_cupo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacidadServicioDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('reservados', models.PositiveIntegerField(default=0)),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capacidad_dias', to='condominio.servicio')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('servicio', 'fecha'), name='capacidad_servicio_fecha_uniq')],
+            },
+        ),
+        migrations.RunPython(inicializar_capacidad, migrations.RunPython.noop),
+    ]
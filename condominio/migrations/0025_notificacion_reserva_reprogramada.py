@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0024_capacidad_servicio_dia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacion',
+            name='tipo',
+            field=models.CharField(choices=[('ticket_nuevo', 'Ticket Nuevo'), ('ticket_respondido', 'Ticket Respondido'), ('ticket_cerrado', 'Ticket Cerrado'), ('reserva_reprogramada', 'Reserva Reprogramada')], max_length=50),
+        ),
+    ]
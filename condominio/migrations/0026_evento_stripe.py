@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0025_notificacion_reserva_reprogramada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_id', models.CharField(max_length=255, unique=True)),
+                ('tipo', models.CharField(max_length=100)),
+                ('datos', models.JSONField(default=dict)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('PROCESADO', 'Procesado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=12)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='evento_stripe_cola_idx')],
+            },
+        ),
+    ]
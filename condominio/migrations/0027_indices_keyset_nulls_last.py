@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:41
+
+# Declara en el estado de los modelos los índices keyset (created_at DESC NULLS LAST,
+# id DESC) que 0016 rehacía con SQL crudo solo en PostgreSQL.
+
+import condominio.pagination
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0026_evento_stripe'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificacion',
+            name='notif_usuario_creado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_creado_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_cliente_creado_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=condominio.pagination.IndiceKeyset(models.F('usuario'), models.OrderBy(models.F('created_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='notif_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=condominio.pagination.IndiceKeyset(models.OrderBy(models.F('created_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='reserva_creado_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=condominio.pagination.IndiceKeyset(models.F('cliente'), models.OrderBy(models.F('created_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='reserva_cliente_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0028_bitacora_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='created_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False, null=True),
+        ),
+    ]
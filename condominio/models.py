@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 
 from authz.models import Rol
 from core.models import TimeStampedModel
+from .pagination import IndiceKeyset
 from django.contrib.auth.models import User
+from django.utils import timezone
 # Create your models here.
 
 
@@ -15,7 +19,28 @@ from django.db import models
 # ======================================
 # 🧍 USUARIO
 # ======================================
-class Usuario(TimeStampedModel):
+class ContadoresMixin:
+    """Modelos con contadores desnormalizados mantenidos con UPDATE ... F() (ver signals_soporte.py).
+
+    save() corre en una transacción (las señales que mueven los contadores quedan dentro)
+    y, en filas existentes, no escribe CONTADORES: una instancia cargada antes del
+    incremento no debe pisarlos.
+    """
+    CONTADORES = ()
+
+    def save(self, *args, **kwargs):
+        if (self.CONTADORES and not self._state.adding
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CONTADORES
+            ]
+        # Sin savepoint: dentro de otra transacción simplemente se une a ella
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Usuario(ContadoresMixin, TimeStampedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil')
     nombre = models.CharField(max_length=100)
     rubro = models.CharField(max_length=100, blank=True, null=True)
@@ -28,6 +53,33 @@ class Usuario(TimeStampedModel):
     documento_identidad = models.CharField(max_length=100, blank=True, null=True)
     pais = models.CharField(max_length=100, blank=True, null=True)
 
+    # Contadores mantenidos con UPDATE ... F() (ver signals_soporte.py)
+    carga_soporte = models.PositiveIntegerField(
+        default=0,
+        help_text="Tickets Asignados/Respondidos a este agente de soporte"
+    )
+
+    tickets_abiertos = models.PositiveIntegerField(default=0, help_text="Tickets creados no cerrados")
+    tickets_cerrados = models.PositiveIntegerField(default=0, help_text="Tickets creados y cerrados")
+    ultimo_ticket = models.ForeignKey(
+        'Ticket', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Ticket creado más reciente (panel de soporte)"
+    )
+
+    notificaciones_no_leidas = models.PositiveIntegerField(default=0, help_text="Badge (ver notificaciones.py)")
+
+    CONTADORES = ('carga_soporte', 'tickets_abiertos', 'tickets_cerrados', 'ultimo_ticket',
+                  'notificaciones_no_leidas')
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            models.Index(fields=['rol', 'carga_soporte', 'id'], name='usuario_rol_carga_idx'),
+        ]
+
+    @property
+    def tickets_total(self):
+        return self.tickets_abiertos + self.tickets_cerrados
+
     def __str__(self):
         return f"{self.nombre}"
     
@@ -99,6 +151,14 @@ class Reserva(TimeStampedModel):
     motivo_reprogramacion = models.CharField(max_length=255, blank=True, null=True)
     reprogramado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='reprogramaciones_realizadas')
 
+    class Meta(TimeStampedModel.Meta):
+        # Soportan la paginación keyset (created_at, id) de listados y mis_reservas
+        indexes = [
+            IndiceKeyset(F('created_at').desc(nulls_last=True), F('id').desc(), name='reserva_creado_id_idx'),
+            IndiceKeyset('cliente', F('created_at').desc(nulls_last=True), F('id').desc(),
+                         name='reserva_cliente_creado_idx'),
+        ]
+
     def __str__(self):
         return f"Reserva #{self.pk} - {self.cliente.nombre}"
 
@@ -167,6 +227,29 @@ class ReservaServicio(models.Model):
         return f"{self.reserva} - {self.servicio.titulo} ({self.fecha})"
 
 
+# ======================================
+# 📆 CAPACIDAD_SERVICIO_DIA (calendario de lugares reservados)
+# ======================================
+class CapacidadServicioDia(models.Model):
+    """Lugares reservados de un servicio en una fecha (ver condominio/capacidad.py).
+
+    Mantenido por signals_capacidad.py; la capacidad es Servicio.capacidad_max. Las
+    fechas sin fila no tienen reservas.
+    """
+    servicio = models.ForeignKey('Servicio', on_delete=models.CASCADE, related_name='capacidad_dias')
+    fecha = models.DateField()
+    reservados = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También es el índice de disponibilidad(): servicio = ? AND fecha BETWEEN ? AND ?
+            models.UniqueConstraint(fields=['servicio', 'fecha'], name='capacidad_servicio_fecha_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Servicio {self.servicio_id} - {self.fecha}: {self.reservados} reservados"
+
+
 # ======================================
 # 🏞️ SERVICIO
 # ======================================
@@ -428,6 +511,64 @@ class PaqueteServicio(TimeStampedModel):
         return f"{self.paquete.nombre} - Día {self.dia}: {self.servicio.titulo}"
 
 
+# ======================================
+# 🗂️ CATALOGO_PAQUETE (snapshot precalculado)
+# ======================================
+class CatalogoPaquete(TimeStampedModel):
+    """Representación serializada (PaqueteSerializer) de un paquete para el catálogo público.
+
+    Se reconstruye cuando cambian Paquete, PaqueteServicio, Servicio o Campania
+    (ver condominio/catalogo.py); el listado público se sirve desde aquí.
+    """
+    paquete = models.OneToOneField(Paquete, on_delete=models.CASCADE, related_name='catalogo')
+    datos = models.JSONField(encoder=DjangoJSONEncoder, help_text="JSON serializado del paquete")
+
+    class Meta(TimeStampedModel.Meta):
+        verbose_name = "Catálogo de Paquete"
+        verbose_name_plural = "Catálogo de Paquetes"
+
+    def __str__(self):
+        return f"Catálogo {self.paquete_id}"
+
+
+class RecomendacionEquipaje(TimeStampedModel):
+    """Recomendación de equipaje generada por el LLM para un contenido de producto.
+
+    La clave es el hash de los campos del paquete/servicio que alimentan el prompt
+    (ver core/ai.py): todas las reservas del mismo producto reutilizan la misma fila
+    y un cambio en esos campos produce otro hash.
+    """
+    hash_contenido = models.CharField(max_length=64, unique=True)
+    recomendacion = models.JSONField(help_text="JSON con 'texto' e 'items' devuelto por el LLM")
+
+    class Meta(TimeStampedModel.Meta):
+        verbose_name = "Recomendación de Equipaje"
+        verbose_name_plural = "Recomendaciones de Equipaje"
+
+    def __str__(self):
+        return f"Recomendación {self.hash_contenido[:12]}"
+
+
+# ======================================
+# ⏳ RETENCION_CUPO (cupos apartados durante el checkout)
+# ======================================
+class RetencionCupo(models.Model):
+    """Cupos de un paquete apartados temporalmente (ver condominio/cupos.py).
+
+    Mientras existe la fila, sus cupos están sumados en Paquete.cupos_ocupados. Al
+    confirmar la reserva la fila se elimina y los cupos quedan ocupados; si vence sin
+    confirmarse, liberar_vencidas() los devuelve.
+    """
+    paquete = models.ForeignKey('Paquete', on_delete=models.CASCADE, related_name='retenciones')
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, null=True, blank=True, related_name='retenciones_cupo')
+    cantidad = models.PositiveSmallIntegerField(default=1)
+    expira_en = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Retención #{self.pk} - paquete {self.paquete_id} x{self.cantidad} hasta {self.expira_en}"
+
+
 # ======================================
 # 🔗 CAMPAÑA_SERVICIO (intermedia muchos a muchos)
 # ======================================
@@ -645,7 +786,7 @@ class Reprogramacion(TimeStampedModel):
 # 🆘 SOPORTE / TICKETS (CU17)
 # Minimal models required for soporte (no relación con Reserva)
 # ======================================
-class Ticket(TimeStampedModel):
+class Ticket(ContadoresMixin, TimeStampedModel):
     ESTADOS = [
         ('Abierto', 'Abierto'),
         ('Asignado', 'Asignado'),
@@ -660,6 +801,13 @@ class Ticket(TimeStampedModel):
     agente = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='tickets_asignados')
     prioridad = models.CharField(max_length=10, blank=True, null=True)
     cerrado_en = models.DateTimeField(null=True, blank=True)
+    mensajes_count = models.PositiveIntegerField(default=0)
+    ultima_actividad = models.DateTimeField(default=timezone.now, help_text="Creación o último mensaje")
+    # default en vez de auto_now_add: al crear, ultima_actividad toma exactamente este
+    # instante (reconciliar_soporte compara ambos en tickets sin mensajes)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, null=True, blank=True)
+
+    CONTADORES = ('mensajes_count', 'ultima_actividad')
 
     class Meta(TimeStampedModel.Meta):
         ordering = ['-created_at']
@@ -667,8 +815,13 @@ class Ticket(TimeStampedModel):
     def __str__(self):
         return f"Ticket #{self.pk or 'Nuevo'} - {self.asunto} ({self.estado})"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.created_at:
+            self.ultima_actividad = self.created_at
+        super().save(*args, **kwargs)
 
-class TicketMessage(TimeStampedModel):
+
+class TicketMessage(ContadoresMixin, TimeStampedModel):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='messages')
     autor = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='mensajes_soporte')
     texto = models.TextField()
@@ -677,11 +830,12 @@ class TicketMessage(TimeStampedModel):
         return f"Mensaje #{self.pk or 'Nuevo'} - Ticket {self.ticket.pk or 'Nuevo'} by {self.autor.nombre}"
 
 
-class Notificacion(TimeStampedModel):
+class Notificacion(ContadoresMixin, TimeStampedModel):
     TIPOS = [
         ('ticket_nuevo', 'Ticket Nuevo'),
         ('ticket_respondido', 'Ticket Respondido'),
         ('ticket_cerrado', 'Ticket Cerrado'),
+        ('reserva_reprogramada', 'Reserva Reprogramada'),
     ]
 
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notificaciones')
@@ -689,10 +843,44 @@ class Notificacion(TimeStampedModel):
     datos = models.JSONField(blank=True, null=True)
     leida = models.BooleanField(default=False)
 
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            IndiceKeyset('usuario', F('created_at').desc(nulls_last=True), F('id').desc(),
+                         name='notif_usuario_creado_idx'),
+            # Parcial: solo las no leídas (listado ?leida=false y reconciliación del badge)
+            models.Index(fields=['usuario', '-created_at', '-id'], condition=models.Q(leida=False),
+                         name='notif_no_leidas_idx'),
+            # Parcial: candidatas a archivar (leídas más antiguas que la retención)
+            models.Index(fields=['created_at', 'id'], condition=models.Q(leida=True),
+                         name='notif_leidas_creado_idx'),
+        ]
+
     def __str__(self):
         return f"Notificación #{self.pk or 'Nueva'} -> {self.usuario.nombre} ({self.tipo})"
 
 
+class NotificacionArchivada(models.Model):
+    """Notificación leída movida fuera de la tabla caliente (ver notificaciones.archivar_notificaciones).
+
+    Conserva el id original y solo las columnas necesarias para historial y métricas
+    de campañas; leida_en es el updated_at de la notificación al archivarla.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notificaciones_archivadas')
+    tipo = models.CharField(max_length=50)
+    datos = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(null=True)
+    leida_en = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'created_at'], name='notif_arch_usuario_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificación archivada #{self.pk} -> usuario {self.usuario_id} ({self.tipo})"
+
+
 # ======================================
 # Bitacora / Log de acciones
 # ======================================
@@ -705,6 +893,14 @@ class Bitacora(TimeStampedModel):
     accion = models.CharField(max_length=150)
     descripcion = models.TextField(blank=True, null=True)
     ip_address = models.CharField(max_length=45, blank=True, null=True)
+    # default en vez de auto_now_add: el escritor por lotes (auditoria.py) fija el
+    # instante real del evento antes del bulk_create y auto_now_add lo reemplazaría
+    created_at = models.DateTimeField(default=timezone.now, editable=False, null=True, blank=True)
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='bitacora_creado_id_idx'),
+        ]
 
     def __str__(self):
         who = self.usuario.nombre if self.usuario else 'Anon'
@@ -1001,3 +1197,37 @@ class Suscripcion(TimeStampedModel):
         from django.utils import timezone
         hoy = timezone.now().date()
         return self.activa and self.fecha_inicio <= hoy <= self.fecha_fin
+
+
+# ======================================
+# 💳 BANDEJA DE WEBHOOKS DE STRIPE
+# ======================================
+class EventoStripe(models.Model):
+    """Evento de Stripe recibido por el webhook (ver core/bandeja_stripe.py).
+
+    stripe_id es único: un reenvío del mismo evento no crea otra fila. proximo_intento
+    indica desde cuándo puede tomarse la fila: el siguiente reintento si está PENDIENTE
+    o el vencimiento de la toma si está EN_PROCESO (si el proceso muere, se retoma).
+    """
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('PROCESADO', 'Procesado'),
+        ('FALLIDO', 'Fallido'),
+    ]
+
+    stripe_id = models.CharField(max_length=255, unique=True)
+    tipo = models.CharField(max_length=100)
+    datos = models.JSONField(default=dict)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default='PENDIENTE')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['estado', 'proximo_intento'], name='evento_stripe_cola_idx')]
+
+    def __str__(self):
+        return f"{self.tipo} {self.stripe_id} ({self.estado})"
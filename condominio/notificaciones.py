@@ -0,0 +1,203 @@
+"""
+Contador de notificaciones no leídas (badge), cambios de estado de lectura en bloque y
+retención de la tabla de notificaciones.
+
+Usuario.notificaciones_no_leidas se mantiene con UPDATE ... F() desde
+signals_notificaciones.py y desde marcar_leidas(); al restar se acota en 0. Las apps
+móviles consultan el badge con frecuencia: no_leidas() lo sirve desde la caché y solo
+lee la columna del Usuario cuando la entrada no existe. Cada cambio del contador borra
+la entrada, por eso solo se cachea si la caché es compartida entre procesos
+(cache_compartida.py); si no, cada consulta lee la columna (una fila por pk).
+
+Retención: cada campaña crea una Notificacion por destinatario. archivar_notificaciones()
+mueve por lotes las leídas con más de NOTIF_RETENCION_DIAS a NotificacionArchivada
+(tabla compacta, sin updated_at ni leida) para que la tabla caliente solo tenga lo reciente
+y lo pendiente. Las no leídas nunca se archivan.
+
+Avisos masivos (p. ej. reprogramación por lote): crear_notificaciones() inserta todas
+las notificaciones con un bulk_create y replica lo que harían las señales por fila.
+
+Settings opcionales:
+    NOTIF_NO_LEIDAS_TTL: segundos de vida de la entrada en caché (default 300).
+    NOTIF_RETENCION_DIAS: días que una notificación leída permanece en línea (default 90).
+    NOTIF_ARCHIVO_LOTE: filas movidas por transacción (default 5000).
+"""
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cache_compartida import es_compartida
+
+logger = logging.getLogger(__name__)
+
+NO_LEIDAS_TTL_DEFAULT = 300
+RETENCION_DIAS_DEFAULT = 90
+LOTE_ARCHIVO_DEFAULT = 5000
+
+
+def _clave(usuario_id):
+    return f'notif_no_leidas:{usuario_id}'
+
+
+def invalidar_no_leidas(usuario_id):
+    """Borra el badge cacheado ahora y otra vez al confirmar la transacción.
+
+    El segundo borrado descarta un valor viejo que otra petición haya cacheado entre el
+    UPDATE y el COMMIT.
+    """
+    cache.delete(_clave(usuario_id))
+    transaction.on_commit(lambda: cache.delete(_clave(usuario_id)))
+
+
+def ajustar_no_leidas(usuario_id, delta):
+    """Suma delta al contador del usuario sin bajar de 0 (un contador desfasado queda en 0)."""
+    from .models import Usuario
+
+    if not usuario_id or not delta:
+        return
+    nuevo = F('notificaciones_no_leidas') + delta
+    Usuario.objects.filter(pk=usuario_id).update(
+        notificaciones_no_leidas=Greatest(nuevo, 0) if delta < 0 else nuevo,
+    )
+    invalidar_no_leidas(usuario_id)
+
+
+def no_leidas(usuario_id):
+    """Número de notificaciones no leídas del usuario (caché, o una consulta por columna)."""
+    from .models import Usuario
+
+    compartida = es_compartida()
+    clave = _clave(usuario_id)
+    total = cache.get(clave) if compartida else None
+    if total is None:
+        total = Usuario.objects.filter(pk=usuario_id).values_list('notificaciones_no_leidas', flat=True).first() or 0
+        if compartida:
+            cache.set(clave, total, getattr(settings, 'NOTIF_NO_LEIDAS_TTL', NO_LEIDAS_TTL_DEFAULT))
+    return total
+
+
+def marcar_leidas(usuario_id, ids=None):
+    """Marca como leídas las notificaciones del usuario (todas, o solo ids) en un UPDATE.
+
+    Los UPDATE en bloque no disparan señales: el contador se ajusta aquí con las filas
+    afectadas, dentro de la misma transacción. Retorna cuántas se marcaron.
+    """
+    from .models import Notificacion
+
+    filas = Notificacion.objects.filter(usuario_id=usuario_id, leida=False)
+    if ids is not None:
+        filas = filas.filter(pk__in=ids)
+    with transaction.atomic():
+        marcadas = filas.update(leida=True, updated_at=timezone.now())
+        ajustar_no_leidas(usuario_id, -marcadas)
+    return marcadas
+
+
+def corte_retencion(dias=None):
+    dias = getattr(settings, 'NOTIF_RETENCION_DIAS', RETENCION_DIAS_DEFAULT) if dias is None else dias
+    return timezone.now() - timedelta(days=dias)
+
+
+def archivar_notificaciones(dias=None, lote=None, simular=False):
+    """Mueve a NotificacionArchivada las leídas anteriores al corte; retorna cuántas.
+
+    Cada lote es una transacción: INSERT en el archivo y DELETE en la tabla caliente.
+    Con simular=True solo cuenta las candidatas.
+    """
+    from .models import Notificacion, NotificacionArchivada
+
+    lote = lote or getattr(settings, 'NOTIF_ARCHIVO_LOTE', LOTE_ARCHIVO_DEFAULT)
+    candidatas = Notificacion.objects.filter(leida=True, created_at__lt=corte_retencion(dias))
+    if simular:
+        return candidatas.count()
+
+    if connection.features.has_select_for_update_skip_locked:
+        # Filas que otra transacción está modificando quedan para la próxima ejecución
+        candidatas = candidatas.select_for_update(skip_locked=True)
+    movidas = 0
+    while True:
+        with transaction.atomic():
+            filas = list(
+                candidatas.order_by('created_at', 'id')
+                .values('id', 'usuario_id', 'tipo', 'datos', 'created_at', 'updated_at')[:lote]
+            )
+            if not filas:
+                break
+            NotificacionArchivada.objects.bulk_create([
+                NotificacionArchivada(
+                    id=f['id'], usuario_id=f['usuario_id'], tipo=f['tipo'], datos=f['datos'],
+                    created_at=f['created_at'], leida_en=f['updated_at'],
+                )
+                for f in filas
+            ], ignore_conflicts=True)
+            # DELETE directo por SQL: post_delete de Notificacion solo ajusta el badge de
+            # las no leídas (aquí todas están leídas) y QuerySet.delete() volvería a cargar
+            # cada fila del lote para enviar las señales
+            ids = [f['id'] for f in filas]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {Notificacion._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(ids))})',
+                    ids,
+                )
+        movidas += len(filas)
+    return movidas
+
+
+def _push_activado():
+    """Misma variable que activa signals_fcm para las notificaciones individuales."""
+    valor = os.getenv('HABILITAR_SEÑAL_FCM', '').strip().strip('"').strip("'").lower()
+    return valor in ('1', 'true', 'si', 'yes')
+
+
+def crear_notificaciones(tipo, datos_por_usuario, titulo, cuerpo):
+    """Crea una Notificacion por usuario con un bulk_create; retorna las creadas.
+
+    bulk_create no dispara señales: aquí se suma el badge (un UPDATE), y al confirmar
+    la transacción se publican los eventos SSE y, si FCM está activado, se envía un solo
+    push a todos los dispositivos de los destinatarios.
+    """
+    from .eventos import publicar
+    from .models import FCMDevice, Notificacion, Usuario
+
+    if not datos_por_usuario:
+        return []
+    creadas = Notificacion.objects.bulk_create([
+        Notificacion(usuario_id=usuario_id, tipo=tipo, datos={'titulo': titulo, 'mensaje': cuerpo, **datos})
+        for usuario_id, datos in datos_por_usuario.items()
+    ])
+    Usuario.objects.filter(pk__in=datos_por_usuario).update(
+        notificaciones_no_leidas=F('notificaciones_no_leidas') + 1,
+    )
+    for notificacion in creadas:
+        invalidar_no_leidas(notificacion.usuario_id)
+        if notificacion.pk:  # bulk_create sin RETURNING no asigna pk
+            publicar([notificacion.usuario_id], {
+                'tipo': 'notificacion', 'id': notificacion.pk,
+                'tipo_notificacion': tipo, 'fecha': notificacion.created_at,
+            })
+
+    if _push_activado():
+        def enviar_push():
+            from core.notifications import enviar_tokens_push
+
+            tokens = [
+                {'token': token, 'tipo': tipo_dispositivo}
+                for token, tipo_dispositivo in FCMDevice.objects.filter(
+                    usuario_id__in=datos_por_usuario, activo=True,
+                ).values_list('registration_id', 'tipo_dispositivo')
+            ]
+            if tokens:
+                try:
+                    enviar_tokens_push(tokens, titulo, cuerpo, {'tipo': tipo})
+                except Exception:
+                    logger.exception('No se pudo enviar el push de %s', tipo)
+
+        transaction.on_commit(enviar_push)
+    return creadas
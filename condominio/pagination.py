@@ -0,0 +1,170 @@
+"""
+Paginación keyset (cursor) sobre (created_at, id) para listados de alto volumen.
+
+A diferencia de PageNumberPagination no usa OFFSET: cada página filtra a partir de la
+última fila vista (created_at, id) y se apoya en los índices compuestos de cada modelo,
+por lo que la página 1000 cuesta lo mismo que la primera.
+
+Orden: más recientes primero; filas con created_at NULL (datos legados) al final.
+Cada página se lee por tramos: primero las filas con fecha, acotadas por
+created_at <= cursor (rango del índice), y solo si faltan filas el tramo de NULL.
+Los índices se declaran con IndiceKeyset (created_at DESC NULLS LAST, id DESC).
+Respuesta: {"next": url|null, "previous": url|null, "results": [...]}.
+"""
+import base64
+import json
+
+from django.db import models
+from django.db.models import Q
+from django.db.models.expressions import OrderBy
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor and cursor['r']:
+            # Página anterior: recorrer en orden ascendente y luego invertir
+            filas = self._leer(self._tramos_antes(queryset, cursor), page_size + 1)
+            self.has_previous = len(filas) > page_size
+            self.has_next = True
+            filas = list(reversed(filas[:page_size]))
+        else:
+            filas = self._leer(self._tramos_despues(queryset, cursor), page_size + 1)
+            self.has_next = len(filas) > page_size
+            self.has_previous = cursor is not None
+            filas = filas[:page_size]
+
+        self.page = filas
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Cursores
+    # ------------------------------------------------------------------
+    def get_page_size(self, request):
+        try:
+            valor = int(request.query_params[self.page_size_query_param])
+            if valor > 0:
+                return min(valor, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        posicion = {
+            'c': obj.created_at.isoformat() if obj.created_at else None,
+            'i': obj.pk,
+            'r': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(posicion).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            posicion = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            creado = parse_datetime(posicion['c']) if posicion['c'] else None
+            if posicion['c'] and creado is None:
+                raise ValueError(posicion['c'])
+            return {'c': creado, 'i': int(posicion['i']), 'r': bool(posicion.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _leer(tramos, limite):
+        """Concatena los tramos en orden hasta juntar `limite` filas."""
+        filas = []
+        for qs in tramos:
+            filas += list(qs[:limite - len(filas)])
+            if len(filas) >= limite:
+                break
+        return filas
+
+    @staticmethod
+    def _tramos_despues(queryset, cursor):
+        """Filas posteriores a la posición en orden (created_at DESC NULLS LAST, id DESC)."""
+        con_fecha = queryset.filter(created_at__isnull=False).order_by('-created_at', '-id')
+        sin_fecha = queryset.filter(created_at__isnull=True).order_by('-id')
+        if cursor is None:
+            return [con_fecha, sin_fecha]
+        creado, pk = cursor['c'], cursor['i']
+        if creado is None:
+            return [sin_fecha.filter(id__lt=pk)]
+        # Cota AND sobre created_at: el índice arranca el rango en el cursor
+        return [
+            con_fecha.filter(Q(created_at__lte=creado) & (Q(created_at__lt=creado) | Q(id__lt=pk))),
+            sin_fecha,
+        ]
+
+    @staticmethod
+    def _tramos_antes(queryset, cursor):
+        """Filas anteriores a la posición, de la más cercana a la más lejana."""
+        creado, pk = cursor['c'], cursor['i']
+        con_fecha = queryset.filter(created_at__isnull=False).order_by('created_at', 'id')
+        if creado is None:
+            return [queryset.filter(created_at__isnull=True, id__gt=pk).order_by('id'), con_fecha]
+        return [con_fecha.filter(Q(created_at__gte=creado) & (Q(created_at__gt=creado) | Q(id__gt=pk)))]
+
+
+class IndiceKeyset(models.Index):
+    """Índice para KeysetPagination: declarar con F('created_at').desc(nulls_last=True).
+
+    SQLite no acepta NULLS LAST en CREATE INDEX y en DESC ya ubica los NULL al final,
+    así que ahí se crea sin el modificador; en PostgreSQL queda tal como se declara.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'sqlite':
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        expresiones = [
+            OrderBy(e.expression, descending=e.descending) if isinstance(e, OrderBy) else e
+            for e in self.expressions
+        ]
+        indice = models.Index(*expresiones, name=self.name, condition=self.condition)
+        return indice.create_sql(model, schema_editor, using=using, **kwargs)
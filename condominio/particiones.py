@@ -0,0 +1,308 @@
+"""
+Particionado mensual y retención de la Bitácora.
+
+En PostgreSQL la tabla condominio_bitacora es una tabla particionada por RANGE(created_at)
+con una partición por mes (condominio_bitacora_pYYYYMM) más una partición DEFAULT para
+filas con created_at NULL o fuera de los meses creados. Las consultas recientes (listado
+keyset ordenado por created_at, filtros desde/hasta) solo tocan las particiones calientes.
+
+En otros motores (SQLite en desarrollo) la tabla es normal; la retención borra por rango.
+
+Retención: los meses anteriores al corte se exportan a
+<directorio>/bitacora_YYYY_MM.ndjson.gz (una fila JSON por línea) y luego se eliminan
+(DETACH + DROP de la partición en PostgreSQL, DELETE por lotes en el resto).
+
+Settings:
+    BITACORA_RETENCION_MESES: meses completos que se conservan en línea (default 12).
+    BITACORA_ARCHIVO_DIR: directorio de los archivos NDJSON.gz (default BASE_DIR/archivos/bitacora).
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, time, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection as conexion_default, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLA = 'condominio_bitacora'
+PARTICION_DEFAULT = f'{TABLA}_default'
+SECUENCIA = f'{TABLA}_id_seq'
+RETENCION_MESES_DEFAULT = 12
+LOTE_BORRADO = 5000
+
+
+# =====================================================
+# Utilidades de fechas
+# =====================================================
+def inicio_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(fecha, meses):
+    total = fecha.year * 12 + (fecha.month - 1) + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def limite_utc(mes):
+    """Medianoche UTC del mes: el mismo límite que usan las particiones de PostgreSQL."""
+    return datetime.combine(mes, time.min, tzinfo=dt_timezone.utc)
+
+
+def rango_mes(mes):
+    return {'created_at__gte': limite_utc(mes), 'created_at__lt': limite_utc(sumar_meses(mes, 1))}
+
+
+def nombre_particion(mes):
+    return f'{TABLA}_p{mes.year:04d}{mes.month:02d}'
+
+
+def es_postgres(conexion=None):
+    return (conexion or conexion_default).vendor == 'postgresql'
+
+
+def esta_particionada(conexion=None):
+    conexion = conexion or conexion_default
+    if not es_postgres(conexion):
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLA],
+        )
+        return cursor.fetchone() is not None
+
+
+# =====================================================
+# Particiones (PostgreSQL)
+# =====================================================
+def particiones_existentes(conexion=None):
+    """Meses (date del día 1) con partición propia, ordenados."""
+    conexion = conexion or conexion_default
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [TABLA],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    prefijo = f'{TABLA}_p'
+    meses = []
+    for nombre in nombres:
+        sufijo = nombre[len(prefijo):] if nombre.startswith(prefijo) else ''
+        if len(sufijo) == 6 and sufijo.isdigit():
+            meses.append(date(int(sufijo[:4]), int(sufijo[4:]), 1))
+    return sorted(meses)
+
+
+def crear_particion(mes, conexion=None):
+    """Crea la partición del mes moviendo antes las filas que hayan caído en DEFAULT.
+
+    Idempotente: si ya existe no hace nada. Retorna True si la creó.
+    """
+    conexion = conexion or conexion_default
+    mes = inicio_mes(mes)
+    if mes in particiones_existentes(conexion):
+        return False
+
+    nombre = nombre_particion(mes)
+    desde, hasta = mes.isoformat(), sumar_meses(mes, 1).isoformat()
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS)')
+        # ATTACH falla si DEFAULT contiene filas del rango: moverlas primero
+        cursor.execute(
+            f'WITH movidas AS (DELETE FROM {PARTICION_DEFAULT} '
+            f'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {nombre} SELECT * FROM movidas',
+            [desde, hasta],
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} FOR VALUES FROM (%s) TO (%s)",
+            [desde, hasta],
+        )
+    logger.info('Partición %s creada', nombre)
+    return True
+
+
+def asegurar_particiones(meses_adelante=2, conexion=None):
+    """Crea las particiones desde el mes actual hasta meses_adelante. Retorna las creadas."""
+    conexion = conexion or conexion_default
+    if not esta_particionada(conexion):
+        return []
+    hoy = inicio_mes(date.today())
+    return [
+        nombre_particion(sumar_meses(hoy, i))
+        for i in range(meses_adelante + 1)
+        if crear_particion(sumar_meses(hoy, i), conexion)
+    ]
+
+
+def particionar_tabla(conexion):
+    """Convierte la tabla normal creada por Django en tabla particionada por mes.
+
+    Se usa desde la migración 0015. Sin PRIMARY KEY en la tabla padre: PostgreSQL
+    exigiría incluir created_at (nullable). El id sigue siendo único por la secuencia
+    y queda indexado para las búsquedas por pk. El índice de created_at usa NULLS LAST,
+    el mismo orden que KeysetPagination.
+    """
+    legado = f'{TABLA}_legado'
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLA} RENAME TO {legado}')
+        cursor.execute(
+            f'CREATE TABLE {TABLA} (LIKE {legado} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'CREATE TABLE {PARTICION_DEFAULT} PARTITION OF {TABLA} DEFAULT')
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SECUENCIA}_p OWNED BY {TABLA}.id')
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{SECUENCIA}_p')")
+
+        cursor.execute(f'SELECT MIN(created_at), MAX(id) FROM {legado}')
+        minimo, max_id = cursor.fetchone()
+
+    # Particiones para todo el histórico existente y los próximos meses
+    hoy = inicio_mes(date.today())
+    mes = inicio_mes(minimo.date()) if minimo else hoy
+    while mes <= sumar_meses(hoy, 2):
+        crear_particion(mes, conexion)
+        mes = sumar_meses(mes, 1)
+
+    with conexion.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {TABLA} SELECT * FROM {legado}')
+        if max_id:
+            cursor.execute(f"SELECT setval('{SECUENCIA}_p', %s)", [max_id])
+        cursor.execute(f'DROP TABLE {legado}')
+        cursor.execute(f'CREATE INDEX {TABLA}_id_idx ON {TABLA} (id)')
+        cursor.execute(f'CREATE INDEX {TABLA}_usuario_id_idx ON {TABLA} (usuario_id)')
+        cursor.execute(f'CREATE INDEX bitacora_creado_id_idx ON {TABLA} (created_at DESC NULLS LAST, id DESC)')
+        cursor.execute(
+            f'ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_usuario_id_fk FOREIGN KEY (usuario_id) '
+            f'REFERENCES condominio_usuario (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def desparticionar_tabla(conexion):
+    """Reverso de particionar_tabla: vuelve a una tabla normal con PRIMARY KEY (id)."""
+    with conexion.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {TABLA}_plana (LIKE {TABLA} INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO {TABLA}_plana SELECT * FROM {TABLA}')
+        cursor.execute(f'ALTER TABLE {TABLA}_plana ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'ALTER SEQUENCE {SECUENCIA}_p OWNED BY NONE')
+        cursor.execute(f'DROP TABLE {TABLA} CASCADE')
+        cursor.execute(f'ALTER TABLE {TABLA}_plana RENAME TO {TABLA}')
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{SECUENCIA}_p')")
+        cursor.execute(f'ALTER SEQUENCE {SECUENCIA}_p OWNED BY {TABLA}.id')
+        cursor.execute(f'ALTER TABLE {TABLA} ADD PRIMARY KEY (id)')
+        cursor.execute(f'CREATE INDEX {TABLA}_usuario_id_idx ON {TABLA} (usuario_id)')
+        cursor.execute(f'CREATE INDEX bitacora_creado_id_idx ON {TABLA} (created_at DESC NULLS LAST, id DESC)')
+        cursor.execute(
+            f'ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_usuario_id_fk FOREIGN KEY (usuario_id) '
+            f'REFERENCES condominio_usuario (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+# =====================================================
+# Retención y archivo
+# =====================================================
+def directorio_archivo():
+    por_defecto = Path(settings.BASE_DIR) / 'archivos' / 'bitacora'
+    return Path(getattr(settings, 'BITACORA_ARCHIVO_DIR', por_defecto))
+
+
+def corte_retencion(meses=None, hoy=None):
+    """Primer día del mes más antiguo que se conserva en línea."""
+    meses = getattr(settings, 'BITACORA_RETENCION_MESES', RETENCION_MESES_DEFAULT) if meses is None else meses
+    return sumar_meses(inicio_mes(hoy or date.today()), -meses)
+
+
+def exportar_mes(mes, directorio):
+    """Escribe las filas del mes en bitacora_YYYY_MM.ndjson.gz. Retorna (ruta, filas).
+
+    Se escribe en un archivo temporal y se renombra al final: un archivo con el nombre
+    definitivo siempre está completo.
+    """
+    from .models import Bitacora
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f'bitacora_{mes.year:04d}_{mes.month:02d}.ndjson.gz'
+    temporal = ruta.with_suffix('.gz.tmp')
+
+    filas = (
+        Bitacora.objects
+        .filter(**rango_mes(mes))
+        .order_by('created_at', 'id')
+        .values('id', 'created_at', 'updated_at', 'usuario_id', 'accion', 'descripcion', 'ip_address')
+    )
+    total = 0
+    with open(temporal, 'wb') as crudo:
+        with gzip.GzipFile(fileobj=crudo, mode='wb') as comprimido:
+            for fila in filas.iterator(chunk_size=2000):
+                linea = json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+                comprimido.write(linea.encode('utf-8'))
+                total += 1
+        crudo.flush()
+        os.fsync(crudo.fileno())
+
+    if ruta.exists():
+        # Archivado previo del mismo mes (ej. ejecución interrumpida): conservar ambos
+        marca = date.today().strftime('%Y%m%d')
+        ruta = ruta.with_name(ruta.name.replace('.ndjson.gz', f'_{marca}_{os.getpid()}.ndjson.gz'))
+    os.replace(temporal, ruta)
+    return ruta, total
+
+
+def _eliminar_mes(mes, conexion):
+    from .models import Bitacora
+
+    if esta_particionada(conexion) and mes in particiones_existentes(conexion):
+        nombre = nombre_particion(mes)
+        with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {TABLA} DETACH PARTITION {nombre}')
+            cursor.execute(f'DROP TABLE {nombre}')
+        return
+
+    rango = Bitacora.objects.filter(**rango_mes(mes))
+    while True:
+        ids = list(rango.values_list('id', flat=True)[:LOTE_BORRADO])
+        if not ids:
+            break
+        Bitacora.objects.filter(id__in=ids).delete()
+
+
+def meses_a_archivar(corte, conexion=None):
+    """Meses anteriores al corte que todavía tienen datos en línea."""
+    from .models import Bitacora
+
+    conexion = conexion or conexion_default
+    if esta_particionada(conexion):
+        meses = set(m for m in particiones_existentes(conexion) if m < corte)
+    else:
+        meses = set()
+    primero = Bitacora.objects.filter(created_at__lt=limite_utc(corte)).order_by('created_at').values_list('created_at', flat=True).first()
+    if primero:
+        mes = inicio_mes(primero.astimezone(dt_timezone.utc).date())
+        while mes < corte:
+            meses.add(mes)
+            mes = sumar_meses(mes, 1)
+    return sorted(meses)
+
+
+def archivar_bitacora(meses_retencion=None, directorio=None, simular=False, conexion=None):
+    """Exporta y elimina los meses fuera de la retención. Retorna [(mes, ruta, filas)]."""
+    conexion = conexion or conexion_default
+    directorio = directorio or directorio_archivo()
+    resultado = []
+    for mes in meses_a_archivar(corte_retencion(meses_retencion), conexion):
+        if simular:
+            resultado.append((mes, None, None))
+            continue
+        ruta, filas = exportar_mes(mes, directorio)
+        _eliminar_mes(mes, conexion)
+        logger.info('Bitácora %s archivada en %s (%s filas)', mes.strftime('%Y-%m'), ruta, filas)
+        resultado.append((mes, ruta, filas))
+    return resultado
@@ -0,0 +1,75 @@
+"""
+Resolución única del perfil (Usuario) y rol del usuario autenticado por petición.
+
+resolver_perfil(user) carga el perfil con una consulta select_related('rol') y lo deja
+enlazado a ese objeto user, de modo que user.perfil, hasattr(user, 'perfil') y
+get_user_perfil(user) no vuelven a consultar en la misma petición.
+
+Entre peticiones el resultado se guarda en una caché corta por user_id solo si la caché
+es compartida entre procesos (cache_compartida.py): signals_perfil.py invalida la
+entrada cuando cambian Usuario, UserRole o Rol, y ese borrado debe llegar a todos los
+workers para que un rol revocado no siga vigente.
+
+Settings opcionales:
+    PERFIL_CACHE_TTL: segundos de vida de la entrada en caché (default 60).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_compartida import es_compartida
+
+PERFIL_CACHE_TTL_DEFAULT = 60
+_SIN_PERFIL = '__sin_perfil__'
+_NO_RESUELTO = object()
+
+
+def _clave(user_id):
+    return f'perfil_rol:{user_id}'
+
+
+def _firma_user(user):
+    """Distingue un user de otro que reutilice el mismo id (borrado/recreado)."""
+    joined = getattr(user, 'date_joined', None)
+    return f"{getattr(user, 'username', '')}|{joined.isoformat() if joined else ''}"
+
+
+def invalidar_perfil(*user_ids):
+    """Elimina de la caché el perfil/rol resuelto de los usuarios indicados."""
+    claves = [_clave(pk) for pk in user_ids if pk is not None]
+    if claves:
+        cache.delete_many(claves)
+
+
+def resolver_perfil(user):
+    """Retorna el Usuario (con rol cargado) del user autenticado, o None."""
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+
+    # Ya resuelto para este objeto user (misma petición)
+    perfil = getattr(user, '_perfil_resuelto', _NO_RESUELTO)
+    if perfil is not _NO_RESUELTO:
+        return perfil
+
+    from .models import Usuario
+
+    firma = _firma_user(user)
+    compartida = es_compartida()
+    cacheado = cache.get(_clave(user.pk)) if compartida else None
+    if cacheado is None or cacheado[0] != firma:
+        perfil = Usuario.objects.select_related('rol').filter(user_id=user.pk).first()
+        if compartida:
+            cache.set(
+                _clave(user.pk),
+                (firma, perfil if perfil is not None else _SIN_PERFIL),
+                getattr(settings, 'PERFIL_CACHE_TTL', PERFIL_CACHE_TTL_DEFAULT),
+            )
+    else:
+        perfil = None if cacheado[1] == _SIN_PERFIL else cacheado[1]
+
+    # Enlazar ambos lados de la relación OneToOne para evitar nuevas consultas
+    Usuario.user.field.remote_field.set_cached_value(user, perfil)
+    if perfil is not None:
+        Usuario.user.field.set_cached_value(perfil, user)
+    user._perfil_resuelto = perfil
+    return perfil
+
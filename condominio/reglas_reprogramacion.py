@@ -0,0 +1,336 @@
+"""
+Motor de reglas de reprogramación compilado y cacheado.
+
+ReglaReprogramacion.obtener_regla_activa() y ConfiguracionGlobalReprogramacion.
+obtener_configuracion() hacen una consulta por tipo de regla cada vez; validar una
+reprogramación podía recorrer los nueve TIPOS_REGLA. Aquí todas las reglas activas se
+cargan una vez (2 consultas) y se compilan por rol: valor_texto y condiciones_extras se
+interpretan al compilar, y cada tipo queda como lista ordenada por prioridad.
+
+El motor compilado vive en memoria del proceso junto con la versión de las reglas en la
+base de datos: COUNT y MAX(updated_at) de ambas tablas, leídos en una sola consulta.
+Guardar o eliminar una regla o configuración cambia la versión y cada proceso recompila
+en su siguiente uso, sin depender de que la caché sea compartida entre procesos. Validar
+no carga reglas: solo hace esa consulta de versión.
+
+Reglas por rol: las de aplicable_a igual al rol y las de ALL; entre las vigentes hoy y
+aplicables a la reserva gana la de mayor prioridad (la específica del rol ante empate).
+
+Valores por tipo:
+    TIEMPO_MINIMO            horas de anticipación al evento actual (valor_numerico o limite_hora).
+    TIEMPO_MAXIMO            días máximos entre hoy y la nueva fecha.
+    LIMITE_REPROGRAMACIONES  reprogramaciones máximas por reserva.
+    LIMITE_DIARIO            reprogramaciones máximas por usuario en el día.
+    DIAS_BLACKOUT            valor_texto: fechas ISO y/o días de semana ("2026-12-25, domingo").
+    HORAS_BLACKOUT           valor_texto: rangos "HH[:MM]-HH[:MM]" (pueden cruzar medianoche).
+    SERVICIOS_RESTRINGIDOS   valor_texto: ids de servicios que no se pueden reprogramar.
+    CAPACIDAD_MAXIMA         tope de reservas por servicio y fecha (ver capacidad.py).
+    DESCUENTO_PENALIZACION   porcentaje (valor_decimal) informado como penalización.
+
+Valores de texto: lista JSON o separada por comas. condiciones_extras admite
+{"servicios": [ids], "estados": [estados de reserva]} para limitar a qué reservas aplica.
+"""
+import json
+import logging
+import re
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('CLIENTE', 'ADMIN', 'OPERADOR')
+DIAS_SEMANA = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'miércoles': 2, 'jueves': 3,
+    'viernes': 4, 'sabado': 5, 'sábado': 5, 'domingo': 6,
+}
+_RANGO_HORAS = re.compile(r'^(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?$')
+
+_motor = None  # (version, Motor) de este proceso
+_lock = threading.Lock()
+
+
+# =====================================================
+# Interpretación de valores (solo al compilar)
+# =====================================================
+def _lista(texto):
+    if not texto:
+        return []
+    try:
+        valores = json.loads(texto)
+    except ValueError:
+        valores = texto.split(',')
+    if not isinstance(valores, list):
+        valores = [valores]
+    return [str(v).strip() for v in valores if str(v).strip()]
+
+
+def _blackout_dias(texto):
+    fechas, semana = set(), set()
+    for valor in _lista(texto):
+        if valor.lower() in DIAS_SEMANA:
+            semana.add(DIAS_SEMANA[valor.lower()])
+        else:
+            fechas.add(date.fromisoformat(valor))
+    return fechas, semana
+
+
+def _blackout_horas(texto):
+    rangos = []
+    for valor in _lista(texto):
+        partes = _RANGO_HORAS.match(valor)
+        if not partes:
+            raise ValueError(f'Rango de horas inválido: {valor}')
+        h1, m1, h2, m2 = (int(p or 0) for p in partes.groups())
+        rangos.append((h1 * 60 + m1, h2 * 60 + m2))
+    return rangos
+
+
+def _entero(regla):
+    return int(regla.valor_numerico)
+
+
+VALORES = {
+    'TIEMPO_MINIMO': lambda r: int(r.valor_numerico if r.valor_numerico is not None else r.limite_hora),
+    'TIEMPO_MAXIMO': _entero,
+    'LIMITE_REPROGRAMACIONES': _entero,
+    'LIMITE_DIARIO': _entero,
+    'DIAS_BLACKOUT': lambda r: _blackout_dias(r.valor_texto),
+    'HORAS_BLACKOUT': lambda r: _blackout_horas(r.valor_texto),
+    'SERVICIOS_RESTRINGIDOS': lambda r: {int(v) for v in _lista(r.valor_texto)},
+    'CAPACIDAD_MAXIMA': _entero,
+    'DESCUENTO_PENALIZACION': lambda r: Decimal(r.valor_decimal),
+}
+
+
+class ReglaCompilada:
+    __slots__ = ('tipo', 'aplicable_a', 'valor', 'mensaje', 'desde', 'hasta', 'servicios', 'estados')
+
+    def __init__(self, regla):
+        self.tipo = regla.tipo_regla
+        self.aplicable_a = regla.aplicable_a
+        self.valor = VALORES[regla.tipo_regla](regla)
+        self.mensaje = regla.mensaje_error
+        self.desde = regla.fecha_inicio_vigencia
+        self.hasta = regla.fecha_fin_vigencia
+        extras = regla.condiciones_extras if isinstance(regla.condiciones_extras, dict) else {}
+        self.servicios = {int(s) for s in extras['servicios']} if extras.get('servicios') else None
+        self.estados = set(extras['estados']) if extras.get('estados') else None
+
+    def vigente(self, hoy):
+        return (self.desde is None or self.desde <= hoy) and (self.hasta is None or hoy <= self.hasta)
+
+    def aplica(self, reserva, hoy):
+        return (
+            self.vigente(hoy)
+            and (self.servicios is None or reserva.servicio_id in self.servicios)
+            and (self.estados is None or reserva.estado in self.estados)
+        )
+
+
+# =====================================================
+# Evaluación
+# =====================================================
+def momento(valor):
+    """datetime aware a partir de una fecha o datetime."""
+    if not isinstance(valor, datetime):
+        valor = datetime.combine(valor, time.min)
+    return timezone.make_aware(valor) if timezone.is_naive(valor) else valor
+
+
+def _en_rango(minuto, inicio, fin):
+    return inicio <= minuto < fin if inicio <= fin else minuto >= inicio or minuto < fin
+
+
+class Evaluador:
+    """Reglas de un rol: {tipo: [ReglaCompilada]} ordenadas por prioridad."""
+
+    def __init__(self, reglas):
+        self.reglas = reglas
+
+    def regla(self, tipo, reserva, hoy):
+        return next((r for r in self.reglas.get(tipo, ()) if r.aplica(reserva, hoy)), None)
+
+    def valor(self, tipo, reserva=None):
+        """Valor de la regla vigente de mayor prioridad (aplicable a reserva si se indica)."""
+        hoy = timezone.localdate()
+        regla = next(
+            (r for r in self.reglas.get(tipo, ())
+             if (r.aplica(reserva, hoy) if reserva is not None else r.vigente(hoy))),
+            None,
+        )
+        return regla.valor if regla else None
+
+    def validar(self, reserva, nueva_fecha, reprogramaciones_hoy=0, ahora=None):
+        """Evalúa la reprogramación de reserva a nueva_fecha (date o datetime).
+
+        Retorna {'valida', 'errores': [{'regla', 'mensaje'}], 'penalizacion'} sin consultas.
+        """
+        ahora = ahora or timezone.now()
+        hoy = timezone.localdate(ahora)
+        nueva = momento(nueva_fecha)
+        nueva_dia = timezone.localtime(nueva).date()
+        errores = []
+
+        def falla(tipo, regla, mensaje):
+            errores.append({'regla': tipo, 'mensaje': regla.mensaje or mensaje})
+
+        regla = self.regla('SERVICIOS_RESTRINGIDOS', reserva, hoy)
+        if regla and reserva.servicio_id in regla.valor:
+            falla('SERVICIOS_RESTRINGIDOS', regla, 'El servicio de esta reserva no admite reprogramación')
+
+        regla = self.regla('TIEMPO_MINIMO', reserva, hoy)
+        if regla:
+            evento = momento(reserva.fecha_inicio or reserva.fecha)
+            if evento - ahora < timedelta(hours=regla.valor):
+                falla('TIEMPO_MINIMO', regla, f'Debe reprogramar con al menos {regla.valor} horas de anticipación')
+
+        regla = self.regla('TIEMPO_MAXIMO', reserva, hoy)
+        if regla and (nueva_dia - hoy).days > regla.valor:
+            falla('TIEMPO_MAXIMO', regla, f'La nueva fecha no puede superar {regla.valor} días desde hoy')
+
+        regla = self.regla('LIMITE_REPROGRAMACIONES', reserva, hoy)
+        if regla and reserva.numero_reprogramaciones >= regla.valor:
+            falla('LIMITE_REPROGRAMACIONES', regla, f'La reserva alcanzó el máximo de {regla.valor} reprogramaciones')
+
+        regla = self.regla('LIMITE_DIARIO', reserva, hoy)
+        if regla and reprogramaciones_hoy >= regla.valor:
+            falla('LIMITE_DIARIO', regla, f'Alcanzó el máximo de {regla.valor} reprogramaciones por día')
+
+        regla = self.regla('DIAS_BLACKOUT', reserva, hoy)
+        if regla:
+            fechas, semana = regla.valor
+            if nueva_dia in fechas or nueva_dia.weekday() in semana:
+                falla('DIAS_BLACKOUT', regla, f'No se permite reprogramar para el {nueva_dia.isoformat()}')
+
+        regla = self.regla('HORAS_BLACKOUT', reserva, hoy)
+        if regla and isinstance(nueva_fecha, datetime):
+            local = timezone.localtime(nueva)
+            minuto = local.hour * 60 + local.minute
+            if any(_en_rango(minuto, inicio, fin) for inicio, fin in regla.valor):
+                falla('HORAS_BLACKOUT', regla, f'No se permite reprogramar a las {local:%H:%M}')
+
+        regla = self.regla('DESCUENTO_PENALIZACION', reserva, hoy)
+        return {
+            'valida': not errores,
+            'errores': errores,
+            'penalizacion': regla.valor if regla else None,
+        }
+
+    def validar_lote(self, solicitudes, reprogramaciones_hoy=0, ahora=None):
+        """Valida [(reserva, nueva_fecha), ...]; retorna {reserva.pk: resultado}.
+
+        LIMITE_DIARIO cuenta también las reprogramaciones válidas del propio lote.
+        """
+        ahora = ahora or timezone.now()
+        resultados = {}
+        for reserva, nueva_fecha in solicitudes:
+            resultado = self.validar(reserva, nueva_fecha, reprogramaciones_hoy, ahora)
+            if resultado['valida']:
+                reprogramaciones_hoy += 1
+            resultados[reserva.pk] = resultado
+        return resultados
+
+
+class Motor:
+    """Evaluadores compilados por rol y configuración global tipada."""
+
+    def __init__(self, reglas, configuracion):
+        por_rol = {rol: {} for rol in ROLES + ('ALL',)}
+        for regla in reglas:  # ya ordenadas por prioridad
+            for rol in (ROLES + ('ALL',) if regla.aplicable_a == 'ALL' else (regla.aplicable_a,)):
+                por_rol.setdefault(rol, {}).setdefault(regla.tipo, []).append(regla)
+        self.evaluadores = {rol: Evaluador(tipos) for rol, tipos in por_rol.items()}
+        self.configuracion = configuracion
+
+    def evaluador(self, rol='ALL'):
+        return self.evaluadores.get(rol) or self.evaluadores['ALL']
+
+
+def _compilar():
+    from .models import ConfiguracionGlobalReprogramacion, ReglaReprogramacion
+
+    # Mayor prioridad primero; ante empate, la específica del rol antes que ALL y la más nueva
+    filas = sorted(
+        ReglaReprogramacion.objects.filter(activa=True, tipo_regla__in=VALORES),
+        key=lambda r: (-r.prioridad, r.aplicable_a == 'ALL', -(r.created_at.timestamp() if r.created_at else 0)),
+    )
+    compiladas = []
+    for regla in filas:
+        try:
+            compiladas.append(ReglaCompilada(regla))
+        except (TypeError, ValueError, ArithmeticError) as exc:
+            logger.warning('Regla de reprogramación %s ignorada: %s', regla.pk, exc)
+    configuracion = {
+        c.clave: c.obtener_valor_tipado()
+        for c in ConfiguracionGlobalReprogramacion.objects.filter(activa=True)
+    }
+    return Motor(compiladas, configuracion)
+
+
+# =====================================================
+# Versión y caché del motor
+# =====================================================
+def _version():
+    """(total, último updated_at) de reglas y configuraciones en una sola consulta.
+
+    Altas y bajas cambian el total; cualquier save() cambia el updated_at máximo.
+    """
+    from .models import ConfiguracionGlobalReprogramacion, ReglaReprogramacion
+
+    columna = connection.ops.quote_name('updated_at')
+    subconsultas = []
+    for modelo in (ReglaReprogramacion, ConfiguracionGlobalReprogramacion):
+        tabla = connection.ops.quote_name(modelo._meta.db_table)
+        subconsultas += [f'(SELECT COUNT(*) FROM {tabla})', f'(SELECT MAX({columna}) FROM {tabla})']
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(subconsultas))
+        return tuple(cursor.fetchone())
+
+
+def obtener_motor():
+    """Motor vigente; recompila solo si cambió la versión de las reglas en la base."""
+    global _motor
+    version = _version()
+    actual = _motor
+    if actual and actual[0] == version:
+        return actual[1]
+    with _lock:
+        if _motor and _motor[0] == version:
+            return _motor[1]
+        # La versión se leyó antes de cargar: un cambio durante la compilación la vuelve a cambiar
+        motor = _compilar()
+        _motor = (version, motor)
+    return motor
+
+
+def rol_de(user, perfil=None):
+    """Rol de las reglas (CLIENTE, ADMIN u OPERADOR) según el rol del perfil."""
+    nombre = (getattr(getattr(perfil, 'rol', None), 'nombre', '') or '').lower()
+    if getattr(user, 'is_staff', False) or nombre in ('admin', 'administrador'):
+        return 'ADMIN'
+    if nombre in ('operador', 'soporte'):
+        return 'OPERADOR'
+    return 'CLIENTE'
+
+
+def evaluador(rol='ALL'):
+    return obtener_motor().evaluador(rol)
+
+
+def configuracion(clave, default=None):
+    """ConfiguracionGlobalReprogramacion.obtener_configuracion() con solo la consulta de versión."""
+    return obtener_motor().configuracion.get(clave, default)
+
+
+def reprogramaciones_hoy(perfil):
+    """Reprogramaciones que el usuario ya hizo hoy (dato para LIMITE_DIARIO)."""
+    from .models import HistorialReprogramacion
+
+    if perfil is None:
+        return 0
+    inicio = momento(timezone.localdate())
+    return HistorialReprogramacion.objects.filter(reprogramado_por=perfil, created_at__gte=inicio).count()
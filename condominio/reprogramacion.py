@@ -0,0 +1,184 @@
+"""
+Reprogramación masiva forzada por el operador (p. ej. un tour suspendido por clima).
+
+Mueve todas las reservas vigentes de un servicio o paquete en una fecha a una nueva
+fecha, en una sola transacción:
+
+1. Carga las reservas afectadas (FOR UPDATE) y valida las reglas de reprogramación en
+   lote con el motor compilado (reglas_reprogramacion.py, sin consultas por regla).
+2. Un único UPDATE mueve fecha, fecha_inicio y fecha_fin (conservando la hora) y
+   actualiza los campos de reprogramación de todas las reservas válidas; su itinerario
+   (ReservaServicio) se desplaza los mismos días con un bulk_update.
+3. bulk_create del HistorialReprogramacion y de las notificaciones a los clientes
+   (notificaciones.crear_notificaciones); los eventos SSE y push salen al COMMIT.
+4. Como el UPDATE no dispara señales, el calendario de capacidad (capacidad.py) se
+   ajusta aquí para la reserva y su itinerario y se verifica la capacidad de los nuevos
+   días: si no alcanza se revierte todo. La regla CAPACIDAD_MAXIMA se evalúa por
+   servicio, como en ReservaViewSet.reprogramar.
+
+Con simular=True solo se calcula la vista previa (reservas válidas, rechazadas con sus
+errores y lugares libres en la nueva fecha) sin escribir nada.
+"""
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import capacidad
+from .notificaciones import crear_notificaciones
+from .reglas_reprogramacion import evaluador, momento, reprogramaciones_hoy
+
+ESTADOS_REPROGRAMABLES = ('PENDIENTE', 'CONFIRMADA', 'PAGADA', 'REPROGRAMADA')
+TIPO_NOTIFICACION = 'reserva_reprogramada'
+CAMPOS_VALIDACION = ('id', 'cliente_id', 'servicio_id', 'paquete_id', 'estado', 'fecha', 'fecha_inicio',
+                     'numero_reprogramaciones')
+
+
+def afectadas(fecha, servicio_id=None, paquete_id=None):
+    from .models import Reserva
+
+    filtro = {'servicio_id': servicio_id} if servicio_id else {'paquete_id': paquete_id}
+    return Reserva.objects.filter(fecha=fecha, estado__in=ESTADOS_REPROGRAMABLES, **filtro)
+
+
+def reprogramar_lote(fecha, nueva_fecha, perfil, rol, servicio_id=None, paquete_id=None,
+                     motivo=None, simular=False):
+    """Reprograma las reservas del servicio o paquete de fecha a nueva_fecha (ambas date).
+
+    Retorna {'simulado', 'afectadas', 'reprogramadas': [ids], 'rechazadas': [{'reserva_id',
+    'errores'}], 'capacidad'}. Lanza capacidad.CapacidadAgotada si el nuevo día no alcanza.
+    """
+    from .models import HistorialReprogramacion, Reserva, ReservaServicio
+
+    with transaction.atomic():
+        reservas = afectadas(fecha, servicio_id, paquete_id).only(*CAMPOS_VALIDACION).order_by('id')
+        if not simular:
+            reservas = reservas.select_for_update()
+        reservas = list(reservas)
+
+        reglas = evaluador(rol)
+        resultados = reglas.validar_lote(
+            [(reserva, nueva_fecha) for reserva in reservas], reprogramaciones_hoy(perfil),
+        )
+        validas = [r for r in reservas if resultados[r.pk]['valida']]
+        desplazamiento = timedelta(days=(nueva_fecha - fecha).days)
+        itinerario = list(
+            ReservaServicio.objects.filter(reserva_id__in=[r.pk for r in validas])
+            .only('id', 'reserva_id', 'servicio_id', 'fecha', 'fecha_inicio', 'fecha_fin').order_by('id')
+        )
+        anteriores, nuevos = _lugares(validas, itinerario, fecha, desplazamiento)
+        limites = _limites(reglas, validas, itinerario)
+        resumen = {
+            'simulado': simular,
+            'afectadas': len(reservas),
+            'reprogramadas': [r.pk for r in validas],
+            'rechazadas': [
+                {'reserva_id': r.pk, 'errores': resultados[r.pk]['errores']}
+                for r in reservas if not resultados[r.pk]['valida']
+            ],
+            'capacidad': _capacidad_destino(nuevos, limites),
+        }
+        if simular or not validas:
+            return resumen
+
+        ahora = timezone.now()
+        anterior_sin_hora = momento(fecha)
+        Reserva.objects.filter(pk__in=resumen['reprogramadas']).update(
+            fecha=nueva_fecha,
+            fecha_original=Coalesce(
+                F('fecha_original'), F('fecha_inicio'), Value(anterior_sin_hora, output_field=DateTimeField()),
+            ),
+            fecha_inicio=F('fecha_inicio') + desplazamiento,
+            fecha_fin=F('fecha_fin') + desplazamiento,
+            fecha_reprogramacion=ahora,
+            numero_reprogramaciones=F('numero_reprogramaciones') + 1,
+            motivo_reprogramacion=motivo,
+            reprogramado_por=perfil,
+            estado='REPROGRAMADA',
+            updated_at=ahora,
+        )
+
+        for fila in itinerario:
+            fila.fecha += desplazamiento
+            fila.fecha_inicio = fila.fecha_inicio + desplazamiento if fila.fecha_inicio else None
+            fila.fecha_fin = fila.fecha_fin + desplazamiento if fila.fecha_fin else None
+        ReservaServicio.objects.bulk_update(itinerario, ['fecha', 'fecha_inicio', 'fecha_fin'], batch_size=500)
+
+        for (servicio, dia), n in anteriores.items():
+            capacidad.ajustar(servicio, dia, -n)
+        for (servicio, dia), n in nuevos.items():
+            capacidad.ajustar(servicio, dia, n)
+        por_limite = {}
+        for servicio, dia in nuevos:
+            por_limite.setdefault(limites.get(servicio), []).append((servicio, dia))
+        for limite, lugares in por_limite.items():
+            capacidad.verificar(lugares, limite=limite)
+
+        HistorialReprogramacion.objects.bulk_create([
+            HistorialReprogramacion(
+                reserva_id=r.pk,
+                fecha_anterior=r.fecha_inicio or anterior_sin_hora,
+                fecha_nueva=(r.fecha_inicio or anterior_sin_hora) + desplazamiento,
+                motivo=motivo, reprogramado_por=perfil, notificacion_enviada=True,
+            )
+            for r in validas
+        ])
+
+        por_cliente = {}
+        for r in validas:
+            por_cliente.setdefault(r.cliente_id, []).append(r.pk)
+        crear_notificaciones(
+            TIPO_NOTIFICACION,
+            {cliente: {'reservas': ids, 'fecha_anterior': fecha.isoformat(), 'fecha_nueva': nueva_fecha.isoformat()}
+             for cliente, ids in por_cliente.items()},
+            titulo='Reserva reprogramada',
+            cuerpo=f'Tu reserva del {fecha:%d/%m/%Y} fue reprogramada al {nueva_fecha:%d/%m/%Y}'
+                   + (f': {motivo}' if motivo else ''),
+        )
+    return resumen
+
+
+def _lugares(validas, itinerario, fecha, desplazamiento):
+    """Counters {(servicio_id, fecha): n} que las reservas ocupan antes y después de moverse."""
+    anteriores = Counter((r.servicio_id, fecha) for r in validas if r.servicio_id)
+    anteriores.update((fila.servicio_id, fila.fecha) for fila in itinerario)
+    nuevos = Counter({(servicio, dia + desplazamiento): n for (servicio, dia), n in anteriores.items()})
+    return anteriores, nuevos
+
+
+def _limites(reglas, validas, itinerario):
+    """{servicio_id: tope CAPACIDAD_MAXIMA} evaluado por servicio de cada reserva movida.
+
+    Si el tope depende del estado de la reserva (condiciones_extras) gana el más estricto.
+    """
+    estados = {r.pk: r.estado for r in validas}
+    pares = [(r.servicio_id, r.estado) for r in validas if r.servicio_id]
+    pares += [(fila.servicio_id, estados[fila.reserva_id]) for fila in itinerario]
+    limites = {}
+    for servicio, estado in set(pares):
+        valor = reglas.valor('CAPACIDAD_MAXIMA', SimpleNamespace(servicio_id=servicio, estado=estado))
+        if valor is not None:
+            limites[servicio] = min(valor, limites.get(servicio, valor))
+    return limites
+
+
+def _capacidad_destino(nuevos, limites):
+    """Lugares libres de cada servicio en sus nuevas fechas frente a las reservas a mover."""
+    if not nuevos:
+        return None
+    dias = [dia for _, dia in nuevos]
+    libres = capacidad.disponibilidad({servicio for servicio, _ in nuevos}, min(dias), max(dias))
+    detalle = []
+    for (servicio, dia), n in sorted(nuevos.items()):
+        disponibles = libres.get(servicio, {}).get('dias', {}).get(dia, 0)
+        limite = limites.get(servicio)
+        if limite is not None:
+            capacidad_max = libres.get(servicio, {}).get('capacidad_max', 0)
+            disponibles = min(disponibles, max(0, limite - (capacidad_max - disponibles)))
+        detalle.append({'servicio_id': servicio, 'fecha': dia, 'a_mover': n, 'libres': disponibles,
+                        'suficiente': n <= disponibles})
+    return detalle
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from authz.serializer import RolSerializer
 from django.contrib.auth.models import User
+from django.db.models import Prefetch, prefetch_related_objects
 from .models import (
     Categoria,
     Proveedor,
@@ -67,7 +68,8 @@ class ReservaConServiciosSerializer(serializers.ModelSerializer):
                     duracion=f"{len(servicios_data)} actividades",
                     precio_base=Decimal(str(reserva.total)),
                     precio_bob=Decimal(str(reserva.total)) if str(reserva.moneda).upper() == 'BOB' else None,
-                    # Defaults del modelo cubren cupos y estado
+                    # Defaults del modelo cubren cupos y estado; la propia reserva ocupa uno
+                    cupos_ocupados=1,
                     fecha_inicio=reserva.fecha,
                     fecha_fin=reserva.fecha,
                     punto_salida="A definir",
@@ -131,7 +133,8 @@ class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = "__all__"
-        read_only_fields = ["id", "created_at"]
+        # Los contadores desnormalizados los mantienen las señales (signals_soporte.py)
+        read_only_fields = ["id", "created_at", *Usuario.CONTADORES]
 
 
 # =====================================================
@@ -200,11 +203,13 @@ class PerfilUsuarioSerializer(serializers.ModelSerializer):
 # 🎫 SOPORTE - PANEL SERIALIZERS
 # =====================================================
 class SoporteResumenSerializer(serializers.ModelSerializer):
-    """Serializer para mostrar resumen de tickets de soporte del usuario"""
+    """Serializer para mostrar resumen de tickets de soporte del usuario.
+
+    Lee los contadores desnormalizados del Usuario (ver signals_soporte.py); cargar el
+    perfil con select_related('ultimo_ticket') para no hacer consultas extra.
+    """
 
-    tickets_total = serializers.SerializerMethodField()
-    tickets_abiertos = serializers.SerializerMethodField()
-    tickets_cerrados = serializers.SerializerMethodField()
+    tickets_total = serializers.IntegerField(read_only=True)
     ultimo_ticket = serializers.SerializerMethodField()
 
     class Meta:
@@ -218,17 +223,8 @@ class SoporteResumenSerializer(serializers.ModelSerializer):
             "ultimo_ticket",
         ]
 
-    def get_tickets_total(self, obj):
-        return obj.tickets_creados.count()
-
-    def get_tickets_abiertos(self, obj):
-        return obj.tickets_creados.exclude(estado="Cerrado").count()
-
-    def get_tickets_cerrados(self, obj):
-        return obj.tickets_creados.filter(estado="Cerrado").count()
-
     def get_ultimo_ticket(self, obj):
-        ultimo = obj.tickets_creados.order_by("-created_at").first()
+        ultimo = obj.ultimo_ticket
         if ultimo:
             return {
                 "id": ultimo.id,
@@ -339,6 +335,14 @@ class PaqueteCompletoSerializer(serializers.ModelSerializer):
 # =====================================================
 # 📦 PAQUETE TURÍSTICO (Nuevo modelo)
 # =====================================================
+def paquete_servicios_prefetch(prefix=""):
+    """Prefetch de PaqueteServicio con servicio y categoría (ordenado por día/orden)."""
+    return Prefetch(
+        f"{prefix}paqueteservicio_set",
+        queryset=PaqueteServicio.objects.select_related("servicio__categoria"),
+    )
+
+
 class PaqueteServicioSerializer(serializers.ModelSerializer):
     """Serializer para la relación Paquete-Servicio con información del itinerario"""
 
@@ -417,15 +421,24 @@ class PaqueteSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_at", "es_personalizado"]
 
+    def _get_paquete_servicios(self, obj):
+        """Filas PaqueteServicio del paquete ordenadas por día/orden.
+
+        Reutiliza el prefetch si el queryset ya lo trae; si no, lo carga una sola vez
+        para que ambos campos compartan la misma consulta.
+        """
+        if "paqueteservicio_set" not in getattr(obj, "_prefetched_objects_cache", {}):
+            prefetch_related_objects([obj], paquete_servicios_prefetch())
+        return obj.paqueteservicio_set.all()
+
     def get_servicios_incluidos(self, obj):
         """Lista de servicios/destinos incluidos en el paquete"""
-        paquete_servicios = PaqueteServicio.objects.filter(paquete=obj).select_related(
-            "servicio__categoria"
-        )
-        servicios = set()  # Usar set para evitar duplicados
+        servicios = {}  # Indexado por id para evitar duplicados conservando el orden
 
-        for ps in paquete_servicios:
-            servicio_data = {
+        for ps in self._get_paquete_servicios(obj):
+            if ps.servicio.pk in servicios:
+                continue
+            servicios[ps.servicio.pk] = {
                 "id": ps.servicio.pk,
                 "titulo": ps.servicio.titulo,
                 "descripcion": ps.servicio.descripcion,
@@ -435,22 +448,13 @@ class PaqueteSerializer(serializers.ModelSerializer):
                 "imagen_url": ps.servicio.imagen_url,
                 "precio_usd": float(ps.servicio.precio_usd),
             }
-            # Convertir a tuple para poder usar en set
-            servicios.add(tuple(servicio_data.items()))
 
-        # Convertir de vuelta a lista de diccionarios
-        return [dict(s) for s in servicios]
+        return list(servicios.values())
 
     def get_itinerario(self, obj):
         """Itinerario completo organizado por días"""
-        paquete_servicios = (
-            PaqueteServicio.objects.filter(paquete=obj)
-            .select_related("servicio__categoria")
-            .order_by("dia", "orden")
-        )
-
         itinerario = {}
-        for ps in paquete_servicios:
+        for ps in self._get_paquete_servicios(obj):
             dia_key = f"dia_{ps.dia}"
             if dia_key not in itinerario:
                 itinerario[dia_key] = {"dia": ps.dia, "actividades": []}
@@ -512,7 +516,7 @@ class PaqueteSerializer(serializers.ModelSerializer):
 
         return {
             "id": obj.campania.pk,
-            "nombre": obj.campania.nombre,
+            "nombre": obj.campania.descripcion,
             "tipo_descuento": obj.campania.tipo_descuento,
             "monto": float(obj.campania.monto),
             "fecha_inicio": obj.campania.fecha_inicio,
@@ -795,6 +799,8 @@ class TicketSerializer(serializers.ModelSerializer):
             "agente",
             "agente_nombre",
             "prioridad",
+            "mensajes_count",
+            "ultima_actividad",
             "created_at",
             "updated_at",
         ]
@@ -802,6 +808,8 @@ class TicketSerializer(serializers.ModelSerializer):
             "id",
             "creador",
             "creador_nombre",
+            "mensajes_count",
+            "ultima_actividad",
             "estado",
             "agente",
             "agente_nombre",
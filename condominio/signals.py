@@ -10,6 +10,24 @@ logger = logging.getLogger(__name__)
 
 # Código existente para cargar fixtures está comentado; se mantiene.
 
+# Reconstrucción del catálogo público precalculado (siempre activa)
+import condominio.signals_catalogo  # noqa: F401
+
+# Invalidación del perfil/rol cacheado por resolver_perfil
+import condominio.signals_perfil  # noqa: F401
+
+# Carga de tickets por agente de soporte (Usuario.carga_soporte)
+import condominio.signals_soporte  # noqa: F401
+
+# Badge de notificaciones no leídas (Usuario.notificaciones_no_leidas)
+import condominio.signals_notificaciones  # noqa: F401
+
+# Eventos en tiempo real para el stream SSE (condominio/eventos.py)
+import condominio.signals_eventos  # noqa: F401
+
+# Calendario de capacidad por servicio y fecha (CapacidadServicioDia)
+import condominio.signals_capacidad  # noqa: F401
+
 # Importar señales FCM condicionalmente para evitar envíos automáticos por defecto.
 # La variable de entorno en español 'HABILITAR_SEÑAL_FCM' controla esto.
 fcm_var = os.getenv('HABILITAR_SEÑAL_FCM', '').strip().strip('"').strip("'").lower()
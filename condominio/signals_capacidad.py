@@ -0,0 +1,80 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .capacidad import ESTADO_SIN_LUGAR, ajustar, lugar, lugares_itinerario, ocupa
+from .models import Reserva, ReservaServicio
+
+_DESCONOCIDO = object()
+
+
+def _mover(anterior, actual):
+    if anterior != actual:
+        if anterior:
+            ajustar(*anterior, -1)
+        if actual:
+            ajustar(*actual, +1)
+
+
+@receiver(post_init, sender=Reserva)
+def recordar_lugar(sender, instance, **kwargs):
+    """Servicio, fecha y estado con que se cargó la reserva (sin consultar campos diferidos)."""
+    datos = instance.__dict__
+    if all(campo in datos for campo in ('servicio_id', 'fecha', 'estado')):
+        instance._lugar, instance._ocupa = lugar(instance), ocupa(instance)
+    else:
+        instance._lugar = instance._ocupa = _DESCONOCIDO
+
+
+@receiver(post_save, sender=Reserva)
+def capacidad_reserva_guardada(sender, instance, created, **kwargs):
+    """Reservar, reprogramar (fecha o servicio), cancelar o reactivar mueven el lugar."""
+    if created:
+        _mover(None, lugar(instance))
+    elif instance._lugar is not _DESCONOCIDO:
+        # Instancias cargadas con only()/defer() las corrige reconstruir_capacidad
+        _mover(instance._lugar, lugar(instance))
+        if instance._ocupa != ocupa(instance):
+            # Cancelar o reactivar también libera u ocupa los servicios del itinerario
+            signo = 1 if ocupa(instance) else -1
+            for (servicio_id, fecha), n in lugares_itinerario(instance.pk).items():
+                ajustar(servicio_id, fecha, signo * n)
+    instance._lugar, instance._ocupa = lugar(instance), ocupa(instance)
+
+
+@receiver(post_delete, sender=Reserva)
+def capacidad_reserva_eliminada(sender, instance, **kwargs):
+    # Los ReservaServicio borrados en cascada se descuentan en su propia señal
+    if instance._lugar not in (None, _DESCONOCIDO):
+        ajustar(*instance._lugar, -1)
+
+
+def _reserva_ocupa(instance):
+    if ReservaServicio.reserva.is_cached(instance):
+        return ocupa(instance.reserva)
+    return Reserva.objects.filter(pk=instance.reserva_id).values_list('estado', flat=True).first() not in (
+        None, ESTADO_SIN_LUGAR,
+    )
+
+
+@receiver(post_init, sender=ReservaServicio)
+def recordar_lugar_itinerario(sender, instance, **kwargs):
+    datos = instance.__dict__
+    if 'servicio_id' in datos and 'fecha' in datos:
+        instance._lugar = (datos['servicio_id'], datos['fecha'])
+    else:
+        instance._lugar = _DESCONOCIDO
+
+
+@receiver(post_save, sender=ReservaServicio)
+def capacidad_itinerario_guardado(sender, instance, created, **kwargs):
+    actual = (instance.servicio_id, instance.fecha)
+    anterior = None if created else instance._lugar
+    if anterior is not _DESCONOCIDO and anterior != actual and _reserva_ocupa(instance):
+        _mover(anterior, actual)
+    instance._lugar = actual
+
+
+@receiver(post_delete, sender=ReservaServicio)
+def capacidad_itinerario_eliminado(sender, instance, **kwargs):
+    # En el borrado en cascada la Reserva sigue en la base hasta después de sus hijos
+    if instance._lugar is not _DESCONOCIDO and _reserva_ocupa(instance):
+        ajustar(*instance._lugar, -1)
@@ -0,0 +1,46 @@
+import logging
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Paquete, PaqueteServicio, Servicio, Campania, Categoria
+from .catalogo import programar_reconstruccion
+
+logger = logging.getLogger(__name__)
+
+
+@receiver([post_save, post_delete], sender=Paquete)
+def catalogo_paquete(sender, instance, **kwargs):
+    """Cambios del propio paquete (precio, cupos, estado, campaña, etc.)."""
+    programar_reconstruccion([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=PaqueteServicio)
+def catalogo_paquete_servicio(sender, instance, **kwargs):
+    """Cambios en el itinerario del paquete."""
+    programar_reconstruccion([instance.paquete_id])
+
+
+@receiver(post_save, sender=Servicio)
+def catalogo_servicio(sender, instance, **kwargs):
+    """Un servicio modificado afecta a todos los paquetes que lo incluyen.
+
+    El borrado no necesita receptor: elimina en cascada sus PaqueteServicio.
+    """
+    ids = PaqueteServicio.objects.filter(servicio=instance).values_list('paquete_id', flat=True)
+    programar_reconstruccion(list(ids))
+
+
+@receiver(post_save, sender=Campania)
+@receiver(pre_delete, sender=Campania)
+def catalogo_campania(sender, instance, **kwargs):
+    """Descuentos de campaña; en borrado los ids se toman antes del SET_NULL."""
+    ids = Paquete.objects.filter(campania=instance).values_list('id', flat=True)
+    programar_reconstruccion(list(ids))
+
+
+@receiver([post_save, post_delete], sender=Paquete)
+@receiver([post_save, post_delete], sender=Servicio)
+@receiver([post_save, post_delete], sender=Categoria)
+def indice_chatbot(sender, **kwargs):
+    """El índice del chatbot (core/indice_catalogo.py) se reconstruye en la próxima pregunta."""
+    from core.indice_catalogo import indice
+    indice.marcar_desactualizado()
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .eventos import publicar
+from .models import Notificacion, TicketMessage
+
+
+@receiver(post_save, sender=Notificacion)
+def evento_notificacion(sender, instance, created, **kwargs):
+    if created:
+        # Solo referencias: el payload de pg_notify no admite más de 8000 bytes
+        publicar([instance.usuario_id], {
+            'tipo': 'notificacion',
+            'id': instance.pk,
+            'tipo_notificacion': instance.tipo,
+            'fecha': instance.created_at,
+        })
+
+
+@receiver(post_save, sender=TicketMessage)
+def evento_mensaje_ticket(sender, instance, created, **kwargs):
+    if created:
+        ticket = instance.ticket
+        publicar({ticket.creador_id, ticket.agente_id} - {instance.autor_id}, {
+            'tipo': 'ticket_mensaje',
+            'id': instance.pk,
+            'ticket_id': ticket.pk,
+            'autor_id': instance.autor_id,
+            'fecha': instance.created_at,
+        })
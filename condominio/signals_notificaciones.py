@@ -0,0 +1,26 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Notificacion
+from .notificaciones import ajustar_no_leidas
+
+_DESCONOCIDO = object()
+
+
+@receiver(post_init, sender=Notificacion)
+def recordar_lectura(sender, instance, **kwargs):
+    instance._leida = instance.__dict__.get('leida', _DESCONOCIDO)
+
+
+@receiver(post_save, sender=Notificacion)
+def no_leidas_guardada(sender, instance, created, **kwargs):
+    """Crear una notificación sin leer suma 1; marcarla (o desmarcarla) ajusta el contador."""
+    anterior = True if created else instance._leida
+    if anterior is not _DESCONOCIDO and anterior != instance.leida:
+        ajustar_no_leidas(instance.usuario_id, -1 if instance.leida else 1)
+    instance._leida = instance.leida
+
+
+@receiver(post_delete, sender=Notificacion)
+def no_leidas_eliminada(sender, instance, **kwargs):
+    if instance._leida is False:
+        ajustar_no_leidas(instance.usuario_id, -1)
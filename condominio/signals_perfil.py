@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from authz.models import Rol, UserRole
+from .models import Usuario
+from .perfiles import invalidar_perfil
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def perfil_usuario(sender, instance, **kwargs):
+    """Cambio de rol (u otro dato) del perfil cacheado."""
+    invalidar_perfil(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def perfil_user_role(sender, instance, **kwargs):
+    """Asignación o remoción de rol vía authz."""
+    invalidar_perfil(instance.user_id)
+
+
+@receiver(post_save, sender=Rol)
+@receiver(pre_delete, sender=Rol)
+def perfil_rol(sender, instance, **kwargs):
+    """Renombrar o borrar un rol afecta a todos los perfiles que lo tienen.
+
+    pre_delete: el SET_NULL sobre Usuario.rol se hace por UPDATE, sin señales.
+    """
+    invalidar_perfil(*Usuario.objects.filter(rol=instance).values_list('user_id', flat=True))
@@ -0,0 +1,107 @@
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Ticket, TicketMessage, Usuario
+from .utils import ESTADOS_CARGA
+
+_DESCONOCIDO = object()
+
+
+def _agente_con_carga(agente_id, estado):
+    """Agente al que el ticket suma carga, o None."""
+    return agente_id if agente_id and estado in ESTADOS_CARGA else None
+
+
+def _decrementar(campo):
+    """Filtro que evita bajar un contador por debajo de 0 si ya estaba desfasado."""
+    return {f'{campo}__gt': 0}
+
+
+def _ajustar(agente_id, delta):
+    if not agente_id:
+        return
+    filas = Usuario.objects.filter(pk=agente_id)
+    if delta < 0:
+        filas = filas.filter(**_decrementar('carga_soporte'))
+    filas.update(carga_soporte=F('carga_soporte') + delta)
+
+
+def _columna_estado(cerrado):
+    return 'tickets_cerrados' if cerrado else 'tickets_abiertos'
+
+
+@receiver(post_init, sender=Ticket)
+def recordar_carga(sender, instance, **kwargs):
+    """Estado con el que se cargó el ticket (sin consultar campos diferidos)."""
+    datos = instance.__dict__
+    if 'agente_id' in datos and 'estado' in datos:
+        instance._carga_agente = _agente_con_carga(datos['agente_id'], datos['estado'])
+    else:
+        instance._carga_agente = _DESCONOCIDO
+    instance._cerrado = datos['estado'] == 'Cerrado' if 'estado' in datos else _DESCONOCIDO
+
+
+@receiver(post_save, sender=Ticket)
+def carga_ticket_guardado(sender, instance, created, **kwargs):
+    """Asignar, responder, cerrar o reasignar mueven la carga entre agentes."""
+    anterior = None if created else instance._carga_agente
+    if anterior is _DESCONOCIDO:
+        # Instancia cargada con only()/defer(): la fila ya está actualizada; no hay forma
+        # de conocer el valor previo sin haberlo leído antes. Lo corrige reconciliar_soporte.
+        anterior = None
+    actual = _agente_con_carga(instance.agente_id, instance.estado)
+    if anterior != actual:
+        _ajustar(anterior, -1)
+        _ajustar(actual, +1)
+    instance._carga_agente = actual
+
+
+@receiver(post_save, sender=Ticket)
+def resumen_ticket_guardado(sender, instance, created, **kwargs):
+    """Contadores por estado y último ticket del creador (panel de soporte)."""
+    cerrado = instance.estado == 'Cerrado'
+    if created:
+        Usuario.objects.filter(pk=instance.creador_id).update(
+            **{_columna_estado(cerrado): F(_columna_estado(cerrado)) + 1}, ultimo_ticket=instance.pk,
+        )
+    elif instance._cerrado is not _DESCONOCIDO and instance._cerrado != cerrado:
+        # Un solo UPDATE pasa el ticket de una columna a la otra
+        origen, destino = _columna_estado(instance._cerrado), _columna_estado(cerrado)
+        Usuario.objects.filter(pk=instance.creador_id, **_decrementar(origen)).update(
+            **{origen: F(origen) - 1, destino: F(destino) + 1},
+        )
+    instance._cerrado = cerrado
+
+
+@receiver(post_delete, sender=Ticket)
+def carga_ticket_eliminado(sender, instance, **kwargs):
+    anterior = instance._carga_agente
+    if anterior is not _DESCONOCIDO:
+        _ajustar(anterior, -1)
+
+    if instance._cerrado is not _DESCONOCIDO:
+        columna = _columna_estado(instance._cerrado)
+        Usuario.objects.filter(pk=instance.creador_id, **_decrementar(columna)).update(
+            **{columna: F(columna) - 1},
+        )
+    # SET_NULL ya vació ultimo_ticket si era este; apuntar al anterior del creador
+    Usuario.objects.filter(pk=instance.creador_id, ultimo_ticket__isnull=True).update(
+        ultimo_ticket=Subquery(
+            Ticket.objects.filter(creador=OuterRef('pk')).order_by('-created_at', '-id').values('pk')[:1]
+        ),
+    )
+
+
+@receiver(post_save, sender=TicketMessage)
+def mensaje_guardado(sender, instance, created, **kwargs):
+    if created:
+        Ticket.objects.filter(pk=instance.ticket_id).update(
+            mensajes_count=F('mensajes_count') + 1, ultima_actividad=instance.created_at,
+        )
+
+
+@receiver(post_delete, sender=TicketMessage)
+def mensaje_eliminado(sender, instance, **kwargs):
+    Ticket.objects.filter(pk=instance.ticket_id, **_decrementar('mensajes_count')).update(
+        mensajes_count=F('mensajes_count') - 1,
+    )
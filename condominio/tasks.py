@@ -232,7 +232,7 @@ def calcular_metricas_campana(campana_id):
     Returns:
         dict: Métricas actualizadas
     """
-    from .models import CampanaNotificacion, Notificacion
+    from .models import CampanaNotificacion, Notificacion, NotificacionArchivada
     
     try:
         campana = CampanaNotificacion.objects.get(id=campana_id)
@@ -248,6 +248,10 @@ def calcular_metricas_campana(campana_id):
             datos__campana_id=str(campana.id),
             leida=True
         ).count()
+        # Las leídas antiguas ya se movieron al archivo (archivar_notificaciones)
+        notificaciones_leidas += NotificacionArchivada.objects.filter(
+            datos__campana_id=str(campana.id)
+        ).count()
         
         campana.total_leidos = notificaciones_leidas
         campana.save(update_fields=['total_leidos'])
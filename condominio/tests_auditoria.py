@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from condominio.auditoria import EscritorBitacora
+from condominio.models import Usuario, Bitacora
+
+
+class EscritorSinHilo(EscritorBitacora):
+    """El flush lo dispara la prueba; no se arranca el hilo de fondo."""
+    def _asegurar_hilo(self):
+        return True
+
+
+@override_settings(BITACORA_ASINCRONA=True, BITACORA_LOTE=3, BITACORA_MAX_PENDIENTES=5)
+class EscritorBitacoraTest(TestCase):
+    def setUp(self):
+        self.perfil = Usuario.objects.create(user=User.objects.create_user(username='auditor'), nombre='Auditor')
+        self.escritor = EscritorSinHilo()
+
+    def test_encola_y_escribe_en_lote(self):
+        antes = timezone.now() - timedelta(minutes=5)
+        entrada = self.escritor.registrar(self.perfil, 'Crear Servicio', 'Servicio creado id=1', '10.0.0.1')
+        entrada.created_at = antes  # instante real del evento, previo al flush
+        self.escritor.registrar(self.perfil, 'Actualizar Servicio')
+        self.assertEqual(Bitacora.objects.count(), 0)
+        self.assertEqual(self.escritor.pendientes(), 2)
+
+        with self.assertNumQueries(3):  # SAVEPOINT, INSERT lote, RELEASE
+            self.assertEqual(self.escritor.flush(), 2)
+
+        self.assertEqual(self.escritor.pendientes(), 0)
+        guardada = Bitacora.objects.get(accion='Crear Servicio')
+        self.assertEqual(guardada.created_at, antes)
+        self.assertEqual(guardada.usuario, self.perfil)
+        self.assertEqual(guardada.ip_address, '10.0.0.1')
+
+    def test_umbral_de_tamano_despierta_al_escritor(self):
+        for i in range(2):
+            self.escritor.registrar(None, f'Accion {i}')
+        self.assertFalse(self.escritor._despertar.is_set())
+        self.escritor.registrar(None, 'Accion 3')
+        self.assertTrue(self.escritor._despertar.is_set())
+
+    def test_garantizado_escribe_en_el_momento(self):
+        entrada = self.escritor.registrar(self.perfil, 'ASSIGN_ROLE', 'Rol admin asignado', garantizado=True)
+        self.assertIsNotNone(entrada.pk)
+        self.assertEqual(self.escritor.pendientes(), 0)
+
+    def test_cola_llena_escribe_sincronamente(self):
+        for i in range(6):
+            self.escritor.registrar(None, f'Accion {i}')
+        self.assertEqual(self.escritor.pendientes(), 5)
+        self.assertEqual(Bitacora.objects.count(), 1)
+        self.escritor.flush()
+        self.assertEqual(Bitacora.objects.count(), 6)
+
+    def test_entrada_que_falla_vuelve_a_la_cola(self):
+        self.escritor.registrar(None, 'Accion valida')
+        self.escritor.registrar(None, 'x' * 200)
+        guardar = Bitacora.save
+
+        def save_falla_larga(entrada, *args, **kwargs):
+            if len(entrada.accion) > 150:
+                raise ValueError('accion demasiado larga')
+            return guardar(entrada, *args, **kwargs)
+
+        with mock.patch.object(Bitacora.objects, 'bulk_create', side_effect=ValueError('lote')), \
+                mock.patch.object(Bitacora, 'save', save_falla_larga), \
+                self.assertLogs('condominio.auditoria', 'ERROR'):
+            self.assertEqual(self.escritor.flush(), 1)
+
+        self.assertEqual(list(Bitacora.objects.values_list('accion', flat=True)), ['Accion valida'])
+        self.assertEqual(self.escritor.pendientes(), 1)
+
+    @override_settings(BITACORA_ASINCRONA=False)
+    def test_modo_sincrono(self):
+        self.escritor.registrar(None, 'Accion')
+        self.assertEqual(Bitacora.objects.count(), 1)
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from condominio.busqueda import IndiceInvertido, buscar, filtrar_ubicacion, terminos
+from condominio.models import Paquete, Servicio
+
+
+class IndiceInvertidoTest(TestCase):
+    def test_normaliza_acentos_plurales_y_palabras_vacias(self):
+        self.assertEqual(terminos('Las Montañas de Potosí'), ['montana', 'potosi'])
+        self.assertEqual(terminos('ciudades'), ['ciudad'])
+
+    def test_todas_las_palabras_y_ranking_por_peso(self):
+        indice = IndiceInvertido([
+            (1, [('Salar de Uyuni', 1.0), ('Excursión al salar', 0.2)]),
+            (2, [('Lago Titicaca', 1.0), ('Vista del salar', 0.2)]),
+            (3, [('Tour lago', 1.0), ('Uyuni', 0.4)]),
+        ])
+        self.assertEqual([pk for pk, _ in indice.buscar('salar')], [1, 2])
+        self.assertEqual([pk for pk, _ in indice.buscar('lago uyuni')], [3])
+        self.assertEqual(indice.buscar('selva'), [])
+        self.assertEqual(indice.buscar('de la'), [])
+
+
+class BusquedaApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.salar = self._servicio('Salar de Uyuni', 'Tour por el salar', ciudad='Uyuni', departamento='Potosí')
+        self.lago = self._servicio('Lago Titicaca', 'Paseo en bote, vista al salar', ciudad='Copacabana',
+                                   departamento='La Paz')
+        self.cristo = self._servicio('Cristo de la Concordia', 'Mirador', ciudad='Cochabamba',
+                                     departamento='Cochabamba')
+        self.client = APIClient()
+
+    def _servicio(self, titulo, descripcion, **kwargs):
+        return Servicio.objects.create(
+            titulo=titulo, descripcion=descripcion, duracion='1 día', capacidad_max=10,
+            punto_encuentro='Plaza', **kwargs
+        )
+
+    def test_servicios_q_ordena_por_relevancia(self):
+        resp = self.client.get('/api/servicios/?q=salares')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([s['id'] for s in resp.data], [self.salar.id, self.lago.id])
+
+    def test_indice_se_actualiza_al_guardar(self):
+        self.assertFalse(buscar(Servicio.objects.all(), 'amazonia').exists())
+        self.cristo.descripcion = 'Puerta a la Amazonía'
+        self.cristo.save()
+        self.assertEqual(list(buscar(Servicio.objects.all(), 'amazonia')), [self.cristo])
+
+    def test_ubicacion_tolera_errores_de_tipeo(self):
+        qs = filtrar_ubicacion(Servicio.objects.all(), 'ciudad', 'Cochabmba')
+        self.assertEqual(list(qs), [self.cristo])
+        qs = filtrar_ubicacion(Servicio.objects.all(), 'departamento', 'potosi')
+        self.assertEqual(list(qs), [self.salar])
+        self.assertEqual(self.client.get('/api/servicios/?ciudad=copacavana').data[0]['id'], self.lago.id)
+
+    def test_catalogo_paquetes_q(self):
+        hoy = date.today()
+        comunes = {
+            'duracion': '2 días', 'precio_base': 100, 'punto_salida': 'Plaza',
+            'fecha_inicio': hoy, 'fecha_fin': hoy + timedelta(days=30),
+        }
+        uyuni = Paquete.objects.create(nombre='Aventura en Uyuni', descripcion='Salar y lagunas', **comunes)
+        mixto = Paquete.objects.create(nombre='Bolivia completa', descripcion='Incluye el salar', **comunes)
+        Paquete.objects.create(nombre='Selva', descripcion='Rurrenabaque', **comunes)
+
+        resp = self.client.get('/api/paquetes/?q=salar')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(p['id'] for p in resp.data), sorted([uyuni.id, mixto.id]))
+        self.assertEqual([p['id'] for p in self.client.get('/api/paquetes/?q=uyuni salar').data], [uyuni.id])
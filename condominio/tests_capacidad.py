@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from . import capacidad
+from .models import CapacidadServicioDia, ReglaReprogramacion, Reserva, ReservaServicio, Servicio, Usuario
+
+HOY = date(2026, 11, 2)
+MANANA = HOY + timedelta(days=1)
+
+
+def _servicio(titulo, capacidad_max=2):
+    return Servicio.objects.create(
+        titulo=titulo, descripcion='D', duracion='1D', capacidad_max=capacidad_max, punto_encuentro='Plaza',
+    )
+
+
+class CalendarioCapacidadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente')
+        self.cliente = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.tour = _servicio('Tour')
+        self.city = _servicio('City')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _reservados(self, servicio, fecha=HOY):
+        return CapacidadServicioDia.objects.filter(servicio=servicio, fecha=fecha).values_list(
+            'reservados', flat=True,
+        ).first()
+
+    def _reserva(self, fecha=HOY):
+        return Reserva.objects.create(cliente=self.cliente, total=10, fecha=fecha, servicio=self.tour)
+
+    def test_reservar_reprogramar_cancelar_y_eliminar(self):
+        reserva = self._reserva()
+        self.assertEqual(self._reservados(self.tour), 1)
+
+        reserva.fecha = MANANA
+        reserva.save()
+        self.assertEqual((self._reservados(self.tour), self._reservados(self.tour, MANANA)), (0, 1))
+
+        reserva.estado = 'CANCELADA'
+        reserva.save()
+        self.assertEqual(self._reservados(self.tour, MANANA), 0)
+
+        reserva.estado = 'PAGADA'
+        reserva.save()
+        Reserva.objects.get(pk=reserva.pk).delete()
+        self.assertEqual(self._reservados(self.tour, MANANA), 0)
+
+    def test_itinerario_multiservicio(self):
+        resp = self.client.post('/api/reservas-multiservicio/', {
+            'fecha': HOY.isoformat(), 'total': '20.00', 'moneda': 'BOB', 'cliente': self.cliente.pk,
+            'servicios': [{'servicio': self.tour.pk, 'fecha': HOY.isoformat()},
+                          {'servicio': self.city.pk, 'fecha': MANANA.isoformat()}],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual((self._reservados(self.tour), self._reservados(self.city, MANANA)), (1, 1))
+
+        reserva = Reserva.objects.get(pk=resp.data['id'])
+        reserva.estado = 'CANCELADA'
+        reserva.save()
+        self.assertEqual((self._reservados(self.tour), self._reservados(self.city, MANANA)), (0, 0))
+
+        reserva.estado = 'CONFIRMADA'
+        reserva.save()
+        ReservaServicio.objects.filter(reserva=reserva, servicio=self.city).update(fecha=HOY)  # sin señales
+        self.assertEqual(capacidad.reconstruir(), 2)
+        self.assertEqual((self._reservados(self.city), self._reservados(self.city, MANANA)), (1, None))
+
+    def test_api_rechaza_sin_lugares(self):
+        self._reserva()
+        self._reserva()
+        payload = {'fecha': HOY.isoformat(), 'total': '10.00', 'cliente_id': self.cliente.pk, 'servicio_id': self.tour.pk}
+
+        resp = self.client.post('/api/reservas/', payload, format='json')
+
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.data['servicio_id'], self.tour.pk)
+        self.assertEqual(Reserva.objects.count(), 2)
+        self.assertEqual(self._reservados(self.tour), 2)
+
+    def test_reprogramar_aplica_regla_capacidad_maxima(self):
+        self._reserva(MANANA)
+        reserva = self._reserva()
+        ReglaReprogramacion.objects.create(tipo_regla='CAPACIDAD_MAXIMA', valor_numerico=1)
+
+        resp = self.client.patch(f'/api/reservas/{reserva.pk}/', {'fecha': MANANA.isoformat()}, format='json')
+
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual((self._reservados(self.tour), self._reservados(self.tour, MANANA)), (1, 1))
+
+    def test_disponibilidad_en_una_consulta(self):
+        self._reserva()
+        with self.assertNumQueries(1):
+            libres = capacidad.disponibilidad([self.tour.pk, self.city.pk], HOY, MANANA)
+        self.assertEqual(libres[self.tour.pk]['dias'], {HOY: 1, MANANA: 2})
+        self.assertEqual(libres[self.city.pk]['dias'], {HOY: 2, MANANA: 2})
+
+        resp = self.client.get(
+            f'/api/servicios/disponibilidad/?servicios={self.tour.pk},{self.city.pk}&desde={HOY}&hasta={MANANA}'
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['servicios'][0]['dias'], {HOY.isoformat(): 1, MANANA.isoformat(): 2})
+        self.assertEqual(self.client.get('/api/servicios/disponibilidad/?servicios=x').status_code, 400)
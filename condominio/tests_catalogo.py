@@ -0,0 +1,93 @@
+from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+
+from condominio.models import Categoria, Servicio, Paquete, PaqueteServicio, CatalogoPaquete, Campania
+
+
+class CatalogoPaquetesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        categoria = Categoria.objects.create(nombre='Aventura')
+        self.servicio = Servicio.objects.create(
+            titulo='Salar', descripcion='Desc', duracion='1D', capacidad_max=10,
+            punto_encuentro='Plaza', categoria=categoria, precio_usd=10
+        )
+        hoy = date.today()
+        self.destacado = self._crear_paquete('Uyuni', destacado=True, precio_base=300, duracion='3 días')
+        self.vencido = self._crear_paquete(
+            'Vencido', precio_base=100, duracion='1 semana',
+            fecha_inicio=hoy - timedelta(days=10), fecha_fin=hoy - timedelta(days=1),
+        )
+        PaqueteServicio.objects.create(paquete=self.destacado, servicio=self.servicio, dia=1, orden=1)
+        self.client = APIClient()
+
+    def _crear_paquete(self, nombre, **kwargs):
+        datos = {
+            'descripcion': 'Desc', 'duracion': '2 días', 'precio_base': 100,
+            'fecha_inicio': date.today(), 'fecha_fin': date.today() + timedelta(days=30),
+            'punto_salida': 'Plaza',
+        }
+        datos.update(kwargs)
+        return Paquete.objects.create(nombre=nombre, **datos)
+
+    def test_listado_completa_snapshots_faltantes(self):
+        resp = self.client.get('/api/paquetes/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([p['nombre'] for p in resp.data], ['Uyuni', 'Vencido'])
+        self.assertEqual(CatalogoPaquete.objects.count(), 2)
+        self.assertEqual(resp.data[0]['itinerario'][0]['actividades'][0]['titulo'], 'Salar')
+
+    def test_filtros_en_memoria(self):
+        resp = self.client.get('/api/paquetes/', {'disponible': 'true'})
+        self.assertEqual([p['nombre'] for p in resp.data], ['Uyuni'])
+
+        resp = self.client.get('/api/paquetes/', {'precio_max': '150', 'duracion': 'SEMANA'})
+        self.assertEqual([p['nombre'] for p in resp.data], ['Vencido'])
+
+        resp = self.client.get('/api/paquetes/destacados/')
+        self.assertEqual([p['nombre'] for p in resp.data], ['Uyuni'])
+
+        resp = self.client.get('/api/paquetes/disponibles/')
+        self.assertEqual([p['nombre'] for p in resp.data], ['Uyuni'])
+        self.assertTrue(resp.data[0]['disponibilidad']['esta_vigente'])
+
+    def test_etag_devuelve_304(self):
+        resp = self.client.get('/api/paquetes/')
+        etag = resp['ETag']
+        self.assertTrue(etag)
+
+        resp = self.client.get('/api/paquetes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        # Distintos filtros generan distinto ETag
+        resp = self.client.get('/api/paquetes/destacados/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_cambios_reconstruyen_snapshot(self):
+        resp = self.client.get('/api/paquetes/')
+        etag = resp['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servicio.titulo = 'Salar de Uyuni'
+            self.servicio.save()
+        resp = self.client.get('/api/paquetes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data[0]['itinerario'][0]['actividades'][0]['titulo'], 'Salar de Uyuni')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            campania = Campania.objects.create(
+                descripcion='Promo', fecha_inicio=date.today(), fecha_fin=date.today(),
+                tipo_descuento='%', monto=10,
+            )
+            self.destacado.campania = campania
+            self.destacado.save()
+        resp = self.client.get('/api/paquetes/')
+        self.assertEqual(resp.data[0]['precios']['precio_final_usd'], 270.0)
+        self.assertEqual(resp.data[0]['campania_info']['nombre'], 'Promo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vencido.delete()
+        resp = self.client.get('/api/paquetes/')
+        self.assertEqual([p['nombre'] for p in resp.data], ['Uyuni'])
@@ -0,0 +1,99 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from condominio.models import Usuario, Categoria, Servicio, Paquete, PaqueteServicio, Reserva
+from authz.models import Rol
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.categoria = Categoria.objects.create(nombre='Aventura')
+        self.servicio = Servicio.objects.create(
+            titulo='Tour', descripcion='Desc', duracion='1D', capacidad_max=10,
+            punto_encuentro='Plaza', categoria=self.categoria, precio_usd=10
+        )
+
+    def _revalidar(self, url):
+        primera = self.client.get(url)
+        self.assertEqual(primera.status_code, 200)
+        self.assertIn('ETag', primera)
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        return primera, segunda, ctx
+
+    def test_listado_servicios_304_con_una_consulta(self):
+        primera, segunda, ctx = self._revalidar('/api/servicios/')
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('Last-Modified', primera)
+
+    def test_cambio_en_relacion_anidada_invalida(self):
+        primera, _, _ = self._revalidar('/api/servicios/')
+        self.categoria.nombre = 'Cultural'
+        self.categoria.save()
+        resp = self.client.get('/api/servicios/', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], primera['ETag'])
+
+    def test_baja_invalida_listado(self):
+        otra = Categoria.objects.create(nombre='Playa')
+        primera, _, _ = self._revalidar('/api/categorias/')
+        otra.delete()
+        resp = self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(resp.status_code, 200)
+
+    def test_detalle_paquete_y_if_modified_since(self):
+        paquete = Paquete.objects.create(
+            nombre='Paquete', descripcion='Desc', duracion='3D', precio_base=100,
+            fecha_inicio=date.today(), fecha_fin=date.today(), punto_salida='Plaza',
+        )
+        PaqueteServicio.objects.create(paquete=paquete, servicio=self.servicio, dia=1, orden=1)
+        url = f'/api/paquetes/{paquete.pk}/'
+        primera, segunda, _ = self._revalidar(url)
+        self.assertEqual(segunda.status_code, 304)
+
+        self.servicio.titulo = 'Tour renovado'
+        self.servicio.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.get(f'/api/servicios/{self.servicio.pk}/')
+        resp = self.client.get(
+            f'/api/servicios/{self.servicio.pk}/', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 304)
+
+    def test_mi_perfil_se_invalida_con_reservas(self):
+        user = User.objects.create_user(username='cliente', password='pass1234')
+        perfil = Usuario.objects.create(user=user, nombre='Cliente', rol=Rol.objects.create(nombre='Cliente'))
+        self.client.force_authenticate(user=user)
+
+        url = '/api/perfil/mi_perfil/'
+        primera, segunda, _ = self._revalidar(url)
+        self.assertEqual(segunda.status_code, 304)
+
+        Reserva.objects.create(fecha=date.today(), total=50, cliente=perfil, servicio=self.servicio)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['total_reservas'], 1)
+
+    def test_mis_paquetes_distinct(self):
+        user = User.objects.create_user(username='viajero', password='pass1234')
+        perfil = Usuario.objects.create(user=user, nombre='Viajero')
+        paquete = Paquete.objects.create(
+            nombre='Paquete', descripcion='Desc', duracion='3D', precio_base=100,
+            fecha_inicio=date.today(), fecha_fin=date.today(), punto_salida='Plaza',
+        )
+        for _ in range(2):
+            Reserva.objects.create(fecha=date.today(), total=100, cliente=perfil, paquete=paquete)
+        self.client.force_authenticate(user=user)
+
+        primera, segunda, _ = self._revalidar('/api/paquetes/mis_paquetes/')
+        self.assertEqual(len(primera.data), 1)
+        self.assertEqual(segunda.status_code, 304)
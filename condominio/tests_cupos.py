@@ -0,0 +1,110 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import cupos
+from .models import Paquete, RetencionCupo, Reserva, Usuario
+
+
+def _paquete(cupos_disponibles=2, **extra):
+    return Paquete.objects.create(
+        nombre='Salar', descripcion='D', duracion='1D', precio_base=100, punto_salida='Plaza',
+        cupos_disponibles=cupos_disponibles, fecha_inicio=date.today(), fecha_fin=date.today(), **extra
+    )
+
+
+class CuposPaqueteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente')
+        self.perfil = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.paquete = _paquete()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _reservar(self, **extra):
+        return self.client.post('/api/reservas/', {
+            'fecha': date.today().isoformat(),
+            'fecha_inicio': datetime.now().isoformat(),
+            'fecha_fin': datetime.now().isoformat(),
+            'total': '100.00', 'moneda': 'BOB',
+            'cliente_id': self.perfil.id, 'paquete_id': self.paquete.id, **extra,
+        }, format='json')
+
+    def test_no_sobrevende(self):
+        cupos.ocupar(self.paquete.pk, 2)
+        with self.assertRaises(cupos.CuposAgotados):
+            cupos.ocupar(self.paquete.pk)
+        self.paquete.refresh_from_db()
+        self.assertEqual(self.paquete.cupos_ocupados, 2)
+
+    def test_retencion_vencida_se_libera_al_agotarse(self):
+        retencion = cupos.retener(self.paquete.pk, cantidad=2)
+        RetencionCupo.objects.filter(pk=retencion.pk).update(expira_en=timezone.now() - timedelta(minutes=1))
+
+        cupos.ocupar(self.paquete.pk)
+
+        self.paquete.refresh_from_db()
+        self.assertEqual(self.paquete.cupos_ocupados, 1)
+        self.assertFalse(RetencionCupo.objects.exists())
+
+    def test_api_reserva_ocupa_y_responde_409_al_agotarse(self):
+        self.assertEqual(self._reservar().status_code, 201)
+        self.assertEqual(self._reservar().status_code, 201)
+
+        resp = self._reservar()
+
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(Reserva.objects.count(), 2)
+        self.paquete.refresh_from_db()
+        self.assertEqual(self.paquete.cupos_ocupados, 2)
+
+    def test_reserva_confirma_la_retencion(self):
+        resp = self.client.post(f'/api/paquetes/{self.paquete.pk}/retener_cupo/')
+        self.assertEqual(resp.status_code, 201)
+
+        self.assertEqual(self._reservar(retencion_id=resp.data['retencion_id']).status_code, 201)
+
+        self.paquete.refresh_from_db()
+        self.assertEqual(self.paquete.cupos_ocupados, 1)
+        self.assertFalse(RetencionCupo.objects.exists())
+
+    def test_cancelar_reserva_devuelve_el_cupo(self):
+        reserva_id = self._reservar().data['id']
+
+        resp = self.client.patch(f'/api/reservas/{reserva_id}/', {'estado': 'CANCELADA'}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.paquete.refresh_from_db()
+        self.assertEqual(self.paquete.cupos_ocupados, 0)
+
+    def test_catalogo_muestra_cupos_en_vivo(self):
+        antes = self.client.get('/api/paquetes/')
+        actualizado = self.paquete.updated_at
+
+        cupos.ocupar(self.paquete.pk)
+        cupos.ocupar(self.paquete.pk)  # agotado sin esperar ninguna reconstrucción
+
+        resp = self.client.get('/api/paquetes/', HTTP_IF_NONE_MATCH=antes['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], antes['ETag'])
+        disponibilidad = resp.data[0]['disponibilidad']
+        self.assertEqual(disponibilidad['cupos_restantes'], 0)
+        self.assertFalse(disponibilidad['esta_disponible'])
+        self.assertEqual(resp.data[0]['cupos_ocupados'], 2)
+        self.paquete.refresh_from_db()
+        self.assertGreater(self.paquete.updated_at, actualizado)
+
+
+class BenchmarkCuposCommandTests(TransactionTestCase):
+    def test_benchmark_no_sobrevende_y_limpia(self):
+        salida = StringIO()
+        # SQLite serializa las escrituras; la concurrencia real se mide en PostgreSQL
+        call_command('benchmark_cupos', '--hilos', '1', '--intentos', '8', '--cupos', '5', stdout=salida)
+
+        self.assertIn('exitosas=5 agotado=3 errores=0', salida.getvalue())
+        self.assertFalse(Paquete.objects.exists())
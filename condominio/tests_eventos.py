@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from .eventos import hub
+from .models import Notificacion, Ticket, TicketMessage, Usuario
+
+
+class HubEventosTest(TestCase):
+    async def test_entrega_solo_al_usuario_desde_otro_hilo(self):
+        cola = hub.suscribir(1)
+        ajena = hub.suscribir(2)
+        try:
+            hilo = threading.Thread(target=hub.entregar, args=(1, {'tipo': 'notificacion', 'id': 7}))
+            hilo.start()
+            hilo.join()
+            self.assertEqual(await asyncio.wait_for(cola.get(), 1), {'tipo': 'notificacion', 'id': 7})
+            self.assertTrue(ajena.empty())
+        finally:
+            hub.desuscribir(1, cola)
+            hub.desuscribir(2, ajena)
+        self.assertEqual(hub.conexiones(), 0)
+
+
+class StreamEventosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente')
+        self.cliente = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.agente = Usuario.objects.create(user=User.objects.create_user(username='agente'), nombre='Agente')
+        self.token = Token.objects.create(user=self.user)
+        Notificacion.objects.create(usuario=self.cliente, tipo='ticket_nuevo')
+
+    def _crear_eventos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.create(usuario=self.agente, tipo='ticket_nuevo')  # de otro usuario
+            ticket = Ticket.objects.create(creador=self.cliente, agente=self.agente, asunto='A', descripcion='D')
+            TicketMessage.objects.create(ticket=ticket, autor=self.agente, texto='Hola')
+            Notificacion.objects.create(usuario=self.cliente, tipo='ticket_respondido')
+
+    async def test_stream_envia_hola_y_eventos_del_usuario(self):
+        resp = await self.async_client.get('/api/eventos/', headers={'authorization': f'Token {self.token.key}'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+
+        stream = aiter(resp.streaming_content)
+        primero = (await anext(stream)).decode()
+        self.assertIn('event: hola', primero)
+        self.assertIn('"no_leidas": 1', primero)
+
+        await sync_to_async(self._crear_eventos)()
+        mensaje = (await asyncio.wait_for(anext(stream), 1)).decode()
+        notificacion = (await asyncio.wait_for(anext(stream), 1)).decode()
+        self.assertIn('event: ticket_mensaje', mensaje)
+        self.assertIn('event: notificacion', notificacion)
+        self.assertIn('"tipo_notificacion": "ticket_respondido"', notificacion)
+
+        # Desconexión del cliente: el servidor ASGI cancela la lectura pendiente
+        pendiente = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pendiente.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pendiente
+        self.assertEqual(hub.conexiones(self.cliente.pk), 0)
+
+    async def test_sin_credenciales(self):
+        resp = await self.async_client.get('/api/eventos/?ticket=invalido')
+        self.assertEqual(resp.status_code, 401)
+        # El token de la API ya no se acepta en la URL
+        resp = await self.async_client.get(f'/api/eventos/?token={self.token.key}')
+        self.assertEqual(resp.status_code, 401)
+
+    async def test_ticket_firmado(self):
+        resp = await self.async_client.post('/api/eventos/ticket/', headers={'authorization': f'Token {self.token.key}'})
+        self.assertEqual(resp.status_code, 200)
+        ticket = resp.json()['ticket']
+        self.assertNotIn(self.token.key, ticket)
+
+        resp = await self.async_client.get(f'/api/eventos/?ticket={ticket}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('event: hola', (await anext(aiter(resp.streaming_content))).decode())
+        with override_settings(EVENTOS_TICKET_TTL=-1):
+            self.assertEqual((await self.async_client.get(f'/api/eventos/?ticket={ticket}')).status_code, 401)
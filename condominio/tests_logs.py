@@ -0,0 +1,40 @@
+import logging
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from condominio.logs import log_evento, lazy, lazy_ids, recortar
+from condominio.models import Usuario, Reserva
+
+
+class LogEventoTest(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('condominio.tests_logs')
+
+    def test_no_evalua_si_el_nivel_no_esta_habilitado(self):
+        llamadas = []
+        self.logger.setLevel(logging.INFO)
+        log_evento(self.logger, logging.DEBUG, 'prueba', valor=lazy(lambda: llamadas.append(1)))
+        self.assertEqual(llamadas, [])
+
+    def test_formato_estructurado_y_recorte(self):
+        perfil = Usuario.objects.create(user=User.objects.create_user(username='cliente'), nombre='Cliente')
+        for _ in range(5):
+            Reserva.objects.create(fecha=date.today(), total=10, cliente=perfil)
+
+        with override_settings(LOG_MAX_ITEMS=3), self.assertLogs(self.logger, logging.DEBUG) as cm:
+            log_evento(self.logger, logging.DEBUG, 'prueba', ids=lazy_ids(Reserva.objects.order_by('id')),
+                       lista=list(range(10)))
+
+        ids = list(Reserva.objects.order_by('id').values_list('id', flat=True)[:3])
+        self.assertIn(f"[prueba] ids=[{', '.join(map(str, ids))}, …]", cm.output[0])
+        self.assertIn('lista=[0, 1, 2, …(+7)]', cm.output[0])
+        self.assertEqual(cm.records[0].evento, 'prueba')
+
+    def test_muestreo(self):
+        with override_settings(LOG_MUESTREO=0.0), self.assertNoLogs(self.logger, logging.INFO):
+            log_evento(self.logger, logging.INFO, 'prueba', muestreo=0.5, x=1)
+
+    def test_recortar(self):
+        self.assertEqual(recortar([1, 2], limite=5), '[1, 2]')
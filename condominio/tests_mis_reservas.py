@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from condominio.models import Usuario, Reserva, HistorialReprogramacion, Paquete
+
+
+class MisReservasEstadisticasTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='cliente', password='pass1234')
+        self.perfil = Usuario.objects.create(user=user, nombre='Cliente')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.client.get('/api/reservas/mis_reservas/')  # resuelve perfil/rol antes de contar
+        for estado in ['PENDIENTE', 'PAGADA', 'PAGADA', 'CANCELADA', 'COMPLETADA']:
+            Reserva.objects.create(fecha=date(2025, 1, 10), total=10, cliente=self.perfil, estado=estado)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data, len(ctx.captured_queries)
+
+    def test_estadisticas_en_una_consulta(self):
+        data, consultas = self._get('/api/reservas/mis_reservas/')
+        stats = data['estadisticas']
+        self.assertEqual(stats['total_reservas'], 5)
+        self.assertEqual(stats['activas'], 3)
+        self.assertEqual(stats['completadas'], 1)
+        self.assertEqual(stats['canceladas'], 1)
+        self.assertEqual(stats['por_estado']['Pagada'], 2)
+        self.assertEqual(stats['por_estado']['Reprogramada'], 0)
+
+        filtrado, consultas_filtrado = self._get(
+            '/api/reservas/mis_reservas/?estado=pagada&fecha_desde=2025-01-01&fecha_hasta=2025-12-31'
+        )
+        self.assertEqual(filtrado['estadisticas']['total_reservas'], 2)
+        self.assertEqual(len(filtrado['reservas']), 2)
+        self.assertEqual(consultas, consultas_filtrado)
+
+    def test_historial_completo_consultas_constantes(self):
+        def agregar(cantidad):
+            paquete = Paquete.objects.create(
+                nombre='Paquete', descripcion='Desc', duracion='3D', precio_base=100,
+                fecha_inicio=date.today(), fecha_fin=date.today(), punto_salida='Plaza',
+            )
+            for reserva in Reserva.objects.filter(cliente=self.perfil)[:cantidad]:
+                reserva.paquete = paquete
+                reserva.save()
+                HistorialReprogramacion.objects.create(
+                    reserva=reserva, fecha_anterior=timezone.now(), fecha_nueva=timezone.now(),
+                    motivo='Cambio', reprogramado_por=self.perfil,
+                )
+
+        agregar(1)
+        _, pocas = self._get('/api/reservas/historial_completo/')
+        agregar(5)
+        data, muchas = self._get('/api/reservas/historial_completo/')
+
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(data['count'], 5)
+        self.assertTrue(all(r['historial_reprogramaciones'] for r in data['historial']))
+        self.assertEqual(data['historial'][0]['historial_reprogramaciones'][0]['reprogramado_por'], 'Cliente')
+
+        pagina, _ = self._get('/api/reservas/historial_completo/?page_size=2')
+        self.assertEqual((pagina['count'], len(pagina['historial'])), (5, 2))
+        self.assertIsNotNone(pagina['next'])
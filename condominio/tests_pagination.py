@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from condominio.models import Usuario, Bitacora
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='auditor', password='pass1234')
+        self.perfil = Usuario.objects.create(user=user, nombre='Auditor')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+        base = timezone.now()
+        Bitacora.objects.bulk_create([Bitacora(accion=f'Accion {i}', usuario=self.perfil) for i in range(12)])
+        # Timestamps repetidos para ejercitar el desempate por id, y algunos NULL legados
+        for i, bitacora in enumerate(Bitacora.objects.order_by('id')):
+            creado = None if i < 2 else base - timedelta(minutes=i // 3)
+            Bitacora.objects.filter(pk=bitacora.pk).update(created_at=creado)
+
+    def _pagina(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data, len(ctx.captured_queries)
+
+    def test_recorre_todas_las_filas_sin_repetir(self):
+        vistos, consultas, url = [], [], '/api/bitacora/?page_size=5'
+        while url:
+            data, n = self._pagina(url)
+            vistos += [r['id'] for r in data['results']]
+            consultas.append(n)
+            url = data['next']
+
+        con_fecha = Bitacora.objects.filter(created_at__isnull=False).order_by('-created_at', '-id')
+        sin_fecha = Bitacora.objects.filter(created_at__isnull=True).order_by('-id')
+        esperados = [b.pk for b in con_fecha] + [b.pk for b in sin_fecha]
+        self.assertEqual(vistos, esperados)
+        # Costo constante por página; solo la que entra al tramo de NULL hace una consulta más
+        self.assertLessEqual(max(consultas) - min(consultas), 1)
+
+    def test_cursor_acota_el_rango_del_indice(self):
+        primera, _ = self._pagina('/api/bitacora/?page_size=5')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(primera['next'])
+        sql = next(q['sql'] for q in ctx.captured_queries if 'condominio_bitacora' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertIn('"created_at" <= ', sql)
+
+    def test_pagina_anterior(self):
+        primera, _ = self._pagina('/api/bitacora/?page_size=5')
+        self.assertIsNone(primera['previous'])
+        segunda, _ = self._pagina(primera['next'])
+        volver, _ = self._pagina(segunda['previous'])
+        self.assertEqual(volver['results'], primera['results'])
+        self.assertIsNone(volver['previous'])
+
+    def test_cursor_invalido(self):
+        resp = self.client.get('/api/bitacora/?cursor=no-valido')
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from datetime import date
+
+from condominio.models import Usuario, Categoria, Servicio, Paquete, PaqueteServicio, Reserva
+from condominio.api import PaqueteViewSet
+from condominio.serializer import PaqueteSerializer
+from authz.models import Rol
+
+
+class PaqueteQueryCountTest(TestCase):
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Aventura')
+        self.servicios = [
+            Servicio.objects.create(
+                titulo=f'Tour {i}', descripcion='Desc', duracion='1D', capacidad_max=10,
+                punto_encuentro='Plaza', categoria=self.categoria, precio_usd=10
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def _crear_paquetes(self, cantidad):
+        for i in range(cantidad):
+            paquete = Paquete.objects.create(
+                nombre=f'Paquete {i}', descripcion='Desc', duracion='3D',
+                precio_base=100, fecha_inicio=date.today(), fecha_fin=date.today(),
+                punto_salida='Plaza',
+            )
+            for dia, servicio in enumerate(self.servicios, start=1):
+                PaqueteServicio.objects.create(paquete=paquete, servicio=servicio, dia=dia, orden=1)
+
+    def _contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), resp
+
+    def test_serializer_paquetes_consultas_constantes(self):
+        def serializar():
+            with CaptureQueriesContext(connection) as ctx:
+                data = PaqueteSerializer(PaqueteViewSet.queryset.all(), many=True).data
+            return len(ctx.captured_queries), data
+
+        self._crear_paquetes(2)
+        consultas_pocos, _ = serializar()
+
+        self._crear_paquetes(5)
+        consultas_muchos, data = serializar()
+
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        # Paquetes (+campaña por JOIN) y un único prefetch de PaqueteServicio
+        self.assertEqual(consultas_muchos, 2)
+        self.assertEqual(len(data), 7)
+        primero = data[0]
+        self.assertEqual(len(primero['servicios_incluidos']), 3)
+        self.assertEqual([d['dia'] for d in primero['itinerario']], [1, 2, 3])
+
+    def test_listado_reservas_con_paquete_consultas_constantes(self):
+        user = User.objects.create_user(username='admin', email='admin@example.com', password='pass1234')
+        rol = Rol.objects.create(nombre='Admin')
+        perfil = Usuario.objects.create(user=user, nombre='Admin', rol=rol)
+        self.client.force_authenticate(user=user)
+
+        def crear_reservas(cantidad):
+            self._crear_paquetes(cantidad)
+            for paquete in Paquete.objects.filter(reservas__isnull=True):
+                Reserva.objects.create(fecha=date.today(), total=100, cliente=perfil, paquete=paquete)
+
+        crear_reservas(2)
+        self.client.get('/api/reservas/')  # resuelve perfil/rol (caché de resolver_perfil)
+        consultas_pocas, _ = self._contar_consultas('/api/reservas/')
+
+        crear_reservas(4)
+        consultas_muchas, resp = self._contar_consultas('/api/reservas/')
+
+        self.assertEqual(consultas_pocas, consultas_muchas)
+        self.assertEqual(len(resp.data['results']), 6)
@@ -0,0 +1,75 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import date, datetime, time
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from condominio.models import Usuario, Bitacora
+from condominio.particiones import archivar_bitacora, corte_retencion, sumar_meses, nombre_particion
+
+
+def _en(mes, dia=15):
+    return timezone.make_aware(datetime.combine(date(mes.year, mes.month, dia), time(12)))
+
+
+class RetencionBitacoraTest(TestCase):
+    def setUp(self):
+        self.perfil = Usuario.objects.create(user=User.objects.create_user(username='auditor'), nombre='Auditor')
+        self.hoy = date.today().replace(day=1)
+        for atras in (0, 1, 3, 4):
+            mes = sumar_meses(self.hoy, -atras)
+            for i in range(2):
+                b = Bitacora.objects.create(usuario=self.perfil, accion=f'Accion {atras}-{i}', descripcion='ñandú')
+                Bitacora.objects.filter(pk=b.pk).update(created_at=_en(mes))
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_utilidades_de_meses(self):
+        self.assertEqual(sumar_meses(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(sumar_meses(date(2025, 1, 1), -1), date(2024, 12, 1))
+        self.assertEqual(nombre_particion(date(2025, 3, 1)), 'condominio_bitacora_p202503')
+        self.assertEqual(corte_retencion(2, hoy=date(2025, 3, 20)), date(2025, 1, 1))
+
+    def test_archiva_y_elimina_meses_fuera_de_retencion(self):
+        resultado = archivar_bitacora(meses_retencion=2, directorio=self.directorio)
+
+        archivados = {mes: filas for mes, _, filas in resultado}
+        self.assertEqual(archivados, {sumar_meses(self.hoy, -4): 2, sumar_meses(self.hoy, -3): 2})
+        self.assertEqual(Bitacora.objects.count(), 4)
+        self.assertFalse(Bitacora.objects.filter(created_at__lt=_en(sumar_meses(self.hoy, -2), 1)).exists())
+
+        mes = sumar_meses(self.hoy, -3)
+        ruta = Path(self.directorio) / f'bitacora_{mes.year:04d}_{mes.month:02d}.ndjson.gz'
+        with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+            lineas = [json.loads(linea) for linea in archivo]
+        self.assertEqual([l['accion'] for l in lineas], ['Accion 3-0', 'Accion 3-1'])
+        self.assertEqual(lineas[0]['usuario_id'], self.perfil.pk)
+        self.assertEqual(lineas[0]['descripcion'], 'ñandú')
+
+        # Segunda ejecución: nada que archivar
+        self.assertEqual(archivar_bitacora(meses_retencion=2, directorio=self.directorio), [])
+
+    def test_comando_simular_no_borra(self):
+        call_command('mantener_bitacora', '--simular', '--retencion-meses', '2',
+                     '--directorio', self.directorio, stdout=StringIO())
+        self.assertEqual(Bitacora.objects.count(), 8)
+        self.assertEqual(list(Path(self.directorio).iterdir()), [])
+
+    def test_listado_filtra_por_rango_de_fechas(self):
+        client = APIClient()
+        client.force_authenticate(user=self.perfil.user)
+        mes = sumar_meses(self.hoy, -1)
+        resp = client.get(f'/api/bitacora/?desde={mes.isoformat()}&hasta={date(mes.year, mes.month, 28).isoformat()}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sorted(r['accion'] for r in resp.data['results']), ['Accion 1-0', 'Accion 1-1'])
+
+        self.assertEqual(client.get('/api/bitacora/?desde=2025-13-01').status_code, 400)
+        self.assertEqual(client.get('/api/bitacora/?hasta=ayer').status_code, 400)
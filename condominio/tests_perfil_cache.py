@@ -0,0 +1,69 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from authz.models import Rol, UserRole
+from condominio.perfiles import resolver_perfil
+from condominio.models import Usuario
+
+
+@override_settings(CACHE_COMPARTIDA=True)
+class PerfilRolCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cliente = Rol.objects.create(nombre='Cliente')
+        self.soporte = Rol.objects.create(nombre='Soporte')
+        self.user = User.objects.create_user(username='ana', password='pass1234')
+        self.perfil = Usuario.objects.create(user=self.user, nombre='Ana', rol=self.cliente)
+
+    def _fresco(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_resuelve_una_vez_y_enlaza_user(self):
+        user = self._fresco()
+        with self.assertNumQueries(1):
+            perfil = resolver_perfil(user)
+            self.assertEqual(perfil.rol.nombre, 'Cliente')
+            self.assertIs(user.perfil, perfil)
+
+        # Otra petición (otro objeto user) usa la caché
+        otra_peticion = self._fresco()
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver_perfil(otra_peticion).rol.nombre, 'Cliente')
+
+    def test_sin_perfil_tambien_se_cachea(self):
+        otro = User.objects.create_user(username='sin_perfil')
+        self.assertIsNone(resolver_perfil(otro))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolver_perfil(User(pk=otro.pk, username='sin_perfil', date_joined=otro.date_joined)))
+            self.assertFalse(hasattr(otro, 'perfil'))
+        self.assertIsNone(resolver_perfil(AnonymousUser()))
+
+    def test_invalidacion_por_cambio_de_rol(self):
+        resolver_perfil(self._fresco())
+        self.perfil.rol = self.soporte
+        self.perfil.save()
+        self.assertEqual(resolver_perfil(self._fresco()).rol.nombre, 'Soporte')
+
+        UserRole.objects.create(user=self.user, rol=self.cliente)
+        otra_peticion = self._fresco()
+        with self.assertNumQueries(1):
+            resolver_perfil(otra_peticion)
+
+        self.soporte.nombre = 'Soporte N2'
+        self.soporte.save()
+        self.assertEqual(resolver_perfil(self._fresco()).rol.nombre, 'Soporte N2')
+
+    def test_id_reutilizado_no_usa_entrada_ajena(self):
+        resolver_perfil(self._fresco())
+        impostor = User(pk=self.user.pk, username='otro')
+        with self.assertNumQueries(1):
+            resolver_perfil(impostor)
+
+    @override_settings(CACHE_COMPARTIDA=False)
+    def test_cache_por_proceso_no_guarda(self):
+        resolver_perfil(self._fresco())
+        otra_peticion = self._fresco()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver_perfil(otra_peticion).rol.nombre, 'Cliente')
+        self.assertIsNone(cache.get(f'perfil_rol:{self.user.pk}'))
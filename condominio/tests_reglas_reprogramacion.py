@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import reglas_reprogramacion
+from .models import ConfiguracionGlobalReprogramacion, HistorialReprogramacion, ReglaReprogramacion, Reserva, Usuario
+
+
+class MotorReglasTests(TestCase):
+    def setUp(self):
+        self.cliente = Usuario.objects.create(user=User.objects.create_user(username='cliente'), nombre='Cliente')
+        self.en_una_semana = timezone.localdate() + timedelta(days=7)
+
+    def _regla(self, tipo, **valores):
+        return ReglaReprogramacion.objects.create(nombre=tipo, tipo_regla=tipo, **valores)
+
+    def _reserva(self, **extra):
+        return Reserva.objects.create(cliente=self.cliente, total=10, fecha=self.en_una_semana, **extra)
+
+    def test_valida_lote_con_una_consulta(self):
+        self._regla('LIMITE_REPROGRAMACIONES', valor_numerico=2)
+        self._regla('DIAS_BLACKOUT', valor_texto='["domingo", "2030-01-01"]')
+        self._regla('LIMITE_DIARIO', valor_numerico=1)
+        self._regla('DESCUENTO_PENALIZACION', valor_decimal=Decimal('10.00'))
+        ConfiguracionGlobalReprogramacion.objects.create(clave='DIAS_AVISO', valor='3', tipo_valor='INTEGER')
+        agotada, lunes, domingo, otra = (
+            self._reserva(numero_reprogramaciones=2), self._reserva(), self._reserva(), self._reserva(),
+        )
+        proximo_lunes = self.en_una_semana + timedelta(days=7 - self.en_una_semana.weekday())
+        reglas_reprogramacion.obtener_motor()
+
+        with self.assertNumQueries(1):  # solo la versión de las reglas
+            evaluador = reglas_reprogramacion.evaluador('CLIENTE')
+            resultados = evaluador.validar_lote([
+                (agotada, proximo_lunes), (domingo, proximo_lunes + timedelta(days=6)),
+                (lunes, proximo_lunes), (otra, proximo_lunes),
+            ])
+        self.assertEqual(reglas_reprogramacion.configuracion('DIAS_AVISO'), 3)
+
+        self.assertEqual([e['regla'] for e in resultados[agotada.pk]['errores']], ['LIMITE_REPROGRAMACIONES'])
+        self.assertTrue(resultados[lunes.pk]['valida'])
+        self.assertEqual(resultados[lunes.pk]['penalizacion'], Decimal('10.00'))
+        self.assertEqual([e['regla'] for e in resultados[domingo.pk]['errores']], ['DIAS_BLACKOUT'])
+        # LIMITE_DIARIO=1 ya lo consumió la reprogramación válida anterior del lote
+        self.assertEqual([e['regla'] for e in resultados[otra.pk]['errores']], ['LIMITE_DIARIO'])
+
+    def test_guardar_regla_recompila_y_prioriza_por_rol(self):
+        reserva = self._reserva()
+        destino = datetime.combine(self.en_una_semana + timedelta(days=1), datetime.min.time()).replace(hour=23)
+        self.assertTrue(reglas_reprogramacion.evaluador('CLIENTE').validar(reserva, destino)['valida'])
+
+        self._regla('HORAS_BLACKOUT', valor_texto='22-06', mensaje_error='Horario nocturno')
+        self._regla('HORAS_BLACKOUT', valor_texto='12:00-14:00', aplicable_a='ADMIN')
+
+        cliente = reglas_reprogramacion.evaluador('CLIENTE').validar(reserva, destino)
+        self.assertEqual(cliente['errores'], [{'regla': 'HORAS_BLACKOUT', 'mensaje': 'Horario nocturno'}])
+        self.assertTrue(reglas_reprogramacion.evaluador('ADMIN').validar(reserva, destino)['valida'])
+
+    def test_cambio_visible_sin_cache_compartida(self):
+        reserva = self._reserva()
+        destino = self.en_una_semana + timedelta(days=1)
+        regla = self._regla('TIEMPO_MAXIMO', valor_numerico=30)
+        self.assertTrue(reglas_reprogramacion.evaluador().validar(reserva, destino)['valida'])
+
+        # UPDATE de otro proceso: no pasa por señales ni por la caché de este
+        ReglaReprogramacion.objects.filter(pk=regla.pk).update(valor_numerico=1, updated_at=timezone.now())
+
+        self.assertEqual(reglas_reprogramacion.evaluador().validar(reserva, destino)['errores'][0]['regla'], 'TIEMPO_MAXIMO')
+
+    def test_regla_sin_created_at_no_rompe_el_orden(self):
+        self._regla('LIMITE_DIARIO', valor_numerico=3)
+        sin_fecha = self._regla('LIMITE_DIARIO', valor_numerico=1)
+        ReglaReprogramacion.objects.filter(pk=sin_fecha.pk).update(created_at=None)
+
+        self.assertEqual(reglas_reprogramacion.evaluador().valor('LIMITE_DIARIO'), 3)
+
+    def test_regla_invalida_se_ignora(self):
+        self._regla('DIAS_BLACKOUT', valor_texto='feriado')
+        self.assertEqual(reglas_reprogramacion.evaluador().reglas, {})
+
+
+class ReprogramarReservaApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente')
+        self.cliente = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.fecha = timezone.localdate() + timedelta(days=10)
+        self.reserva = Reserva.objects.create(cliente=self.cliente, total=10, fecha=self.fecha, estado='PAGADA')
+
+    def test_reprograma_y_registra_historial(self):
+        nueva = self.fecha + timedelta(days=3)
+
+        resp = self.client.post(f'/api/reservas/{self.reserva.pk}/reprogramar/', {'nueva_fecha': nueva.isoformat()}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.reserva.refresh_from_db()
+        self.assertEqual((self.reserva.fecha, self.reserva.estado, self.reserva.numero_reprogramaciones),
+                         (nueva, 'REPROGRAMADA', 1))
+        self.assertEqual(HistorialReprogramacion.objects.get(reserva=self.reserva).reprogramado_por, self.cliente)
+
+    def test_rechaza_si_incumple_regla(self):
+        ReglaReprogramacion.objects.create(tipo_regla='TIEMPO_MAXIMO', valor_numerico=5)
+
+        resp = self.client.post(f'/api/reservas/{self.reserva.pk}/reprogramar/', {'nueva_fecha': date(2099, 1, 1).isoformat()}, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['errores'][0]['regla'], 'TIEMPO_MAXIMO')
+        self.assertFalse(HistorialReprogramacion.objects.exists())
@@ -0,0 +1,135 @@
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authz.models import Rol
+from .models import (
+    CapacidadServicioDia, HistorialReprogramacion, Notificacion, Paquete, ReglaReprogramacion, Reserva,
+    ReservaServicio, Servicio, Usuario,
+)
+
+URL = '/api/reservas/reprogramar_lote/'
+
+
+class ReprogramacionLoteTests(TestCase):
+    def setUp(self):
+        operador = User.objects.create_user(username='operador')
+        self.operador = Usuario.objects.create(user=operador, nombre='Operador', rol=Rol.objects.create(nombre='operador'))
+        self.ana = Usuario.objects.create(user=User.objects.create_user(username='ana'), nombre='Ana')
+        self.luis = Usuario.objects.create(user=User.objects.create_user(username='luis'), nombre='Luis')
+        self.tour = Servicio.objects.create(
+            titulo='Tour', descripcion='D', duracion='1D', capacidad_max=3, punto_encuentro='Plaza',
+        )
+        self.fecha = timezone.localdate() + timedelta(days=5)
+        self.nueva = self.fecha + timedelta(days=2)
+        inicio = timezone.make_aware(datetime.combine(self.fecha, datetime.min.time()).replace(hour=8))
+        self.reservas = [
+            Reserva.objects.create(cliente=cliente, total=10, fecha=self.fecha, servicio=self.tour, estado='PAGADA',
+                                   fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=4), **extra)
+            for cliente, extra in ((self.ana, {}), (self.ana, {}), (self.luis, {'numero_reprogramaciones': 2}))
+        ]
+        ReglaReprogramacion.objects.create(tipo_regla='LIMITE_REPROGRAMACIONES', valor_numerico=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=operador)
+        self.payload = {
+            'servicio_id': self.tour.pk, 'fecha': self.fecha.isoformat(), 'nueva_fecha': self.nueva.isoformat(),
+            'motivo': 'Clima',
+        }
+
+    def _reservados(self, fecha):
+        return CapacidadServicioDia.objects.get(servicio=self.tour, fecha=fecha).reservados
+
+    def test_simular_no_modifica(self):
+        resp = self.client.post(URL, {**self.payload, 'simular': True}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['reprogramadas'], [self.reservas[0].pk, self.reservas[1].pk])
+        self.assertEqual(resp.data['rechazadas'][0]['reserva_id'], self.reservas[2].pk)
+        self.assertEqual(resp.data['capacidad'], [
+            {'servicio_id': self.tour.pk, 'fecha': self.nueva, 'a_mover': 2, 'libres': 3, 'suficiente': True},
+        ])
+        self.assertFalse(Reserva.objects.filter(estado='REPROGRAMADA').exists())
+        self.assertFalse(HistorialReprogramacion.objects.exists())
+
+    def test_reprograma_en_lote(self):
+        resp = self.client.post(URL, self.payload, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        movida = Reserva.objects.get(pk=self.reservas[0].pk)
+        self.assertEqual((movida.fecha, movida.estado, movida.numero_reprogramaciones), (self.nueva, 'REPROGRAMADA', 1))
+        self.assertEqual(timezone.localtime(movida.fecha_inicio).hour, 8)
+        self.assertEqual(movida.fecha_inicio - movida.fecha_original, timedelta(days=2))
+        self.assertEqual(movida.reprogramado_por, self.operador)
+        self.assertEqual(Reserva.objects.get(pk=self.reservas[2].pk).fecha, self.fecha)
+        self.assertEqual(HistorialReprogramacion.objects.count(), 2)
+        # Una notificación por cliente afectado, con su badge
+        self.assertEqual(Notificacion.objects.get(tipo='reserva_reprogramada').usuario, self.ana)
+        self.assertEqual(Usuario.objects.get(pk=self.ana.pk).notificaciones_no_leidas, 1)
+        self.assertEqual((self._reservados(self.fecha), self._reservados(self.nueva)), (1, 2))
+
+    def test_sin_capacidad_revierte_todo(self):
+        Servicio.objects.filter(pk=self.tour.pk).update(capacidad_max=1)
+
+        resp = self.client.post(URL, self.payload, format='json')
+
+        self.assertEqual(resp.status_code, 409)
+        self.assertFalse(Reserva.objects.filter(fecha=self.nueva).exists())
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(self._reservados(self.fecha), 3)
+
+    def test_paquete_mueve_itinerario_y_su_capacidad(self):
+        city = Servicio.objects.create(titulo='City', descripcion='D', duracion='1D', capacidad_max=1, punto_encuentro='Plaza')
+        paquete = Paquete.objects.create(
+            nombre='Salar', descripcion='D', duracion='2D', precio_base=100, punto_salida='Plaza',
+            fecha_inicio=date.today(), fecha_fin=date.today(),
+        )
+        reserva = Reserva.objects.create(cliente=self.ana, total=10, fecha=self.fecha, paquete=paquete, estado='PAGADA')
+        ReservaServicio.objects.create(reserva=reserva, servicio=self.tour, fecha=self.fecha)
+        dia_dos = ReservaServicio.objects.create(reserva=reserva, servicio=city, fecha=self.fecha + timedelta(days=1))
+
+        resp = self.client.post(URL, {'paquete_id': paquete.pk, 'fecha': self.fecha.isoformat(),
+                                      'nueva_fecha': self.nueva.isoformat()}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        dia_dos.refresh_from_db()
+        self.assertEqual(dia_dos.fecha, self.nueva + timedelta(days=1))
+        self.assertEqual((self._reservados(self.fecha), self._reservados(self.nueva)), (3, 1))
+        dias_city = dict(CapacidadServicioDia.objects.filter(servicio=city).values_list('fecha', 'reservados'))
+        self.assertEqual(dias_city, {self.fecha + timedelta(days=1): 0, self.nueva + timedelta(days=1): 1})
+
+    def test_paquete_verifica_capacidad_del_itinerario(self):
+        paquete = Paquete.objects.create(
+            nombre='Salar', descripcion='D', duracion='1D', precio_base=100, punto_salida='Plaza',
+            fecha_inicio=date.today(), fecha_fin=date.today(),
+        )
+        reserva = Reserva.objects.create(cliente=self.ana, total=10, fecha=self.fecha, paquete=paquete, estado='PAGADA')
+        ReservaServicio.objects.create(reserva=reserva, servicio=self.tour, fecha=self.fecha)
+        Servicio.objects.filter(pk=self.tour.pk).update(capacidad_max=0)
+
+        resp = self.client.post(URL, {'paquete_id': paquete.pk, 'fecha': self.fecha.isoformat(),
+                                      'nueva_fecha': self.nueva.isoformat()}, format='json')
+
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(ReservaServicio.objects.get(reserva=reserva).fecha, self.fecha)
+
+    def test_capacidad_maxima_se_evalua_por_servicio(self):
+        otro = Servicio.objects.create(titulo='Otro', descripcion='D', duracion='1D', capacidad_max=5, punto_encuentro='Plaza')
+        ReglaReprogramacion.objects.create(tipo_regla='CAPACIDAD_MAXIMA', valor_numerico=1,
+                                           condiciones_extras={'servicios': [otro.pk]})
+
+        self.assertEqual(self.client.post(URL, self.payload, format='json').status_code, 200)
+        self.assertEqual(self._reservados(self.nueva), 2)
+
+    def test_ids_no_numericos_responden_400(self):
+        for campo in ('servicio_id', 'paquete_id'):
+            payload = {**self.payload, 'servicio_id': None, campo: 'abc'}
+            resp = self.client.post(URL, payload, format='json')
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('error', resp.data)
+
+    def test_solo_operadores(self):
+        self.client.force_authenticate(user=self.ana.user)
+        self.assertEqual(self.client.post(URL, self.payload, format='json').status_code, 403)
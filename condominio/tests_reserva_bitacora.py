@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from condominio.models import Usuario, Paquete, Bitacora
@@ -6,6 +6,7 @@ from authz.models import Rol
 from datetime import date, datetime
 
 
+@override_settings(BITACORA_ASINCRONA=False)
 class ReservaBitacoraTestCase(TestCase):
     def setUp(self):
         # Crear user y perfil
@@ -1,8 +1,16 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework.test import APIClient
-from .models import Usuario, Ticket, TicketMessage, Notificacion
+from .models import Usuario, Ticket, TicketMessage, Notificacion, NotificacionArchivada
 from authz.models import Rol
+from .utils import assign_agent_to_ticket
+from .notificaciones import archivar_notificaciones, marcar_leidas
 
 
 class SupportFlowTests(TestCase):
@@ -54,3 +62,266 @@ class SupportFlowTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         ticket.refresh_from_db()
         self.assertEqual(ticket.estado, 'Cerrado')
+
+
+class CargaSoporteTests(TestCase):
+    def setUp(self):
+        self.rol_soporte, _ = Rol.objects.get_or_create(nombre='Soporte')
+        self.cliente = Usuario.objects.create(user=User.objects.create_user(username='cli'), nombre='Cliente')
+        self.agentes = [
+            Usuario.objects.create(user=User.objects.create_user(username=f'agente{i}'), nombre=f'Agente {i}',
+                                   rol=self.rol_soporte)
+            for i in range(3)
+        ]
+
+    def _ticket(self):
+        ticket = Ticket.objects.create(creador=self.cliente, asunto='Asunto', descripcion='Desc')
+        assign_agent_to_ticket(ticket)
+        return ticket
+
+    def _cargas(self):
+        return [Usuario.objects.get(pk=a.pk).carga_soporte for a in self.agentes]
+
+    def test_reparte_por_menor_carga_en_consultas_constantes(self):
+        tickets = [self._ticket() for _ in range(5)]
+        self.assertEqual(sorted(self._cargas()), [1, 2, 2])
+        self.assertEqual(len({t.agente_id for t in tickets[:3]}), 3)
+
+        for i in range(10):
+            Usuario.objects.create(user=User.objects.create_user(username=f'extra{i}'), nombre='Extra',
+                                   rol=self.rol_soporte)
+        ticket = Ticket.objects.create(creador=self.cliente, asunto='Asunto', descripcion='Desc')
+        # SAVEPOINT, SELECT agente, UPDATE ticket, UPDATE carga, RELEASE
+        with self.assertNumQueries(5):
+            assign_agent_to_ticket(ticket)
+
+    def test_responder_cerrar_y_borrar_mantienen_la_carga(self):
+        ticket = self._ticket()
+        agente = ticket.agente
+        ticket.estado = 'Respondido'
+        ticket.save()
+        self.assertEqual(Usuario.objects.get(pk=agente.pk).carga_soporte, 1)
+
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.estado = 'Cerrado'
+        ticket.save()
+        self.assertEqual(Usuario.objects.get(pk=agente.pk).carga_soporte, 0)
+
+        otro = self._ticket()
+        Ticket.objects.get(pk=otro.pk).delete()
+        self.assertEqual(self._cargas(), [0, 0, 0])
+
+    def test_guardar_perfil_no_pisa_el_contador(self):
+        agente = Usuario.objects.get(pk=self.agentes[0].pk)  # carga 0 en memoria
+        self._ticket()
+        agente.nombre = 'Agente renombrado'
+        agente.save()
+        self.assertEqual(Usuario.objects.get(pk=agente.pk).carga_soporte, 1)
+
+    def test_reconciliar(self):
+        self._ticket()
+        Usuario.objects.filter(pk=self.agentes[1].pk).update(carga_soporte=7)
+        salida = StringIO()
+        call_command('reconciliar_soporte', stdout=salida)
+        self.assertEqual(self._cargas(), [1, 0, 0])
+        self.assertIn('1 usuarios, 0 tickets corregidos', salida.getvalue())
+
+
+class ContadoresPanelSoporteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente')
+        self.cliente = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _ticket(self, asunto='Asunto'):
+        return Ticket.objects.create(creador=self.cliente, asunto=asunto, descripcion='Desc')
+
+    def _perfil(self):
+        return Usuario.objects.get(pk=self.cliente.pk)
+
+    def test_contadores_no_editables_por_api(self):
+        self._ticket()
+
+        resp = self.client.patch(f'/api/usuarios/{self.cliente.pk}/', {
+            'nombre': 'Cliente VIP', 'carga_soporte': 99, 'tickets_abiertos': 0, 'notificaciones_no_leidas': 50,
+        }, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data['carga_soporte'], resp.data['tickets_abiertos']), (0, 1))
+        perfil = self._perfil()
+        self.assertEqual(
+            (perfil.nombre, perfil.carga_soporte, perfil.tickets_abiertos, perfil.notificaciones_no_leidas),
+            ('Cliente VIP', 0, 1, 0),
+        )
+
+        nuevo = User.objects.create_user(username='nuevo')
+        resp = APIClient().post('/api/usuarios/', {
+            'user': nuevo.pk, 'nombre': 'Nuevo', 'carga_soporte': 99, 'notificaciones_no_leidas': 50,
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Usuario.objects.filter(user=nuevo).values_list('carga_soporte', 'notificaciones_no_leidas').get(),
+                         (0, 0))
+
+    def test_contadores_por_estado_y_ultimo_ticket(self):
+        primero = self._ticket('Primero')
+        segundo = self._ticket('Segundo')
+        primero.estado = 'Cerrado'
+        primero.save()
+        perfil = self._perfil()
+        self.assertEqual((perfil.tickets_abiertos, perfil.tickets_cerrados), (1, 1))
+        self.assertEqual(perfil.ultimo_ticket_id, segundo.pk)
+
+        segundo.delete()
+        perfil = self._perfil()
+        self.assertEqual((perfil.tickets_abiertos, perfil.tickets_cerrados), (0, 1))
+        self.assertEqual(perfil.ultimo_ticket_id, primero.pk)
+
+    def test_mensajes_y_ultima_actividad(self):
+        ticket = self._ticket()
+        mensaje = TicketMessage.objects.create(ticket=ticket, autor=self.cliente, texto='Hola')
+        TicketMessage.objects.create(ticket=ticket, autor=self.cliente, texto='¿Alguien?')
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.mensajes_count, 2)
+        mensaje.delete()
+        ticket.prioridad = 'Alta'
+        ticket.save()  # no pisa el contador con el valor en memoria
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        self.assertEqual(ticket.mensajes_count, 1)
+        self.assertGreaterEqual(ticket.ultima_actividad, ticket.created_at)
+
+    def test_panel_en_consultas_constantes(self):
+        for i in range(5):
+            ticket = self._ticket(f'Ticket {i}')
+            TicketMessage.objects.create(ticket=ticket, autor=self.cliente, texto='Hola')
+        self.client.get('/api/soporte-panel/')  # resuelve y cachea el perfil
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/soporte-panel/')
+        self.assertEqual(resp.data['tickets_total'], 5)
+        self.assertEqual(resp.data['ultimo_ticket']['asunto'], 'Ticket 4')
+        self.assertEqual(resp.data['panel_info']['tickets_hoy'], 5)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/soporte-panel/mis_tickets/')
+        self.assertEqual([t['mensajes_count'] for t in resp.data['tickets']], [1] * 5)
+
+    def test_reconciliar(self):
+        ticket = self._ticket()
+        TicketMessage.objects.create(ticket=ticket, autor=self.cliente, texto='Hola')
+        Usuario.objects.filter(pk=self.cliente.pk).update(tickets_abiertos=9, ultimo_ticket=None)
+        Ticket.objects.filter(pk=ticket.pk).update(mensajes_count=0)
+        salida = StringIO()
+        call_command('reconciliar_soporte', stdout=salida)
+        self.assertIn('1 usuarios, 1 tickets corregidos', salida.getvalue())
+        perfil = self._perfil()
+        self.assertEqual((perfil.tickets_abiertos, perfil.ultimo_ticket_id), (1, ticket.pk))
+        self.assertEqual(Ticket.objects.get(pk=ticket.pk).mensajes_count, 1)
+
+
+@override_settings(CACHE_COMPARTIDA=True)
+class NotificacionesNoLeidasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente')
+        self.cliente = Usuario.objects.create(user=self.user, nombre='Cliente')
+        self.otro = Usuario.objects.create(user=User.objects.create_user(username='otro'), nombre='Otro')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _notificar(self, usuario=None, n=1):
+        return [Notificacion.objects.create(usuario=usuario or self.cliente, tipo='ticket_nuevo') for _ in range(n)]
+
+    def _badge(self):
+        return self.client.get('/api/notificaciones/unread_count/').data['no_leidas']
+
+    def test_badge_desde_cache(self):
+        self._notificar(n=3)
+        self.assertEqual(self._badge(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._badge(), 3)
+        self._notificar()
+        self.assertEqual(self._badge(), 4)
+
+    def test_marcar_leidas_en_un_update(self):
+        notis = self._notificar(n=4)
+        ajena = self._notificar(self.otro)[0]
+        self._badge()
+
+        resp = self.client.post('/api/notificaciones/mark_read/', {'ids': [notis[0].pk, ajena.pk]}, format='json')
+        self.assertEqual(resp.data, {'marcadas': 1, 'no_leidas': 3})
+        self.assertFalse(Notificacion.objects.get(pk=ajena.pk).leida)
+
+        resp = self.client.post(f'/api/notificaciones/{notis[1].pk}/mark_read/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._badge(), 2)
+
+        resp = self.client.post('/api/notificaciones/mark_all_read/')
+        self.assertEqual(resp.data['marcadas'], 2)
+        self.assertEqual(self._badge(), 0)
+        self._notificar(n=50)
+        # SAVEPOINT, UPDATE notificaciones, UPDATE contador, RELEASE
+        with self.assertNumQueries(4):
+            self.assertEqual(marcar_leidas(self.cliente.pk), 50)
+        self.assertEqual(Usuario.objects.get(pk=self.otro.pk).notificaciones_no_leidas, 1)
+
+    def test_contador_desfasado_se_acota_en_cero(self):
+        self._notificar(n=3)
+        Usuario.objects.filter(pk=self.cliente.pk).update(notificaciones_no_leidas=1)
+
+        resp = self.client.post('/api/notificaciones/mark_all_read/')
+
+        self.assertEqual(resp.data, {'marcadas': 3, 'no_leidas': 0})
+        self.assertEqual(Usuario.objects.get(pk=self.cliente.pk).notificaciones_no_leidas, 0)
+
+    @override_settings(CACHE_COMPARTIDA=False)
+    def test_cache_por_proceso_lee_la_columna(self):
+        self._notificar(n=2)
+        self.assertEqual(self._badge(), 2)
+        Usuario.objects.filter(pk=self.cliente.pk).update(notificaciones_no_leidas=0)  # otro worker
+        self.assertEqual(self._badge(), 0)
+
+    def test_guardar_y_borrar_individual(self):
+        noti = self._notificar()[0]
+        noti.leida = True
+        noti.save()
+        self.assertEqual(self._badge(), 0)
+        noti.leida = False
+        noti.save()
+        Notificacion.objects.get(pk=noti.pk).delete()
+        self.assertEqual(self._badge(), 0)
+
+    def test_reconciliar(self):
+        self._notificar(n=2)
+        Usuario.objects.filter(pk=self.cliente.pk).update(notificaciones_no_leidas=0)
+        salida = StringIO()
+        call_command('reconciliar_soporte', stdout=salida)
+        self.assertEqual(self._badge(), 2)
+        self.assertIn('1 usuarios, 0 tickets corregidos', salida.getvalue())
+
+
+class ArchivoNotificacionesTests(TestCase):
+    def setUp(self):
+        self.cliente = Usuario.objects.create(user=User.objects.create_user(username='cliente'), nombre='Cliente')
+
+    def _notificacion(self, dias, leida):
+        noti = Notificacion.objects.create(usuario=self.cliente, tipo='ticket_nuevo', datos={'campana_id': '3'},
+                                           leida=leida)
+        Notificacion.objects.filter(pk=noti.pk).update(created_at=timezone.now() - timedelta(days=dias))
+        return noti
+
+    def test_archiva_solo_leidas_antiguas_por_lotes(self):
+        antiguas = [self._notificacion(100, True) for _ in range(3)]
+        pendiente = self._notificacion(100, False)
+        reciente = self._notificacion(5, True)
+
+        salida = StringIO()
+        call_command('archivar_notificaciones', '--dias', '30', '--lote', '2', stdout=salida)
+
+        self.assertIn('Notificaciones archivadas: 3', salida.getvalue())
+        self.assertEqual(set(Notificacion.objects.values_list('pk', flat=True)), {pendiente.pk, reciente.pk})
+        archivadas = NotificacionArchivada.objects.order_by('pk')
+        self.assertEqual([a.pk for a in archivadas], [n.pk for n in antiguas])
+        self.assertEqual(archivadas[0].datos, {'campana_id': '3'})
+        self.assertEqual(Usuario.objects.get(pk=self.cliente.pk).notificaciones_no_leidas, 1)
+        self.assertEqual(archivar_notificaciones(dias=30), 0)
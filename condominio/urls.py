@@ -11,6 +11,7 @@ from .api import (
     PerfilUsuarioViewSet, SoportePanelViewSet, FCMDeviceViewSet, CampanaNotificacionViewSet, ReservaMultiServicioView
 )
 from .api import BitacoraViewSet
+from .views_eventos import stream_eventos, ticket_eventos
 
 # 🎤📊 Importar endpoints de reportes avanzados (CU19 y CU20)
 from .views_reportes import (
@@ -52,6 +53,10 @@ router.register(r'suscripciones', SuscripcionViewSet, basename='suscripciones')
 
 urlpatterns = router.urls + [
     path('backups/', include('condominio.backups.urls')),
+
+    # 📡 Stream SSE de notificaciones y mensajes de tickets (reemplaza el polling)
+    path('eventos/', stream_eventos, name='eventos'),
+    path('eventos/ticket/', ticket_eventos, name='eventos-ticket'),
     
     # 🎤 CU19: Reportes Avanzados con Comandos de Voz + IA
     path('reportes/ia/procesar/', procesar_comando_ia, name='procesar-comando-ia'),
@@ -1,25 +1,93 @@
-from .models import Ticket, Usuario
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Notificacion, Ticket, TicketMessage, Usuario
+from .notificaciones import invalidar_no_leidas
+
+# Estados que cuentan como carga del agente (Usuario.carga_soporte)
+ESTADOS_CARGA = ('Asignado', 'Respondido')
 
 
 def assign_agent_to_ticket(ticket):
     """
     Asigna automáticamente un agente con rol 'Soporte' al ticket usando la estrategia de menor carga.
+
+    La carga se lee de Usuario.carga_soporte (índice rol + carga), así que el costo no
+    crece con el número de agentes. En PostgreSQL la fila del agente elegido se bloquea
+    con FOR UPDATE SKIP LOCKED: una creación concurrente toma al siguiente agente menos
+    cargado en lugar de esperar o repetir el mismo.
     """
-    agentes = Usuario.objects.filter(rol__nombre__iexact='Soporte')
-    if not agentes.exists():
-        return None
-
-    # Seleccionar agente con menor número de tickets abiertos/asignados
-    agente_seleccionado = None
-    menor_carga = None
-    for agente in agentes:
-        carga = Ticket.objects.filter(agente=agente, estado__in=['Asignado', 'Respondido']).count()
-        if menor_carga is None or carga < menor_carga:
-            menor_carga = carga
-            agente_seleccionado = agente
-
-    if agente_seleccionado:
+    agentes = Usuario.objects.filter(rol__nombre__iexact='Soporte').order_by('carga_soporte', 'id')
+    with transaction.atomic():
+        agente_seleccionado = agentes.select_for_update(skip_locked=True, of=('self',)).first()
+        if agente_seleccionado is None:
+            # Sin agentes, o todos bloqueados por asignaciones en curso
+            agente_seleccionado = agentes.first()
+        if agente_seleccionado is None:
+            return None
+
         ticket.agente = agente_seleccionado
         ticket.estado = 'Asignado'
-        ticket.save()
+        ticket.save()  # signals_soporte incrementa carga_soporte en esta misma transacción
     return agente_seleccionado
+
+
+def _conteo(queryset, campo):
+    """Subquery COUNT(*) de queryset agrupado por campo (ya filtrado por OuterRef)."""
+    return Coalesce(Subquery(
+        queryset.order_by().values(campo).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def carga_real_soporte():
+    """Subquery con el número real de tickets en ESTADOS_CARGA del agente (OuterRef pk)."""
+    return _conteo(Ticket.objects.filter(agente=OuterRef('pk'), estado__in=ESTADOS_CARGA), 'agente')
+
+
+def contadores_reales_usuario():
+    """Expresiones con el valor real de cada Usuario.CONTADORES."""
+    creados = Ticket.objects.filter(creador=OuterRef('pk'))
+    return {
+        'carga_soporte': carga_real_soporte(),
+        'tickets_abiertos': _conteo(creados.exclude(estado='Cerrado'), 'creador'),
+        'tickets_cerrados': _conteo(creados.filter(estado='Cerrado'), 'creador'),
+        'ultimo_ticket': Subquery(creados.order_by('-created_at', '-id').values('pk')[:1]),
+        'notificaciones_no_leidas': _conteo(
+            Notificacion.objects.filter(usuario=OuterRef('pk'), leida=False), 'usuario',
+        ),
+    }
+
+
+def contadores_reales_ticket():
+    """Expresiones con el valor real de cada Ticket.CONTADORES."""
+    mensajes = TicketMessage.objects.filter(ticket=OuterRef('pk'))
+    return {
+        'mensajes_count': _conteo(mensajes, 'ticket'),
+        'ultima_actividad': Coalesce(
+            Subquery(mensajes.order_by('-created_at').values('created_at')[:1]), F('created_at'),
+        ),
+    }
+
+
+def _reconciliar(modelo, reales):
+    """Corrige las filas cuyos contadores difieren del valor real; retorna sus pks."""
+    campos = [modelo._meta.get_field(nombre).attname for nombre in reales]
+    filas = modelo.objects.order_by().annotate(
+        **{f'real_{campo}': expr for campo, expr in zip(campos, reales.values())}
+    ).values_list('pk', *campos, *(f'real_{campo}' for campo in campos))
+    desfasados = [fila[0] for fila in filas.iterator() if fila[1:len(campos) + 1] != fila[len(campos) + 1:]]
+    for inicio in range(0, len(desfasados), 500):
+        modelo.objects.filter(pk__in=desfasados[inicio:inicio + 500]).update(**reales)
+    return desfasados
+
+
+def reconciliar_contadores_soporte():
+    """Recalcula todos los contadores de soporte; retorna {modelo: filas corregidas}."""
+    usuarios = _reconciliar(Usuario, contadores_reales_usuario())
+    for usuario_id in usuarios:
+        invalidar_no_leidas(usuario_id)
+    return {
+        'usuarios': len(usuarios),
+        'tickets': len(_reconciliar(Ticket, contadores_reales_ticket())),
+    }
@@ -0,0 +1,122 @@
+"""
+Stream de eventos del usuario autenticado con Server-Sent Events (GET /api/eventos/).
+
+Reemplaza el polling de notificaciones, panel de soporte y tickets: el cliente abre un
+EventSource y recibe un evento por cada Notificacion o TicketMessage nuevo que le
+corresponde (ver eventos.py). La vista es async: bajo ASGI una conexión inactiva no
+ocupa un hilo ni hace consultas, solo envía un comentario de keep-alive.
+
+Autenticación: sesión, cabecera "Authorization: Token <key>" o ?ticket=<ticket>. El
+EventSource del navegador no permite cabeceras propias: el cliente pide un ticket con
+POST /api/eventos/ticket/ (autenticado como cualquier endpoint) y abre el stream con él.
+El ticket está firmado, solo sirve para el stream y vence a los EVENTOS_TICKET_TTL
+segundos, así que la URL que queda en logs de proxies no expone el token de la API. Si
+la conexión se corta después del vencimiento, pedir otro ticket antes de reconectar.
+
+Eventos:
+    hola            al conectar, con el badge actual {"no_leidas": n} para resincronizar.
+    notificacion    {"id", "tipo_notificacion", "fecha"}
+    ticket_mensaje  {"id", "ticket_id", "autor_id", "fecha"}
+
+Settings opcionales:
+    EVENTOS_KEEPALIVE: segundos entre comentarios de keep-alive (default 25).
+    EVENTOS_TICKET_TTL: segundos de validez del ticket del stream (default 60).
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .eventos import backend, hub
+from .perfiles import resolver_perfil
+from .notificaciones import no_leidas
+
+KEEPALIVE_DEFAULT = 25
+TICKET_TTL_DEFAULT = 60
+SAL_TICKET = 'condominio.eventos.ticket'
+
+
+def _ticket_ttl():
+    return getattr(settings, 'EVENTOS_TICKET_TTL', TICKET_TTL_DEFAULT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ticket_eventos(request):
+    """Ticket firmado de corta duración para abrir el stream con ?ticket=."""
+    ticket = signing.dumps(request.user.pk, salt=SAL_TICKET)
+    return Response({'ticket': ticket, 'expira_en': _ticket_ttl()})
+
+
+def _user_de_ticket(ticket):
+    try:
+        user_id = signing.loads(ticket, salt=SAL_TICKET, max_age=_ticket_ttl())
+    except signing.BadSignature:  # incluye SignatureExpired
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+def _clave_token(request):
+    cabecera = request.headers.get('Authorization', '')
+    if cabecera.startswith('Token '):
+        return cabecera[len('Token '):].strip()
+    return None
+
+
+def _perfil_y_badge(request):
+    clave = _clave_token(request)
+    if clave:
+        token = Token.objects.select_related('user').filter(key=clave).first()
+        user = token.user if token and token.user.is_active else None
+    elif request.GET.get('ticket'):
+        user = _user_de_ticket(request.GET['ticket'])
+    else:
+        user = request.user
+    perfil = resolver_perfil(user)
+    return perfil, (no_leidas(perfil.pk) if perfil else 0)
+
+
+def _sse(evento):
+    datos = {k: v for k, v in evento.items() if k != 'tipo'}
+    return f"event: {evento['tipo']}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _eventos(usuario_id, badge):
+    cola = hub.suscribir(usuario_id)
+    keepalive = getattr(settings, 'EVENTOS_KEEPALIVE', KEEPALIVE_DEFAULT)
+    try:
+        yield 'retry: 5000\n\n' + _sse({'tipo': 'hola', 'no_leidas': badge})
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield _sse(evento)
+    finally:
+        # Cliente desconectado (el servidor cancela el generador)
+        hub.desuscribir(usuario_id, cola)
+
+
+async def stream_eventos(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    perfil, badge = await sync_to_async(_perfil_y_badge)(request)
+    if perfil is None:
+        return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron.'}, status=401)
+
+    backend().iniciar()
+    response = StreamingHttpResponse(_eventos(perfil.pk, badge), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # sin buffer en proxies nginx
+    return response
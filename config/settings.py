@@ -139,8 +139,13 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Configuración simplificada para PostgreSQL/Railway
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 if DATABASE_URL:
+    # Bajo ASGI (uvicorn) las vistas síncronas corren en hilos por petición y las
+    # conexiones persistentes se acumulan hasta max_connections: por defecto se cierran
+    # al terminar cada petición. Para reutilizarlas usar un pooler (pgbouncer).
     DATABASES = {
-        "default": dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=True)
+        "default": dj_database_url.parse(
+            DATABASE_URL, conn_max_age=int(os.getenv("DB_CONN_MAX_AGE", "0")), ssl_require=True
+        )
     }
 else:
     # Fallback a SQLite para desarrollo local
@@ -151,6 +156,18 @@ else:
         }
     }
 
+# Caché: Redis compartido entre workers si hay REDIS_URL; si no, LocMem por proceso y
+# lo que debe invalidarse entre procesos no se cachea (ver condominio/cache_compartida.py)
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
 
 # --------------------------------------------------------------------------------------------------
 # ↓↓↓ LÓGICA DE DETECCIÓN Y RECONSTRUCCIÓN DE DB REMOTA (COMENTADA PARA TRABAJO LOCAL) ↓↓↓
@@ -299,4 +316,57 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-}
\ No newline at end of file
+}
+
+# Bitácora: escritura diferida por lotes (ver condominio/auditoria.py).
+# En `manage.py test` el runner la fija en False (config/test_runner.py).
+BITACORA_ASINCRONA = os.getenv("BITACORA_ASINCRONA", "true").strip().lower() in ("1", "true", "si", "yes")
+BITACORA_LOTE = int(os.getenv("BITACORA_LOTE", "50"))
+BITACORA_INTERVALO = float(os.getenv("BITACORA_INTERVALO", "2"))
+TEST_RUNNER = "config.test_runner.TestRunner"
+# Retención: meses en línea y destino de los NDJSON.gz archivados (mantener_bitacora)
+BITACORA_RETENCION_MESES = int(os.getenv("BITACORA_RETENCION_MESES", "12"))
+BITACORA_ARCHIVO_DIR = os.getenv("BITACORA_ARCHIVO_DIR", str(BASE_DIR / "archivos" / "bitacora"))
+
+# Chatbot turístico: documentos del catálogo por prompt (ver core/indice_catalogo.py)
+CHATBOT_TOP_K = int(os.getenv("CHATBOT_TOP_K", "6"))
+CHATBOT_INDICE_TTL = int(os.getenv("CHATBOT_INDICE_TTL", "60"))
+
+# Capa LLM: caché de respuestas y cliente stub sin red (ver core/llm.py)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "512"))
+LLM_ESPERA_MAX = float(os.getenv("LLM_ESPERA_MAX", "60"))
+LLM_STUB = os.getenv("LLM_STUB", "false").strip().lower() in ("1", "true", "si", "yes")
+# Cliente LLM compartido: timeouts, pool y circuit breaker (core/openai_client.py, core/llm.py)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_TIMEOUT_CONEXION = float(os.getenv("LLM_TIMEOUT_CONEXION", "3"))
+LLM_REINTENTOS = int(os.getenv("LLM_REINTENTOS", "1"))
+LLM_POOL_MAX = int(os.getenv("LLM_POOL_MAX", "20"))
+LLM_CIRCUITO_VENTANA = int(os.getenv("LLM_CIRCUITO_VENTANA", "20"))
+LLM_CIRCUITO_MINIMO = int(os.getenv("LLM_CIRCUITO_MINIMO", "5"))
+LLM_CIRCUITO_UMBRAL = float(os.getenv("LLM_CIRCUITO_UMBRAL", "0.5"))
+LLM_CIRCUITO_ESPERA = float(os.getenv("LLM_CIRCUITO_ESPERA", "30"))
+
+# Stream SSE de eventos (ver condominio/eventos.py y condominio/views_eventos.py)
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", "")  # vacío: postgres si la base es PostgreSQL
+EVENTOS_CANAL = os.getenv("EVENTOS_CANAL", "condominio_eventos")
+EVENTOS_KEEPALIVE = int(os.getenv("EVENTOS_KEEPALIVE", "25"))
+EVENTOS_TICKET_TTL = int(os.getenv("EVENTOS_TICKET_TTL", "60"))
+
+# Notificaciones: badge cacheado y retención (ver condominio/notificaciones.py)
+NOTIF_NO_LEIDAS_TTL = int(os.getenv("NOTIF_NO_LEIDAS_TTL", "300"))
+NOTIF_RETENCION_DIAS = int(os.getenv("NOTIF_RETENCION_DIAS", "90"))
+NOTIF_ARCHIVO_LOTE = int(os.getenv("NOTIF_ARCHIVO_LOTE", "5000"))
+
+# Cupos de paquetes: retenciones de checkout (ver condominio/cupos.py)
+CUPOS_RETENCION_MINUTOS = int(os.getenv("CUPOS_RETENCION_MINUTOS", "15"))
+
+# Webhooks de Stripe: bandeja idempotente y pool de procesamiento (ver core/bandeja_stripe.py).
+# Por defecto la procesa el worker `manage.py procesar_webhooks_stripe --continuo`;
+# con STRIPE_BANDEJA_EN_PROCESO=true cada proceso web arranca su despachador al iniciar.
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+STRIPE_BANDEJA_EN_PROCESO = os.getenv("STRIPE_BANDEJA_EN_PROCESO", "false").strip().lower() in ("1", "true", "si", "yes")
+STRIPE_BANDEJA_HILOS = int(os.getenv("STRIPE_BANDEJA_HILOS", "4"))
+STRIPE_BANDEJA_INTERVALO = float(os.getenv("STRIPE_BANDEJA_INTERVALO", "30"))
+STRIPE_BANDEJA_MAX_INTENTOS = int(os.getenv("STRIPE_BANDEJA_MAX_INTENTOS", "5"))
+STRIPE_BANDEJA_ESPERA = int(os.getenv("STRIPE_BANDEJA_ESPERA", "30"))
@@ -0,0 +1,20 @@
+"""
+Runner de `manage.py test` (TEST_RUNNER en settings.py).
+
+Fija BITACORA_ASINCRONA=False durante las pruebas: el escritor de bitácora en segundo
+plano usaría su propia conexión contra la base de pruebas. Las pruebas del escritor
+(condominio/tests_auditoria.py) lo activan con override_settings.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._bitacora_asincrona = settings.BITACORA_ASINCRONA
+        settings.BITACORA_ASINCRONA = False
+
+    def teardown_test_environment(self, **kwargs):
+        settings.BITACORA_ASINCRONA = self._bitacora_asincrona
+        super().teardown_test_environment(**kwargs)
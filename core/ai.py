@@ -1,43 +1,57 @@
 # core/ai.py
-import os
+import hashlib
 import json
+import logging
+from django.db import IntegrityError
 from core.openai_client import get_openai_client  # ← ¡ya no importamos desde core.views!
-from condominio.models import Reserva, Paquete, Servicio
+from core.llm import completar
+from core.recommendation_utils import generar_recomendacion_equipaje
+from condominio.models import Reserva, Paquete, Servicio, RecomendacionEquipaje
 
-def generate_packing_recommendation(reserva_id: int) -> dict:
-    """
-    Genera recomendaciones de qué llevar para un viaje basado en la reserva.
-    Similar al chatbot turístico pero especializado en recomendaciones de equipaje.
-    """
-    try:
-        # Cargar datos de la reserva y sus relaciones
-        reserva = Reserva.objects.select_related('cliente', 'paquete', 'servicio').get(id=reserva_id)
-        
-        # Determinar si es paquete o servicio y obtener datos
-        if reserva.paquete:
-            item = reserva.paquete
-            nombre = item.nombre
-            descripcion = item.descripcion
-            duracion = item.duracion
-            incluye = item.incluye if hasattr(item, 'incluye') else []
-            no_incluye = item.no_incluye if hasattr(item, 'no_incluye') else []
-        else:
-            item = reserva.servicio
-            nombre = item.titulo
-            descripcion = item.descripcion
-            duracion = item.duracion
-            incluye = item.servicios_incluidos if hasattr(item, 'servicios_incluidos') else []
-            no_incluye = []
-
-        prompt = f"""
+logger = logging.getLogger(__name__)
+
+# Subir al cambiar el prompt: invalida las recomendaciones guardadas
+VERSION_PROMPT = 1
+
+
+def datos_producto(item) -> dict:
+    """Campos del paquete o servicio que alimentan el prompt de equipaje."""
+    if isinstance(item, Paquete):
+        return {
+            "nombre": item.nombre,
+            "duracion": item.duracion,
+            "descripcion": item.descripcion,
+            "incluye": item.incluye or [],
+            "no_incluye": item.no_incluye or [],
+        }
+    return {
+        "nombre": item.titulo,
+        "duracion": item.duracion,
+        "descripcion": item.descripcion,
+        "incluye": item.servicios_incluidos or [],
+        "no_incluye": [],
+    }
+
+
+def hash_producto(datos: dict) -> str:
+    contenido = json.dumps({"v": VERSION_PROMPT, **datos}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def _lista(valor):
+    return ', '.join(map(str, valor)) if isinstance(valor, list) else valor
+
+
+def _prompt(datos: dict) -> str:
+    return f"""
 Eres un experto guía de viajes boliviano. Tu tarea es generar una lista detallada y personalizada de qué debe llevar el viajero para este viaje específico.
 
 INFORMACIÓN DEL VIAJE:
-- Destino/Experiencia: {nombre}
-- Duración: {duracion}
-- Descripción: {descripcion}
-- Servicios incluidos: {', '.join(incluye) if isinstance(incluye, list) else incluye}
-- No incluido: {', '.join(no_incluye) if isinstance(no_incluye, list) else no_incluye}
+- Destino/Experiencia: {datos['nombre']}
+- Duración: {datos['duracion']}
+- Descripción: {datos['descripcion']}
+- Servicios incluidos: {_lista(datos['incluye'])}
+- No incluido: {_lista(datos['no_incluye'])}
 
 Genera un JSON con el siguiente formato exacto (no incluyas explicaciones fuera del JSON):
 {{
@@ -74,36 +88,86 @@ Asegúrate de:
 5. Sugerir equipo específico si el viaje lo requiere
 """
 
+
+def recomendacion_producto(item, forzar: bool = False) -> dict:
+    """
+    Recomendación de equipaje para un paquete o servicio.
+
+    Se guarda por hash del contenido (RecomendacionEquipaje): las reservas del mismo
+    producto leen la fila ya generada. Solo se guardan respuestas JSON válidas del LLM;
+    si el proveedor falla se usa la recomendación estática sin guardarla.
+    """
+    datos = datos_producto(item)
+    clave = hash_producto(datos)
+    if not forzar:
+        guardada = RecomendacionEquipaje.objects.filter(hash_contenido=clave).values_list("recomendacion", flat=True).first()
+        if guardada is not None:
+            return {"estado": "OK", "recomendacion": guardada}
+
+    try:
         client = get_openai_client()  # ← cliente centralizado
-        
-        completion = client.chat.completions.create(
+        contenido = completar(
+            client,
+            endpoint="recomendacion_equipaje",
             model="llama-3.1-8b-instant",
             messages=[
                 {
                     "role": "system",
                     "content": "Experto en planificación de viajes por Bolivia.",
                 },
-                {"role": "user", "content": prompt},
+                {"role": "user", "content": _prompt(datos)},
             ],
             temperature=0.7,
             max_tokens=500
         )
-        
-        # Intentar parsear la respuesta como JSON
-        try:
-            recomendacion = json.loads(completion.choices[0].message.content)
-            return {
-                "estado": "OK",
-                "recomendacion": recomendacion
-            }
-        except json.JSONDecodeError:
-            # Si no es JSON válido, devolver el texto como está
+    except Exception:
+        # Proveedor lento/caído o circuito abierto: recomendación estática local
+        logger.warning("LLM no disponible, usando recomendación local", exc_info=True)
+        return {
+            "estado": "OK",
+            "origen": "local",
+            "recomendacion": generar_recomendacion_equipaje(datos["nombre"], None)
+        }
+
+    # Intentar parsear la respuesta como JSON
+    try:
+        recomendacion = json.loads(contenido)
+    except (json.JSONDecodeError, TypeError):
+        # Si no es JSON válido, devolver el texto como está
+        return {
+            "estado": "ERROR",
+            "error": "Formato inválido en la respuesta",
+            "texto_original": contenido
+        }
+
+    try:
+        RecomendacionEquipaje.objects.update_or_create(
+            hash_contenido=clave, defaults={"recomendacion": recomendacion}
+        )
+    except IntegrityError:
+        pass  # Otro proceso la guardó al mismo tiempo
+    return {
+        "estado": "OK",
+        "recomendacion": recomendacion
+    }
+
+
+def generate_packing_recommendation(reserva_id: int) -> dict:
+    """
+    Genera recomendaciones de qué llevar para un viaje basado en la reserva.
+    Similar al chatbot turístico pero especializado en recomendaciones de equipaje.
+    """
+    try:
+        # Cargar datos de la reserva y sus relaciones
+        reserva = Reserva.objects.select_related('paquete', 'servicio').get(id=reserva_id)
+        item = reserva.paquete or reserva.servicio
+        if item is None:
             return {
                 "estado": "ERROR",
-                "error": "Formato inválido en la respuesta",
-                "texto_original": completion.choices[0].message.content
+                "error": f"La reserva {reserva_id} no tiene paquete ni servicio"
             }
-            
+        return recomendacion_producto(item)
+
     except Reserva.DoesNotExist:
         return {
             "estado": "ERROR",
@@ -0,0 +1,235 @@
+"""
+Bandeja de entrada de los webhooks de Stripe (condominio.models.EventoStripe).
+
+El webhook solo verifica la firma, inserta el evento y responde 200. La clave única
+stripe_id hace que los reenvíos de Stripe (mismo id de evento) no creen otra fila ni se
+procesen dos veces.
+
+El trabajo lo hace el worker `manage.py procesar_webhooks_stripe --continuo` (Procfile,
+start.sh) o, con STRIPE_BANDEJA_EN_PROCESO, cada proceso web desde CondominioConfig.ready().
+En ambos casos un pool acotado de STRIPE_BANDEJA_HILOS hilos por proceso:
+
+- un hilo despachador toma las filas listas (PENDIENTE con proximo_intento vencido, o
+  EN_PROCESO cuya toma venció) y las reparte al pool. Se despierta al COMMIT de cada
+  evento nuevo y cada STRIPE_BANDEJA_INTERVALO segundos para los reintentos;
+- la toma es un UPDATE a EN_PROCESO (FOR UPDATE SKIP LOCKED en PostgreSQL), así que
+  varios procesos (workers web, `manage.py procesar_webhooks_stripe`) nunca procesan el
+  mismo evento a la vez;
+- si el manejador falla, el evento vuelve a PENDIENTE con espera exponencial
+  (STRIPE_BANDEJA_ESPERA * 2^(intentos-1)) y tras STRIPE_BANDEJA_MAX_INTENTOS queda FALLIDO.
+
+Settings:
+    STRIPE_BANDEJA_EN_PROCESO: True para procesar también dentro del proceso web
+        (default False: solo el comando procesar_webhooks_stripe).
+    STRIPE_BANDEJA_HILOS: hilos del pool (default 4).
+    STRIPE_BANDEJA_INTERVALO: segundos entre barridos de reintentos (default 30).
+    STRIPE_BANDEJA_MAX_INTENTOS: intentos antes de marcar FALLIDO (default 5).
+    STRIPE_BANDEJA_ESPERA: segundos base de la espera entre reintentos (default 30).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HILOS_DEFAULT = 4
+INTERVALO_DEFAULT = 30.0
+MAX_INTENTOS_DEFAULT = 5
+ESPERA_DEFAULT = 30
+TOMA_SEGUNDOS = 300  # un evento EN_PROCESO más tiempo que esto se considera abandonado
+
+
+def _checkout_completado(datos):
+    """checkout.session.completed: genera la recomendación de viaje de la reserva pagada."""
+    from .webhooks import generate_and_cache_recommendation
+
+    session = datos['data']['object']
+    session_id = session.get('id')
+    reserva_id = (session.get('metadata') or {}).get('reserva_id')
+    if not (reserva_id and session_id):
+        logger.warning('Checkout %s sin reserva_id en metadata', session_id)
+        return
+    generate_and_cache_recommendation(int(reserva_id), session_id)
+
+
+# Tipos de evento que se guardan y procesan; el resto se responde sin registrar
+MANEJADORES = {
+    'checkout.session.completed': _checkout_completado,
+}
+
+
+class BandejaStripe:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pool = None
+        self._pid = None
+
+    # ------------------------------------------------------------------
+    # Configuración
+    # ------------------------------------------------------------------
+    @property
+    def en_proceso(self):
+        return getattr(settings, 'STRIPE_BANDEJA_EN_PROCESO', False)
+
+    @property
+    def hilos(self):
+        return max(1, getattr(settings, 'STRIPE_BANDEJA_HILOS', HILOS_DEFAULT))
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'STRIPE_BANDEJA_INTERVALO', INTERVALO_DEFAULT)
+
+    @property
+    def max_intentos(self):
+        return getattr(settings, 'STRIPE_BANDEJA_MAX_INTENTOS', MAX_INTENTOS_DEFAULT)
+
+    @property
+    def espera(self):
+        return getattr(settings, 'STRIPE_BANDEJA_ESPERA', ESPERA_DEFAULT)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def registrar(self, stripe_id, tipo, datos):
+        """Guarda el evento; retorna False si ya estaba (reenvío de Stripe)."""
+        from condominio.models import EventoStripe
+
+        try:
+            with transaction.atomic():
+                EventoStripe.objects.create(stripe_id=stripe_id, tipo=tipo, datos=datos)
+        except IntegrityError:
+            return False
+        transaction.on_commit(self.despertar)
+        return True
+
+    def iniciar(self):
+        """Arranca el despachador del proceso si STRIPE_BANDEJA_EN_PROCESO está activo.
+
+        El primer barrido llega a los STRIPE_BANDEJA_INTERVALO segundos: toma lo que quedó
+        pendiente de un reinicio sin consultar mientras el proceso aún arranca.
+        """
+        return self.en_proceso and self._asegurar_hilo()
+
+    def despertar(self):
+        if self.iniciar():
+            self._despertar.set()
+
+    def tomar(self, limite):
+        """Marca EN_PROCESO hasta `limite` eventos listos y retorna sus pk."""
+        from condominio.models import EventoStripe
+
+        ahora = timezone.now()
+        # Tomas vencidas que ya agotaron sus intentos (el proceso murió en cada uno)
+        EventoStripe.objects.filter(
+            estado='EN_PROCESO', proximo_intento__lte=ahora, intentos__gte=self.max_intentos,
+        ).update(estado='FALLIDO', ultimo_error='Toma vencida sin respuesta del manejador')
+
+        listos = EventoStripe.objects.filter(estado__in=('PENDIENTE', 'EN_PROCESO'), proximo_intento__lte=ahora)
+        if connection.features.has_select_for_update_skip_locked:
+            listos = listos.select_for_update(skip_locked=True)
+        with transaction.atomic():
+            pks = list(listos.order_by('proximo_intento').values_list('pk', flat=True)[:limite])
+            EventoStripe.objects.filter(pk__in=pks).update(
+                estado='EN_PROCESO',
+                intentos=F('intentos') + 1,
+                proximo_intento=ahora + timedelta(seconds=TOMA_SEGUNDOS),
+            )
+        return pks
+
+    def procesar(self, pk):
+        """Ejecuta el manejador de un evento tomado; retorna True si terminó bien."""
+        from condominio.models import EventoStripe
+
+        evento = EventoStripe.objects.get(pk=pk)
+        manejador = MANEJADORES.get(evento.tipo)
+        try:
+            if manejador is not None:
+                manejador(evento.datos)
+        except Exception as exc:
+            fallido = evento.intentos >= self.max_intentos
+            logger.exception('Error procesando evento de Stripe %s (intento %s)', evento.stripe_id, evento.intentos)
+            EventoStripe.objects.filter(pk=pk, estado='EN_PROCESO').update(
+                estado='FALLIDO' if fallido else 'PENDIENTE',
+                proximo_intento=timezone.now() + timedelta(seconds=self.espera * 2 ** (evento.intentos - 1)),
+                ultimo_error=str(exc)[:2000],
+            )
+            return False
+        EventoStripe.objects.filter(pk=pk).update(estado='PROCESADO', procesado_en=timezone.now(), ultimo_error='')
+        return True
+
+    def despachar(self, pool=None, hilos=None):
+        """Procesa los eventos listos hasta vaciar la bandeja; retorna (procesados, fallidos).
+
+        Toma de a `hilos` eventos y espera a que terminen antes de tomar más, así nunca
+        hay más eventos en curso que hilos ni tomas que venzan esperando en cola.
+        """
+        hilos = hilos or self.hilos
+        procesados = fallidos = 0
+        while True:
+            pks = self.tomar(hilos)
+            if not pks:
+                return procesados, fallidos
+            resultados = pool.map(self._procesar_en_hilo, pks) if pool else map(self.procesar, pks)
+            for ok in resultados:
+                procesados += ok
+                fallidos += not ok
+
+    # ------------------------------------------------------------------
+    # Hilo despachador y pool
+    # ------------------------------------------------------------------
+    def _procesar_en_hilo(self, pk):
+        try:
+            return self.procesar(pk)
+        finally:
+            close_old_connections()
+
+    def _asegurar_hilo(self):
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+            return True
+        with self._lock:
+            if self._pid != pid:
+                # Proceso hijo tras fork: el pool heredado no tiene hilos
+                self._hilo = None
+                self._pool = None
+            if self._hilo is None or not self._hilo.is_alive():
+                try:
+                    self._pool = self._pool or ThreadPoolExecutor(
+                        max_workers=self.hilos, thread_name_prefix='stripe-webhook',
+                    )
+                    self._hilo = threading.Thread(target=self._bucle, name='stripe-bandeja', daemon=True)
+                    self._hilo.start()
+                    self._pid = pid
+                except RuntimeError:
+                    logger.exception('No se pudo iniciar el despachador de webhooks de Stripe')
+                    self._hilo = None
+                    return False
+        return True
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                close_old_connections()
+                self.despachar(self._pool)
+            except Exception:
+                logger.exception('Error en el despachador de webhooks de Stripe')
+            finally:
+                close_old_connections()
+
+
+bandeja = BandejaStripe()
+
+
+def registrar_evento(stripe_id, tipo, datos):
+    return bandeja.registrar(stripe_id, tipo, datos)
@@ -0,0 +1,163 @@
+"""
+Índice local (BM25) de paquetes y servicios para el contexto del chatbot turístico.
+
+En lugar de enviar todo el catálogo en cada prompt, chatbot_turismo pide a este índice
+los k documentos más relevantes para la pregunta. Todo corre en memoria del proceso,
+sin servicios externos.
+
+Vigencia del índice:
+- Se construye en la primera pregunta del proceso.
+- Las señales de condominio/signals_catalogo.py lo marcan como desactualizado cuando
+  cambia un Paquete, Servicio o Categoría en este proceso.
+- Para cambios hechos por otros procesos se compara la versión (COUNT + MAX(updated_at))
+  como máximo cada CHATBOT_INDICE_TTL segundos.
+
+Settings:
+    CHATBOT_TOP_K: documentos incluidos en el prompt (default 6).
+    CHATBOT_INDICE_TTL: segundos entre verificaciones de versión (default 60).
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from condominio.busqueda import terminos
+
+logger = logging.getLogger(__name__)
+
+TOP_K_DEFAULT = 6
+TTL_DEFAULT = 60
+
+Documento = namedtuple('Documento', 'tipo pk linea nombre', defaults=('',))
+
+
+class IndiceBM25:
+    """BM25 clásico sobre documentos ya tokenizados."""
+
+    def __init__(self, documentos, k1=1.5, b=0.75):
+        """documentos: lista de (Documento, texto)."""
+        self.documentos = [doc for doc, _ in documentos]
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # término -> [(posición, frecuencia)]
+        self.longitudes = []
+        for posicion, (_, texto) in enumerate(documentos):
+            frecuencias = Counter(terminos(texto))
+            self.longitudes.append(sum(frecuencias.values()))
+            for termino, frecuencia in frecuencias.items():
+                self.postings[termino].append((posicion, frecuencia))
+        total = len(self.documentos)
+        self.promedio = (sum(self.longitudes) / total) if total else 0
+        self.idf = {
+            termino: math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+            for termino, lista in self.postings.items()
+        }
+
+    def buscar(self, consulta, k):
+        """Los k documentos con mayor puntaje (al menos un término en común)."""
+        puntajes = defaultdict(float)
+        for termino in set(terminos(consulta)):
+            idf = self.idf.get(termino)
+            if idf is None:
+                continue
+            for posicion, frecuencia in self.postings[termino]:
+                normalizacion = 1 - self.b + self.b * self.longitudes[posicion] / (self.promedio or 1)
+                puntajes[posicion] += idf * frecuencia * (self.k1 + 1) / (frecuencia + self.k1 * normalizacion)
+        mejores = sorted(puntajes.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [self.documentos[posicion] for posicion, _ in mejores]
+
+
+def _version():
+    from condominio.models import Paquete, Servicio
+
+    paquetes = Paquete.objects.aggregate(total=Count('pk'), ultima=Max('updated_at'))
+    servicios = Servicio.objects.aggregate(
+        total=Count('pk'), ultima=Max('updated_at'), categoria=Max('categoria__updated_at'),
+    )
+    return tuple(paquetes.values()) + tuple(servicios.values())
+
+
+def _documentos():
+    """(Documento, texto indexado) de todo el catálogo, paquetes primero."""
+    from condominio.models import Paquete, Servicio
+
+    documentos = []
+    paquetes = Paquete.objects.values(
+        'id', 'nombre', 'descripcion', 'precio_base', 'duracion', 'ciudad', 'departamento',
+    )
+    for p in paquetes:
+        ubicacion = ', '.join(filter(None, [p['ciudad'], p['departamento']]))
+        linea = (f"- [id {p['id']}] {p['nombre']} ({p['duracion']}) por ${p['precio_base']}"
+                 f"{f' en {ubicacion}' if ubicacion else ''}: {p['descripcion']}")
+        # El nombre y la ubicación pesan más que la descripción
+        texto = ' '.join([p['nombre']] * 2 + [ubicacion] * 2 + [p['duracion'] or '', p['descripcion'] or ''])
+        documentos.append((Documento('paquete', p['id'], linea, p['nombre']), texto))
+
+    servicios = Servicio.objects.values(
+        'id', 'titulo', 'descripcion', 'precio_usd', 'categoria__nombre', 'ciudad', 'departamento',
+    )
+    for s in servicios:
+        ubicacion = ', '.join(filter(None, [s['ciudad'], s['departamento']]))
+        categoria = s['categoria__nombre'] or ''
+        linea = (f"- [id {s['id']}] {s['titulo']} ({categoria}): ${s['precio_usd']}"
+                 f"{f' en {ubicacion}' if ubicacion else ''} — {s['descripcion']}")
+        texto = ' '.join([s['titulo']] * 2 + [ubicacion] * 2 + [categoria, s['descripcion'] or ''])
+        documentos.append((Documento('servicio', s['id'], linea, s['titulo']), texto))
+    return documentos
+
+
+class IndiceCatalogo:
+    """Índice BM25 del catálogo, compartido por los hilos del proceso."""
+
+    def __init__(self):
+        self._indice = None
+        self._version = None
+        self._verificado = 0.0
+        self._desactualizado = True
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CHATBOT_INDICE_TTL', TTL_DEFAULT)
+
+    def marcar_desactualizado(self):
+        self._desactualizado = True
+
+    def obtener(self):
+        """Retorna el IndiceBM25 vigente, reconstruyéndolo si cambió el catálogo."""
+        ahora = time.monotonic()
+        if not self._desactualizado and self._indice is not None and ahora - self._verificado < self.ttl:
+            return self._indice
+
+        with self._lock:
+            self._desactualizado = False
+            version = _version()
+            if self._indice is None or version != self._version:
+                self._indice = IndiceBM25(_documentos())
+                self._version = version
+                logger.info('Índice del chatbot reconstruido con %s documentos', len(self._indice.documentos))
+            self._verificado = ahora
+            return self._indice
+
+    def relevantes(self, pregunta, k=None):
+        """Los k documentos más relevantes; sin coincidencias, los primeros del catálogo."""
+        k = k or getattr(settings, 'CHATBOT_TOP_K', TOP_K_DEFAULT)
+        indice = self.obtener()
+        return indice.buscar(pregunta, k) or indice.documentos[:k]
+
+
+indice = IndiceCatalogo()
+
+
+def contexto_chatbot(pregunta, k=None):
+    """Texto de contexto para el prompt con solo los paquetes y servicios relevantes."""
+    documentos = indice.relevantes(pregunta, k)
+    contexto = "Paquetes turísticos:\n"
+    contexto += ''.join(f"{d.linea}\n" for d in documentos if d.tipo == 'paquete')
+    contexto += "\nServicios:\n"
+    contexto += ''.join(f"{d.linea}\n" for d in documentos if d.tipo == 'servicio')
+    return contexto
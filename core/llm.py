@@ -0,0 +1,370 @@
+"""
+Capa común para las llamadas al LLM (chatbot, reportes IA, recomendación de equipaje).
+
+completar() agrega sobre el cliente compatible con OpenAI:
+- Caché de respuestas por prompt normalizado (espacios colapsados, sin mayúsculas),
+  modelo y parámetros; con TTL y desalojo LRU. Es por proceso.
+- Single-flight: si varias peticiones concurrentes piden el mismo prompt, solo una
+  llama al proveedor y las demás esperan su resultado (o su error).
+- Timeout por llamada (LLM_TIMEOUT) y circuit breaker por proveedor: si en la ventana
+  de las últimas llamadas la proporción de errores supera el umbral, el circuito se
+  abre y completar() lanza CircuitoAbierto sin tocar la red durante LLM_CIRCUITO_ESPERA
+  segundos; luego deja pasar una llamada de prueba. Quien llama debe usar su respaldo
+  local (ReportesIAProcessor._procesar_local, recommendation_utils, etc.).
+- Métricas por endpoint (aciertos, fallos, llamadas, errores, rechazos, latencia) y
+  estado de los circuitos, exportadas en formato Prometheus por exportar_metricas().
+
+ClienteStub reemplaza al proveedor en pruebas o entornos sin red (LLM_STUB=true).
+
+Settings:
+    LLM_CACHE_TTL: segundos de vida de una respuesta cacheada (default 600; 0 desactiva).
+    LLM_CACHE_MAX: respuestas en caché por proceso (default 512).
+    LLM_ESPERA_MAX: segundos que una petición coalescida espera al líder (default 60).
+    LLM_STUB: usar ClienteStub en lugar del proveedor real (default False).
+    LLM_TIMEOUT: segundos máximos por llamada al proveedor (default 15).
+    LLM_CIRCUITO_VENTANA / LLM_CIRCUITO_MINIMO: llamadas recientes consideradas y mínimo
+        para evaluar (default 20 / 5).
+    LLM_CIRCUITO_UMBRAL: proporción de errores que abre el circuito (default 0.5).
+    LLM_CIRCUITO_ESPERA: segundos abierto antes de la llamada de prueba (default 30).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from types import SimpleNamespace
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TTL_DEFAULT = 600
+MAX_DEFAULT = 512
+ESPERA_DEFAULT = 60
+BUCKETS_LATENCIA = (0.25, 0.5, 1, 2, 5, 10, 30)
+TIMEOUT_DEFAULT = 15
+CIRCUITO_VENTANA_DEFAULT = 20
+CIRCUITO_MINIMO_DEFAULT = 5
+CIRCUITO_UMBRAL_DEFAULT = 0.5
+CIRCUITO_ESPERA_DEFAULT = 30
+
+
+# =====================================================
+# Caché TTL + LRU
+# =====================================================
+class CacheLRU:
+    def __init__(self):
+        self._datos = OrderedDict()  # clave -> (expira, valor)
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def set(self, clave, valor, ttl, maximo):
+        if ttl <= 0 or maximo <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > maximo:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# =====================================================
+# Métricas
+# =====================================================
+class MetricasLLM:
+    CONTADORES = ('aciertos', 'fallos', 'coalescidas', 'llamadas', 'errores', 'rechazadas')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores = defaultdict(lambda: dict.fromkeys(self.CONTADORES, 0))
+            self._latencias = defaultdict(lambda: {'buckets': [0] * len(BUCKETS_LATENCIA), 'suma': 0.0, 'total': 0})
+
+    def contar(self, endpoint, contador):
+        with self._lock:
+            self._contadores[endpoint][contador] += 1
+
+    def latencia(self, endpoint, segundos):
+        with self._lock:
+            datos = self._latencias[endpoint]
+            datos['suma'] += segundos
+            datos['total'] += 1
+            for i, limite in enumerate(BUCKETS_LATENCIA):
+                if segundos <= limite:
+                    datos['buckets'][i] += 1
+
+    def resumen(self):
+        """{endpoint: {contadores..., tasa_aciertos, latencia_promedio}}"""
+        with self._lock:
+            resultado = {}
+            for endpoint, contadores in self._contadores.items():
+                consultas = contadores['aciertos'] + contadores['fallos']
+                latencia = self._latencias.get(endpoint)
+                resultado[endpoint] = {
+                    **contadores,
+                    'tasa_aciertos': contadores['aciertos'] / consultas if consultas else 0.0,
+                    'latencia_promedio': latencia['suma'] / latencia['total'] if latencia and latencia['total'] else 0.0,
+                }
+            return resultado
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus."""
+        lineas = []
+        with self._lock:
+            for contador in self.CONTADORES:
+                nombre = f'llm_{contador}_total'
+                lineas.append(f'# TYPE {nombre} counter')
+                for endpoint, contadores in sorted(self._contadores.items()):
+                    lineas.append(f'{nombre}{{endpoint="{endpoint}"}} {contadores[contador]}')
+            lineas.append('# TYPE llm_latencia_segundos histogram')
+            for endpoint, datos in sorted(self._latencias.items()):
+                for limite, cantidad in zip(BUCKETS_LATENCIA, datos['buckets']):
+                    lineas.append(f'llm_latencia_segundos_bucket{{endpoint="{endpoint}",le="{limite}"}} {cantidad}')
+                lineas.append(f'llm_latencia_segundos_bucket{{endpoint="{endpoint}",le="+Inf"}} {datos["total"]}')
+                lineas.append(f'llm_latencia_segundos_sum{{endpoint="{endpoint}"}} {datos["suma"]:.6f}')
+                lineas.append(f'llm_latencia_segundos_count{{endpoint="{endpoint}"}} {datos["total"]}')
+        return '\n'.join(lineas) + '\n'
+
+
+# =====================================================
+# Circuit breaker
+# =====================================================
+class CircuitoAbierto(RuntimeError):
+    """El proveedor viene fallando; la llamada se rechaza sin intentarla."""
+
+
+class Circuito:
+    CERRADO, ABIERTO, SEMIABIERTO = 'cerrado', 'abierto', 'semiabierto'
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.estado = self.CERRADO
+        self._resultados = deque(maxlen=getattr(settings, 'LLM_CIRCUITO_VENTANA', CIRCUITO_VENTANA_DEFAULT))
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """True si la llamada puede intentarse (en semiabierto, solo una a la vez)."""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO:
+                espera = getattr(settings, 'LLM_CIRCUITO_ESPERA', CIRCUITO_ESPERA_DEFAULT)
+                if time.monotonic() - self._abierto_desde < espera:
+                    return False
+                self.estado = self.SEMIABIERTO
+                self._prueba_en_curso = False
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            if self.estado != self.CERRADO:
+                self.estado = self.CERRADO
+                self._resultados.clear()
+            self._resultados.append(True)
+
+    def fallo(self):
+        with self._lock:
+            if self.estado == self.SEMIABIERTO:
+                self._abrir()
+                return
+            self._resultados.append(False)
+            total = len(self._resultados)
+            errores = total - sum(self._resultados)
+            minimo = getattr(settings, 'LLM_CIRCUITO_MINIMO', CIRCUITO_MINIMO_DEFAULT)
+            umbral = getattr(settings, 'LLM_CIRCUITO_UMBRAL', CIRCUITO_UMBRAL_DEFAULT)
+            if total >= minimo and errores / total >= umbral:
+                self._abrir()
+
+    def _abrir(self):
+        self.estado = self.ABIERTO
+        self._abierto_desde = time.monotonic()
+        self._prueba_en_curso = False
+        logger.warning('Circuito LLM abierto para %s', self.nombre)
+
+
+_circuitos = {}
+_circuitos_lock = threading.Lock()
+
+
+def circuito_para(cliente):
+    """Un circuito por proveedor (base_url del cliente)."""
+    nombre = str(getattr(cliente, 'base_url', '') or type(cliente).__name__)
+    with _circuitos_lock:
+        circuito = _circuitos.get(nombre)
+        if circuito is None:
+            circuito = _circuitos[nombre] = Circuito(nombre)
+        return circuito
+
+
+def reiniciar_circuitos():
+    with _circuitos_lock:
+        _circuitos.clear()
+
+
+# =====================================================
+# Cliente stub
+# =====================================================
+class ClienteStub:
+    """Imita client.chat.completions.create() sin red.
+
+    respuesta: texto fijo o callable(**kwargs) -> texto. Por defecto responde '{}' si se
+    pidió JSON y un eco del último mensaje si no. Las llamadas quedan en .llamadas.
+    """
+
+    def __init__(self, respuesta=None):
+        self.respuesta = respuesta
+        self.llamadas = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._crear))
+
+    def _crear(self, **kwargs):
+        self.llamadas.append(kwargs)
+        if callable(self.respuesta):
+            contenido = self.respuesta(**kwargs)
+        elif self.respuesta is not None:
+            contenido = self.respuesta
+        elif (kwargs.get('response_format') or {}).get('type') == 'json_object':
+            contenido = '{}'
+        else:
+            contenido = f"[stub] {kwargs['messages'][-1]['content'][:200]}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido))])
+
+
+def usar_stub():
+    return getattr(settings, 'LLM_STUB', False)
+
+
+# =====================================================
+# completar()
+# =====================================================
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+cache_respuestas = CacheLRU()
+metricas = MetricasLLM()
+_vuelos = {}
+_vuelos_lock = threading.Lock()
+
+
+def _normalizar(texto):
+    return ' '.join(str(texto or '').split()).casefold()
+
+
+def clave_prompt(model, messages, **parametros):
+    """Hash estable del prompt normalizado y los parámetros que afectan la respuesta."""
+    contenido = {
+        'model': model,
+        'messages': [(m.get('role'), _normalizar(m.get('content'))) for m in messages],
+        **parametros,
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def completar(cliente, *, model, messages, endpoint='general', cachear=True, **parametros):
+    """Retorna el texto de la respuesta del LLM (message.content).
+
+    parametros: temperature, max_tokens, response_format, timeout, etc. (se pasan tal cual).
+    Los errores del proveedor se propagan (también a las peticiones coalescidas)
+    y nunca se cachean. Con el circuito abierto lanza CircuitoAbierto de inmediato.
+    """
+    parametros.setdefault('timeout', getattr(settings, 'LLM_TIMEOUT', TIMEOUT_DEFAULT))
+    clave = clave_prompt(model, messages, **{k: v for k, v in parametros.items() if k != 'timeout'})
+    if cachear:
+        contenido = cache_respuestas.get(clave)
+        if contenido is not None:
+            metricas.contar(endpoint, 'aciertos')
+            return contenido
+        metricas.contar(endpoint, 'fallos')
+
+    with _vuelos_lock:
+        vuelo = _vuelos.get(clave)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos[clave] = _Vuelo()
+
+    if not lider:
+        metricas.contar(endpoint, 'coalescidas')
+        if not vuelo.listo.wait(getattr(settings, 'LLM_ESPERA_MAX', ESPERA_DEFAULT)):
+            raise TimeoutError('Tiempo de espera agotado aguardando la respuesta del LLM')
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.resultado
+
+    try:
+        # Un líder anterior pudo terminar entre la consulta a la caché y este punto
+        contenido = cache_respuestas.get(clave) if cachear else None
+        if contenido is not None:
+            vuelo.resultado = contenido
+            return contenido
+
+        circuito = circuito_para(cliente)
+        if not circuito.permitir():
+            metricas.contar(endpoint, 'rechazadas')
+            raise CircuitoAbierto(f'Proveedor LLM no disponible ({circuito.nombre})')
+
+        inicio = time.perf_counter()
+        metricas.contar(endpoint, 'llamadas')
+        try:
+            respuesta = cliente.chat.completions.create(model=model, messages=messages, **parametros)
+        except Exception:
+            circuito.fallo()
+            raise
+        circuito.exito()
+        metricas.latencia(endpoint, time.perf_counter() - inicio)
+        contenido = respuesta.choices[0].message.content
+        if cachear and contenido:
+            cache_respuestas.set(
+                clave, contenido,
+                getattr(settings, 'LLM_CACHE_TTL', TTL_DEFAULT),
+                getattr(settings, 'LLM_CACHE_MAX', MAX_DEFAULT),
+            )
+        vuelo.resultado = contenido
+        return contenido
+    except CircuitoAbierto as e:
+        vuelo.error = e
+        raise
+    except Exception as e:
+        metricas.contar(endpoint, 'errores')
+        vuelo.error = e
+        raise
+    finally:
+        with _vuelos_lock:
+            _vuelos.pop(clave, None)
+        vuelo.listo.set()
+
+
+def exportar_metricas():
+    lineas = ['# TYPE llm_circuito_abierto gauge']
+    with _circuitos_lock:
+        for nombre, circuito in sorted(_circuitos.items()):
+            lineas.append(f'llm_circuito_abierto{{proveedor="{nombre}"}} {int(circuito.estado != Circuito.CERRADO)}')
+    return metricas.exportar() + '\n'.join(lineas) + '\n'
@@ -1,14 +1,67 @@
 # core/openai_client.py
 import os
-from openai import OpenAI
+import threading
+
+from django.conf import settings
+from openai import DefaultHttpxClient, OpenAI
+import httpx
+
+from .llm import ClienteStub, usar_stub
 
 """
 Cliente unificado para Groq (endpoint compatible con OpenAI) u OpenAI oficial.
 Priorizamos GROQ_API_KEY + https://api.groq.com/openai/v1
 Si no hay GROQ_API_KEY, intentamos con OPENAI_API_KEY (OpenAI).
+
+Los clientes son compartidos por proceso (uno por api_key + base_url): reutilizan el
+pool de conexiones keep-alive y tienen timeouts de conexión/lectura, así un proveedor
+lento no deja colgados a los workers. Tras un fork se crean de nuevo.
+
+Settings:
+    LLM_TIMEOUT: segundos máximos por llamada (default 15).
+    LLM_TIMEOUT_CONEXION: segundos para establecer la conexión (default 3).
+    LLM_REINTENTOS: reintentos automáticos del SDK (default 1).
+    LLM_POOL_MAX: conexiones simultáneas por cliente (default 20).
 """
 
+_clientes = {}
+_lock = threading.Lock()
+_pid = None
+
+
+def obtener_cliente(api_key, base_url=None):
+    """Cliente OpenAI compartido para (api_key, base_url)."""
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            # No compartir sockets heredados del proceso padre
+            _clientes.clear()
+            _pid = os.getpid()
+
+        clave = (api_key, base_url)
+        cliente = _clientes.get(clave)
+        if cliente is None:
+            pool = getattr(settings, "LLM_POOL_MAX", 20)
+            cliente = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=httpx.Timeout(
+                    getattr(settings, "LLM_TIMEOUT", 15),
+                    connect=getattr(settings, "LLM_TIMEOUT_CONEXION", 3),
+                ),
+                max_retries=getattr(settings, "LLM_REINTENTOS", 1),
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+                ),
+            )
+            _clientes[clave] = cliente
+        return cliente
+
+
 def get_openai_client():
+    if usar_stub():
+        return ClienteStub()
+
     api_key = os.getenv("GROQ_API_KEY") or os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("No hay GROQ_API_KEY ni OPENAI_API_KEY configurada")
@@ -16,4 +69,4 @@ def get_openai_client():
     # Si usas Groq (por defecto)
     base_url = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
 
-    return OpenAI(api_key=api_key, base_url=base_url)
+    return obtener_cliente(api_key, base_url)
@@ -1,3 +1,389 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from django.core.cache import cache
+
+from condominio.models import Categoria, EventoStripe, Paquete, Servicio, RecomendacionEquipaje, Reserva, Usuario
+from core.ai import generate_packing_recommendation
+from core.bandeja_stripe import bandeja
+from core.indice_catalogo import IndiceBM25, IndiceCatalogo, Documento
+from core.llm import (
+    CircuitoAbierto, ClienteStub, cache_respuestas, completar, metricas, reiniciar_circuitos,
+)
+from core.openai_client import obtener_cliente
+
+
+class IndiceBM25Test(TestCase):
+    def test_ordena_por_relevancia(self):
+        indice = IndiceBM25([
+            (Documento('paquete', 1, 'Uyuni'), 'Salar de Uyuni salar Potosí'),
+            (Documento('paquete', 2, 'Titicaca'), 'Lago Titicaca Copacabana vista del salar desde lejos'),
+            (Documento('servicio', 3, 'Cristo'), 'Cristo de la Concordia Cochabamba'),
+        ])
+        self.assertEqual([d.pk for d in indice.buscar('¿Qué hay en el salar?', 5)], [1, 2])
+        self.assertEqual([d.pk for d in indice.buscar('cochabamba', 5)], [3])
+        self.assertEqual(indice.buscar('amazonía', 5), [])
+
+
+class ChatbotContextoTest(TestCase):
+    def setUp(self):
+        hoy = date.today()
+        comunes = {
+            'duracion': '3 días', 'precio_base': 300, 'punto_salida': 'Plaza',
+            'fecha_inicio': hoy, 'fecha_fin': hoy + timedelta(days=30),
+        }
+        self.uyuni = Paquete.objects.create(nombre='Aventura en Uyuni', descripcion='Salar y lagunas',
+                                            ciudad='Uyuni', **comunes)
+        for i in range(10):
+            Paquete.objects.create(nombre=f'Paquete {i}', descripcion='Ciudad colonial', **comunes)
+        Servicio.objects.create(
+            titulo='Tour gastronómico', descripcion='Salteñas y api', duracion='1 día', capacidad_max=10,
+            punto_encuentro='Mercado', precio_usd=20, categoria=Categoria.objects.create(nombre='Gastronomía'),
+        )
+        self.indice = IndiceCatalogo()
+        cache_respuestas.clear()
+
+    def test_solo_los_relevantes_y_reconstruye_al_cambiar(self):
+        relevantes = self.indice.relevantes('Quiero ir al salar de Uyuni', k=3)
+        self.assertEqual(relevantes[0].pk, self.uyuni.pk)
+        self.assertIn(f'[id {self.uyuni.pk}]', relevantes[0].linea)
+        self.assertLessEqual(len(relevantes), 3)
+
+        with self.assertNumQueries(0):
+            self.indice.relevantes('salar', k=3)
+
+        self.uyuni.descripcion = 'Ahora con selva'
+        self.uyuni.save()  # la señal marca el índice global; este se verifica a mano
+        self.indice.marcar_desactualizado()
+        self.assertEqual(self.indice.relevantes('selva', k=3)[0].pk, self.uyuni.pk)
+
+    def test_sin_coincidencias_usa_los_primeros(self):
+        self.assertEqual(len(self.indice.relevantes('hola', k=4)), 4)
+
+    def test_prompt_no_incluye_todo_el_catalogo(self):
+        capturado = {}
+
+        def crear(**kwargs):
+            capturado['prompt'] = kwargs['messages'][1]['content']
+            return mock.Mock(choices=[mock.Mock(message=mock.Mock(content='Te recomiendo Uyuni'))])
+
+        cliente = mock.Mock()
+        cliente.chat.completions.create.side_effect = crear
+        with mock.patch('core.views.get_openai_client', return_value=cliente):
+            resp = APIClient().post('/api/chatbot/turismo/', {'pregunta': 'salteñas'}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('Tour gastronómico', capturado['prompt'])
+        self.assertNotIn('Paquete 3', capturado['prompt'])
+
+
+class CapaLLMTest(TestCase):
+    def setUp(self):
+        cache_respuestas.clear()
+        metricas.reiniciar()
+        reiniciar_circuitos()
+
+    def _pedir(self, cliente, texto='¿Qué llevo a Uyuni?'):
+        return completar(cliente, endpoint='prueba', model='m', temperature=0.2,
+                         messages=[{'role': 'user', 'content': texto}])
+
+    def test_cache_por_prompt_normalizado(self):
+        stub = ClienteStub('Ropa abrigada')
+        self.assertEqual(self._pedir(stub), 'Ropa abrigada')
+        self.assertEqual(self._pedir(stub, '  ¿qué llevo   a UYUNI? '), 'Ropa abrigada')
+        self.assertEqual(len(stub.llamadas), 1)
+
+        self._pedir(stub, 'Otra pregunta')
+        self.assertEqual(len(stub.llamadas), 2)
+        resumen = metricas.resumen()['prueba']
+        self.assertEqual((resumen['aciertos'], resumen['llamadas']), (1, 2))
+
+    @override_settings(LLM_CACHE_MAX=1)
+    def test_lru_desaloja_el_menos_usado(self):
+        stub = ClienteStub('ok')
+        self._pedir(stub, 'a')
+        self._pedir(stub, 'b')
+        self._pedir(stub, 'a')
+        self.assertEqual(len(stub.llamadas), 3)
+
+    def test_single_flight_una_llamada_para_peticiones_concurrentes(self):
+        liberar = threading.Event()
+
+        def lento(**kwargs):
+            liberar.wait(5)
+            return 'respuesta'
+
+        stub = ClienteStub(lento)
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(self._pedir(stub))) for _ in range(5)]
+        for hilo in hilos:
+            hilo.start()
+        while metricas.resumen().get('prueba', {}).get('coalescidas', 0) < 4:
+            threading.Event().wait(0.01)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join(5)
+
+        self.assertEqual(resultados, ['respuesta'] * 5)
+        self.assertEqual(len(stub.llamadas), 1)
+
+    def test_errores_no_se_cachean(self):
+        def falla(**kwargs):
+            raise RuntimeError('proveedor caído')
+
+        with self.assertRaises(RuntimeError):
+            self._pedir(ClienteStub(falla))
+        self.assertEqual(self._pedir(ClienteStub('ya responde')), 'ya responde')
+        self.assertEqual(metricas.resumen()['prueba']['errores'], 1)
+
+    def test_endpoint_de_metricas_solo_admin(self):
+        self._pedir(ClienteStub('ok'))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='cliente'))
+        self.assertEqual(client.get('/api/llm/metricas/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        resp = client.get('/api/llm/metricas/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('llm_llamadas_total{endpoint="prueba"} 1', resp.content.decode())
+
+
+@override_settings(LLM_CIRCUITO_MINIMO=3, LLM_CIRCUITO_UMBRAL=0.5, LLM_CIRCUITO_ESPERA=60)
+class CircuitoLLMTest(TestCase):
+    def setUp(self):
+        cache_respuestas.clear()
+        metricas.reiniciar()
+        reiniciar_circuitos()
+
+    def _pedir(self, cliente, texto):
+        return completar(cliente, endpoint='prueba', model='m', messages=[{'role': 'user', 'content': texto}])
+
+    def test_abre_tras_errores_y_rechaza_sin_llamar(self):
+        def falla(**kwargs):
+            raise TimeoutError('proveedor lento')
+
+        stub = ClienteStub(falla)
+        for i in range(3):
+            with self.assertRaises(TimeoutError):
+                self._pedir(stub, f'pregunta {i}')
+        with self.assertRaises(CircuitoAbierto):
+            self._pedir(stub, 'otra')
+        self.assertEqual(len(stub.llamadas), 3)
+        self.assertEqual(stub.llamadas[0]['timeout'], 15)
+        self.assertEqual(metricas.resumen()['prueba']['rechazadas'], 1)
+
+    def test_semiabierto_cierra_con_llamada_exitosa(self):
+        respuestas = iter([RuntimeError('x')] * 3 + ['ok', 'ok'])
+
+        def alterna(**kwargs):
+            r = next(respuestas)
+            if isinstance(r, Exception):
+                raise r
+            return r
+
+        stub = ClienteStub(alterna)
+        for i in range(3):
+            with self.assertRaises(RuntimeError):
+                self._pedir(stub, f'p{i}')
+        with override_settings(LLM_CIRCUITO_ESPERA=0):
+            self.assertEqual(self._pedir(stub, 'prueba'), 'ok')
+        self.assertEqual(self._pedir(stub, 'otra'), 'ok')
+
+    def test_cliente_compartido_con_timeouts(self):
+        cliente = obtener_cliente('sk-prueba', 'https://llm.invalid/v1')
+        self.assertIs(cliente, obtener_cliente('sk-prueba', 'https://llm.invalid/v1'))
+        self.assertIsNot(cliente, obtener_cliente('sk-otra', 'https://llm.invalid/v1'))
+        self.assertEqual(cliente.timeout.read, 15)
+        self.assertEqual(cliente.timeout.connect, 3)
+
+    def test_chatbot_responde_localmente_si_el_proveedor_falla(self):
+        hoy = date.today()
+        uyuni = Paquete.objects.create(
+            nombre='Aventura en Uyuni', descripcion='Salar', duracion='3 días', precio_base=300,
+            punto_salida='Plaza', fecha_inicio=hoy, fecha_fin=hoy + timedelta(days=30),
+        )
+
+        def falla(**kwargs):
+            raise ConnectionError('sin red')
+
+        with mock.patch('core.views.get_openai_client', return_value=ClienteStub(falla)), \
+                self.assertLogs('core.views', 'WARNING'):
+            resp = APIClient().post('/api/chatbot/turismo/', {'pregunta': 'salar de uyuni'}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['origen'], 'local')
+        self.assertIn(f'paquetes/{uyuni.pk}/', resp.data['respuesta'])
+
+
+RECOMENDACION = '{"texto": "Abrígate", "items": [{"categoria": "Ropa", "items": ["Chamarra"], "prioridad": "alta"}]}'
+
+
+def _paquete(nombre, **kwargs):
+    hoy = date.today()
+    datos = {
+        'descripcion': 'Salar', 'duracion': '3 días', 'precio_base': 300, 'punto_salida': 'Plaza',
+        'fecha_inicio': hoy, 'fecha_fin': hoy + timedelta(days=30),
+    }
+    datos.update(kwargs)
+    return Paquete.objects.create(nombre=nombre, **datos)
+
+
+class RecomendacionEquipajeTest(TestCase):
+    def setUp(self):
+        cache_respuestas.clear()
+        reiniciar_circuitos()
+        self.cliente = Usuario.objects.create(user=User.objects.create_user(username='viajero'), nombre='Viajero')
+        self.paquete = _paquete('Uyuni')
+        self.stub = ClienteStub(RECOMENDACION)
+
+    def _reserva(self):
+        return Reserva.objects.create(cliente=self.cliente, paquete=self.paquete, fecha=date.today(), total=300)
+
+    def test_reservas_del_mismo_producto_reutilizan_la_recomendacion(self):
+        with mock.patch('core.ai.get_openai_client', return_value=self.stub):
+            primera = generate_packing_recommendation(self._reserva().pk)
+            cache_respuestas.clear()  # descartar la caché en memoria: debe leer la tabla
+            segunda = generate_packing_recommendation(self._reserva().pk)
+
+        self.assertEqual(primera['recomendacion']['texto'], 'Abrígate')
+        self.assertEqual(segunda, primera)
+        self.assertEqual(len(self.stub.llamadas), 1)
+        self.assertEqual(RecomendacionEquipaje.objects.count(), 1)
+
+        self.paquete.descripcion = 'Salar y volcanes'
+        self.paquete.save()
+        with mock.patch('core.ai.get_openai_client', return_value=self.stub):
+            generate_packing_recommendation(self._reserva().pk)
+        self.assertEqual(len(self.stub.llamadas), 2)
+
+    def test_respaldo_local_no_se_guarda(self):
+        def falla(**kwargs):
+            raise ConnectionError('sin red')
+
+        with mock.patch('core.ai.get_openai_client', return_value=ClienteStub(falla)), \
+                self.assertLogs('core.ai', 'WARNING') as logs:
+            resultado = generate_packing_recommendation(self._reserva().pk)
+        self.assertEqual(resultado['origen'], 'local')
+        self.assertIn('LLM no disponible', logs.output[0])
+        self.assertFalse(RecomendacionEquipaje.objects.exists())
+
+
+class PregenerarRecomendacionesTest(TransactionTestCase):
+    def test_una_por_contenido_y_solo_activos(self):
+        cache_respuestas.clear()
+        reiniciar_circuitos()
+        _paquete('Uyuni')
+        _paquete('Uyuni')  # mismo contenido: una sola llamada
+        _paquete('Inactivo', estado='Inactivo')
+        Servicio.objects.create(titulo='Tour', descripcion='Ciudad', duracion='1 día', capacidad_max=5,
+                                punto_encuentro='Plaza')
+        stub = ClienteStub(RECOMENDACION)
+
+        with mock.patch('core.ai.get_openai_client', return_value=stub):
+            # Un hilo: la base de pruebas SQLite en memoria bloquea tablas entre conexiones
+            call_command('pregenerar_recomendaciones', '--hilos', '1', stdout=StringIO())
+            self.assertEqual(RecomendacionEquipaje.objects.count(), 2)
+            salida = StringIO()
+            call_command('pregenerar_recomendaciones', stdout=salida)
+
+        self.assertIn('0 recomendaciones por generar', salida.getvalue())
+        self.assertEqual(len(stub.llamadas), 2)
+
+    def test_pool_de_hilos_deduplica(self):
+        cache_respuestas.clear()
+        reiniciar_circuitos()
+        for nombre in ('Uyuni', 'Uyuni', 'Sajama', 'Sajama'):
+            _paquete(nombre)
+        # Las dos llamadas al LLM deben estar en curso a la vez, en hilos distintos
+        juntas = threading.Barrier(2, timeout=10)
+        hilos = set()
+
+        def responder(**kwargs):
+            hilos.add(threading.current_thread().name)
+            juntas.wait()
+            return RECOMENDACION
+
+        stub = ClienteStub(responder)
+        # La base SQLite en memoria bloquea la tabla entre conexiones: serializar solo el INSERT
+        guardar = RecomendacionEquipaje.objects.update_or_create
+        escritura = threading.Lock()
+
+        def guardar_serializado(*args, **kwargs):
+            with escritura:
+                return guardar(*args, **kwargs)
+
+        with mock.patch('core.ai.get_openai_client', return_value=stub), \
+                mock.patch.object(RecomendacionEquipaje.objects, 'update_or_create', side_effect=guardar_serializado):
+            call_command('pregenerar_recomendaciones', '--hilos', '2', stdout=StringIO())
+
+        self.assertEqual(len(stub.llamadas), 2)
+        self.assertEqual(len(hilos), 2)
+        self.assertEqual(RecomendacionEquipaje.objects.count(), 2)
+
+
+@override_settings(STRIPE_BANDEJA_EN_PROCESO=False)
+class BandejaStripeTest(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.evento = {
+            'id': 'evt_1', 'type': 'checkout.session.completed',
+            'data': {'object': {'id': 'cs_test_1', 'metadata': {'reserva_id': '7'}}},
+        }
+
+    def _webhook(self, evento):
+        with mock.patch('core.webhooks.stripe.Webhook.construct_event', return_value=evento):
+            return APIClient().post('/api/webhook/stripe/', evento, format='json', HTTP_STRIPE_SIGNATURE='firma')
+
+    def test_reenvio_no_duplica_el_evento(self):
+        primera, reenvio = self._webhook(self.evento), self._webhook(self.evento)
+
+        self.assertEqual((primera.status_code, primera.data['duplicado']), (200, False))
+        self.assertEqual((reenvio.status_code, reenvio.data['duplicado']), (200, True))
+        self.assertEqual(EventoStripe.objects.get().estado, 'PENDIENTE')
+        self.assertEqual(self._webhook({**self.evento, 'id': 'evt_2', 'type': 'charge.refunded'}).data['status'], 'ignored')
+        self.assertEqual(EventoStripe.objects.count(), 1)
+
+    def test_procesa_y_no_repite(self):
+        self._webhook(self.evento)
+        with mock.patch('core.webhooks.generate_packing_recommendation', return_value={'estado': 'OK'}) as generar:
+            self.assertEqual(bandeja.despachar(hilos=1), (1, 0))
+            self.assertEqual(bandeja.despachar(hilos=1), (0, 0))
+
+        generar.assert_called_once_with(7)
+        self.assertEqual(cache.get('recommendation_cs_test_1'), {'estado': 'OK'})
+        self.assertEqual(EventoStripe.objects.get().estado, 'PROCESADO')
+
+    @override_settings(STRIPE_BANDEJA_MAX_INTENTOS=2)
+    def test_reintenta_con_espera_y_marca_fallido(self):
+        self._webhook(self.evento)
+        with mock.patch('core.webhooks.generate_packing_recommendation', side_effect=RuntimeError('sin base')), \
+                self.assertLogs('core.bandeja_stripe', 'ERROR'):
+            self.assertEqual(bandeja.despachar(hilos=1), (0, 1))
+            evento = EventoStripe.objects.get()
+            self.assertEqual((evento.estado, evento.intentos, evento.ultimo_error), ('PENDIENTE', 1, 'sin base'))
+            self.assertGreater(evento.proximo_intento, evento.created_at)
+            self.assertEqual(bandeja.despachar(hilos=1), (0, 0))  # aún en espera
+
+            EventoStripe.objects.update(proximo_intento=evento.created_at)
+            bandeja.despachar(hilos=1)
+
+        self.assertEqual(EventoStripe.objects.get().estado, 'FALLIDO')
+        self.assertEqual(cache.get('recommendation_cs_test_1')['estado'], 'ERROR')
+
+    def test_despachador_arranca_al_iniciar_solo_si_esta_activo(self):
+        config = apps.get_app_config('condominio')
+        with mock.patch.object(bandeja, '_asegurar_hilo', return_value=True) as asegurar:
+            config.start_stripe_dispatcher()
+            asegurar.assert_not_called()
+
+            with override_settings(STRIPE_BANDEJA_EN_PROCESO=True):
+                config.start_stripe_dispatcher()
+            asegurar.assert_called_once_with()
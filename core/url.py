@@ -2,6 +2,7 @@
 from django.urls import path
 from .views import (
     chatbot_turismo,
+    metricas_llm,
     crear_checkout_session,
     crear_checkout_reserva,
     crear_checkout_session_suscripcion,
@@ -20,6 +21,7 @@ urlpatterns = [
     path('crear-checkout-reserva/', crear_checkout_reserva, name='crear-checkout-reserva'),
     path('crear-checkout-session-suscripcion/', crear_checkout_session_suscripcion, name='crear-checkout-session-suscripcion'),
     path('chatbot/turismo/', chatbot_turismo, name='chatbot-turismo'),
+    path('llm/metricas/', metricas_llm, name='llm-metricas'),
     path('recomendacion/', obtener_recomendacion, name='obtener-recomendacion'),
     path('verificar-pago/', verificar_pago, name='verificar-pago'),
     path('webhook/stripe/', stripe_webhook, name='stripe-webhook'),
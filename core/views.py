@@ -1,22 +1,28 @@
 # core/views.py
+import logging
 from datetime import timedelta, timezone
 from django.contrib.auth import get_user_model
 from django.http import HttpResponse, HttpResponseRedirect
 import stripe
 from django.conf import settings
-from condominio.models import Paquete, Servicio, Suscripcion
-from rest_framework.decorators import api_view
+from condominio.models import Suscripcion
+from condominio.perfiles import resolver_perfil
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 import os
 from dotenv import load_dotenv
 from rest_framework import status
 from django.core.cache import cache
 from .openai_client import get_openai_client  # ← cliente centralizado
+from .indice_catalogo import contexto_chatbot, indice
+from .llm import completar, exportar_metricas
 from condominio.serializer import SuscripcionSerializer 
 
 load_dotenv()
 stripe.api_key = settings.STRIPE_SECRET_KEY
 url_frontend = os.getenv("URL_FRONTEND", "http://127.0.0.1:3000")
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # HELPER: Redirección a Deep Links sin validación de esquema
@@ -146,7 +152,7 @@ def crear_checkout_reserva(request):
             return Response({"error": f"Reserva {reserva_id} no encontrada"}, status=status.HTTP_404_NOT_FOUND)
 
         # Autorización básica: dueño o staff
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = resolver_perfil(request.user)
         if request.user.is_authenticated and not request.user.is_staff:
             if not perfil or reserva.cliente_id != perfil.id:
                 return Response({"error": "No tienes permiso para esta reserva"}, status=status.HTTP_403_FORBIDDEN)
@@ -228,19 +234,8 @@ def chatbot_turismo(request):
     if not pregunta:
         return Response({"error": "Debes enviar el campo 'pregunta'."}, status=400)
 
-    paquetes = Paquete.objects.all().values(
-        "nombre", "descripcion", "precio_base", "duracion"
-    )
-    servicios = Servicio.objects.all().values(
-        "titulo", "descripcion", "precio_usd", "categoria__nombre"
-    )
-
-    contexto = "Paquetes turísticos:\n"
-    for p in paquetes:
-        contexto += f"- {p['nombre']} ({p['duracion']}) por ${p['precio_base']}: {p['descripcion']}\n"
-    contexto += "\nServicios:\n"
-    for s in servicios:
-        contexto += f"- {s['titulo']} ({s['categoria__nombre']}): ${s['precio_usd']} — {s['descripcion']}\n"
+    # Solo los paquetes/servicios relevantes a la pregunta (índice BM25 local)
+    contexto = contexto_chatbot(pregunta)
 
     prompt = f"""
 Eres un asesor turístico boliviano que trabaja en una agencia de viajes de Bolivia.
@@ -280,7 +275,9 @@ Recuerda: Responde como un asistente amable y profesional de turismo boliviano.
     try:
         client = get_openai_client()  # ← cliente centralizado
 
-        completion = client.chat.completions.create(
+        respuesta = completar(
+            client,
+            endpoint="chatbot_turismo",
             model="llama-3.1-8b-instant",
             messages=[
                 {"role": "system", "content": "Asistente turístico experto en Bolivia."},
@@ -289,10 +286,27 @@ Recuerda: Responde como un asistente amable y profesional de turismo boliviano.
             temperature=0.7,
             max_tokens=300,
         )
-        respuesta = completion.choices[0].message.content
         return Response({"respuesta": respuesta})
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception:
+        # Proveedor lento/caído o circuito abierto: respuesta local con el ítem más relevante
+        logger.warning("LLM no disponible, usando respuesta local del chatbot", exc_info=True)
+        return Response({"respuesta": respuesta_local_chatbot(pregunta), "origen": "local"})
+
+
+def respuesta_local_chatbot(pregunta):
+    """Respuesta sin LLM: el paquete o servicio más relevante según el índice local."""
+    relevantes = indice.relevantes(pregunta, 1)
+    if not relevantes:
+        return "No tengo información disponible sobre eso."
+    doc = relevantes[0]
+    ruta = "paquetes" if doc.tipo == "paquete" else "destinos"
+    return f"Te recomiendo “{doc.nombre}”.\n{url_frontend}{ruta}/{doc.pk}/"
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metricas_llm(request):
+    """Métricas de la capa LLM (caché, coalescencia, latencia) en formato Prometheus."""
+    return HttpResponse(exportar_metricas(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 # NUEVO: endpoint específico para crear sesión de suscripción
 @api_view(["POST"])
@@ -546,7 +560,7 @@ def crear_checkout_session_mobile(request):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Verificar que el usuario tiene permiso para esta reserva
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = resolver_perfil(request.user)
         if not request.user.is_staff:  # Los admins pueden pagar cualquier reserva
             if not perfil or reserva.cliente.id != perfil.id:
                 return Response({
@@ -1,17 +1,20 @@
 # core/webhooks.py
+import json
 import stripe
-from threading import Thread
 from django.conf import settings
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.core.cache import cache
 from .ai import generate_packing_recommendation
+from .bandeja_stripe import MANEJADORES, registrar_evento
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 def generate_and_cache_recommendation(reserva_id: int, session_id: str):
     """
-    Genera la recomendación en background y la guarda en cache.
+    Genera la recomendación y la guarda en cache (la llama la bandeja de webhooks,
+    core/bandeja_stripe.py). Si falla guarda el error y relanza la excepción para que
+    la bandeja reintente el evento.
     
     Args:
         reserva_id: ID de la reserva
@@ -31,12 +34,15 @@ def generate_and_cache_recommendation(reserva_id: int, session_id: str):
         # También guardar el error con session_id
         cache_key = f'recommendation_{session_id}'
         cache.set(cache_key, {"estado": "ERROR", "error": str(e)}, timeout=3600)
+        raise
 
 @api_view(['POST'])
 def stripe_webhook(request):
     """
-    Maneja los webhooks de Stripe, específicamente el evento checkout.session.completed
-    para generar recomendaciones de viaje.
+    Recibe los webhooks de Stripe: verifica la firma, guarda el evento en la bandeja
+    (core/bandeja_stripe.py) y responde 200 de inmediato. El pool de la bandeja lo
+    procesa después (checkout.session.completed genera la recomendación de viaje);
+    los reenvíos de un mismo evento se aceptan sin procesarlos otra vez.
     """
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
@@ -45,29 +51,6 @@ def stripe_webhook(request):
         event = stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
-        
-        # Verificar que es un checkout completado
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            session_id = session.get('id')  # ✅ Obtener session_id de Stripe
-            reserva_id = session.get('metadata', {}).get('reserva_id')
-            
-            print(f"📥 Webhook recibido: session_id={session_id[:40]}..., reserva_id={reserva_id}")
-            
-            if reserva_id and session_id:
-                # ✅ CORREGIDO: Pasar AMBOS parámetros
-                thread = Thread(
-                    target=generate_and_cache_recommendation,
-                    args=(int(reserva_id), session_id),
-                    daemon=True
-                )
-                thread.start()
-                print(f"✅ Thread de recomendación iniciado para session {session_id[:40]}...")
-            else:
-                print(f"⚠️ Webhook sin reserva_id o session_id: reserva={reserva_id}, session={session_id}")
-            
-        return Response({'status': 'success'})
-        
     except stripe.error.SignatureVerificationError:
         return Response(
             {'error': 'Invalid signature'},
@@ -78,3 +61,10 @@ def stripe_webhook(request):
             {'error': str(e)},
             status=400
         )
+
+    if event['type'] not in MANEJADORES:
+        return Response({'status': 'ignored'})
+
+    # Si falla el INSERT responde 500 y Stripe reenvía el evento
+    nuevo = registrar_evento(event['id'], event['type'], json.loads(payload))
+    return Response({'status': 'success', 'duplicado': not nuevo})
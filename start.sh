@@ -15,5 +15,8 @@ sleep 2
 echo "🔍 Verificando que el scheduler esté corriendo..."
 ps aux | grep run_campaign_scheduler | grep -v grep || echo "⚠️ Scheduler NO encontrado en procesos"
 
+echo "💳 Iniciando worker de webhooks de Stripe en background..."
+python -u manage.py procesar_webhooks_stripe --continuo 2>&1 &
+
 echo "🚀 Iniciando servidor Gunicorn..."
-gunicorn config.wsgi:application --bind 0.0.0.0:$PORT
+gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT